@@ -13,7 +13,7 @@ from alembic import context
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 # Import all models so they're available to alembic
-from app.models import Tournament, Player, Admin, Score, AuditLog
+from app.models import Tournament, Player, Admin, Score, AuditLog, ImportJob, StatsCounters, TournamentPosition, RankingSnapshot, RankingDelta
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
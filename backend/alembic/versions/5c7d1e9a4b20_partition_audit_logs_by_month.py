@@ -0,0 +1,116 @@
+"""Partition audit_logs by month
+
+Revision ID: 5c7d1e9a4b20
+Revises: 8b2e4d6f0a13
+Create Date: 2026-10-18 11:20:37.845512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7d1e9a4b20'
+down_revision: Union[str, None] = '8b2e4d6f0a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COMPOSITE_INDEXES = [
+    ('ix_audit_logs_timestamp_id', ['timestamp', 'id']),
+    ('ix_audit_logs_table_record_timestamp', ['table_name', 'record_id', 'timestamp', 'id']),
+    ('ix_audit_logs_admin_timestamp', ['admin_id', 'timestamp', 'id']),
+    ('ix_audit_logs_action_timestamp', ['action', 'timestamp', 'id']),
+]
+
+COLUMNS = "id, table_name, record_id, action, old_values, new_values, admin_id, timestamp"
+
+
+def upgrade() -> None:
+    op.drop_index('ix_audit_logs_timestamp', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_table_name', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_record_id', table_name='audit_logs')
+
+    # A sequência do id é reaproveitada pela nova tabela
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_legacy")
+
+    # A chave primária de uma tabela particionada precisa incluir a coluna de partição
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            table_name VARCHAR NOT NULL,
+            record_id INTEGER,
+            action VARCHAR NOT NULL,
+            old_values JSON,
+            new_values JSON,
+            admin_id INTEGER NOT NULL REFERENCES admins (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION audit_logs_ensure_partition(ts TIMESTAMP) RETURNS TEXT AS $$
+        DECLARE
+            month_start DATE := date_trunc('month', ts)::DATE;
+            partition_name TEXT := format('audit_logs_%s', to_char(month_start, 'YYYY_MM'));
+        BEGIN
+            IF to_regclass(partition_name) IS NULL THEN
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+                );
+            END IF;
+            RETURN partition_name;
+        EXCEPTION WHEN duplicate_table THEN
+            -- Outro processo criou a mesma partição ao mesmo tempo
+            RETURN partition_name;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    # timestamp (UTC) como a coluna: com NOW() a série seria timestamptz e não casaria com a função
+    op.execute("""
+        SELECT audit_logs_ensure_partition(month)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT MIN(timestamp) FROM audit_logs_legacy), NOW() AT TIME ZONE 'UTC')),
+            date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '2 months',
+            INTERVAL '1 month'
+        ) AS month
+    """)
+
+    for name, columns in COMPOSITE_INDEXES:
+        op.create_index(name, 'audit_logs', columns, unique=False)
+
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_legacy")
+    op.execute("DROP TABLE audit_logs_legacy")
+    op.execute("SELECT setval('audit_logs_id_seq', COALESCE((SELECT MAX(id) FROM audit_logs), 0) + 1, false)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.create_table('audit_logs',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('audit_logs_id_seq')"), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('old_values', sa.JSON(), nullable=True),
+    sa.Column('new_values', sa.JSON(), nullable=True),
+    sa.Column('admin_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['admin_id'], ['admins.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_partitioned")
+    op.execute("DROP TABLE audit_logs_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS audit_logs_ensure_partition(TIMESTAMP)")
+
+    op.create_index('ix_audit_logs_record_id', 'audit_logs', ['record_id'], unique=False)
+    op.create_index('ix_audit_logs_table_name', 'audit_logs', ['table_name'], unique=False)
+    op.create_index('ix_audit_logs_timestamp', 'audit_logs', ['timestamp'], unique=False)
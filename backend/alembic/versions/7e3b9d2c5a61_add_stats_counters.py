@@ -0,0 +1,234 @@
+"""Add stats_counters maintained by triggers
+
+Revision ID: 7e3b9d2c5a61
+Revises: 5c7d1e9a4b20
+Create Date: 2026-10-19 00:25:12.418903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3b9d2c5a61'
+down_revision: Union[str, None] = '5c7d1e9a4b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Triggers por comando (não por linha), com tabelas de transição: uma
+# importação de milhares de scores atualiza a linha de contadores uma vez.
+TRIGGERS = [
+    ('scores', 'INSERT', 'REFERENCING NEW TABLE AS new_rows', 'stats_scores_changed'),
+    ('scores', 'UPDATE', 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows', 'stats_scores_changed'),
+    ('scores', 'DELETE', 'REFERENCING OLD TABLE AS old_rows', 'stats_scores_changed'),
+    ('players', 'INSERT', 'REFERENCING NEW TABLE AS new_rows', 'stats_players_changed'),
+    ('players', 'UPDATE', 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows', 'stats_players_changed'),
+    ('players', 'DELETE', 'REFERENCING OLD TABLE AS old_rows', 'stats_players_changed'),
+    ('tournaments', 'INSERT', 'REFERENCING NEW TABLE AS new_rows', 'stats_tournaments_changed'),
+    ('tournaments', 'DELETE', 'REFERENCING OLD TABLE AS old_rows', 'stats_tournaments_changed'),
+]
+
+
+def upgrade() -> None:
+    op.create_table('stats_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('total_players', sa.BigInteger(), nullable=False),
+    sa.Column('total_tournaments', sa.BigInteger(), nullable=False),
+    sa.Column('total_scores', sa.BigInteger(), nullable=False),
+    sa.Column('positive_scores', sa.BigInteger(), nullable=False),
+    sa.Column('negative_scores', sa.BigInteger(), nullable=False),
+    sa.Column('points_sum', sa.Float(), nullable=False),
+    sa.Column('highest_score', sa.Float(), nullable=True),
+    sa.Column('lowest_score', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Máximo/mínimo recalculados e torneios ativos contados pelo índice
+    op.create_index(op.f('ix_scores_points'), 'scores', ['points'], unique=False)
+    op.create_index(op.f('ix_tournaments_end_date'), 'tournaments', ['end_date'], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION stats_apply_score_delta(added DOUBLE PRECISION[], removed DOUBLE PRECISION[])
+        RETURNS VOID AS $$
+        DECLARE
+            delta RECORD;
+            counters stats_counters%ROWTYPE;
+        BEGIN
+            SELECT
+                COALESCE(SUM(sign), 0) AS scores,
+                COALESCE(SUM(sign) FILTER (WHERE points > 0), 0) AS positive,
+                COALESCE(SUM(sign) FILTER (WHERE points < 0), 0) AS negative,
+                COALESCE(SUM(sign * points), 0) AS points_sum,
+                MAX(points) FILTER (WHERE sign > 0) AS added_max,
+                MIN(points) FILTER (WHERE sign > 0) AS added_min,
+                MAX(points) FILTER (WHERE sign < 0) AS removed_max,
+                MIN(points) FILTER (WHERE sign < 0) AS removed_min
+            INTO delta
+            FROM (
+                SELECT 1 AS sign, unnest(added) AS points
+                UNION ALL
+                SELECT -1, unnest(removed)
+            ) changes;
+
+            IF delta.added_max IS NULL AND delta.removed_max IS NULL THEN
+                RETURN;
+            END IF;
+
+            UPDATE stats_counters SET
+                total_scores = total_scores + delta.scores,
+                positive_scores = positive_scores + delta.positive,
+                negative_scores = negative_scores + delta.negative,
+                points_sum = points_sum + delta.points_sum,
+                highest_score = GREATEST(highest_score, delta.added_max),
+                lowest_score = LEAST(lowest_score, delta.added_min),
+                updated_at = NOW() AT TIME ZONE 'UTC'
+            WHERE id = 1
+            RETURNING * INTO counters;
+
+            -- Só quando um extremo sai é preciso procurar o novo (pelo índice de points)
+            IF delta.removed_max >= counters.highest_score OR delta.removed_min <= counters.lowest_score THEN
+                UPDATE stats_counters SET
+                    highest_score = (
+                        SELECT s.points FROM scores s JOIN players p ON p.id = s.player_id
+                        WHERE p.is_active ORDER BY s.points DESC LIMIT 1
+                    ),
+                    lowest_score = (
+                        SELECT s.points FROM scores s JOIN players p ON p.id = s.player_id
+                        WHERE p.is_active ORDER BY s.points ASC LIMIT 1
+                    )
+                WHERE id = 1;
+            END IF;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION stats_scores_changed() RETURNS TRIGGER AS $$
+        BEGIN
+            -- Scores de jogadores inativos não contam
+            IF TG_OP = 'INSERT' THEN
+                PERFORM stats_apply_score_delta(
+                    ARRAY(SELECT n.points FROM new_rows n JOIN players p ON p.id = n.player_id WHERE p.is_active),
+                    '{}'
+                );
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM stats_apply_score_delta(
+                    '{}',
+                    ARRAY(SELECT o.points FROM old_rows o JOIN players p ON p.id = o.player_id WHERE p.is_active)
+                );
+            ELSE
+                -- Apenas linhas cujos pontos ou jogador mudaram (editar notas não toca os contadores)
+                PERFORM stats_apply_score_delta(
+                    ARRAY(
+                        SELECT n.points FROM new_rows n JOIN old_rows o ON o.id = n.id
+                        JOIN players p ON p.id = n.player_id
+                        WHERE p.is_active AND (n.points IS DISTINCT FROM o.points OR n.player_id <> o.player_id)
+                    ),
+                    ARRAY(
+                        SELECT o.points FROM old_rows o JOIN new_rows n ON n.id = o.id
+                        JOIN players p ON p.id = o.player_id
+                        WHERE p.is_active AND (n.points IS DISTINCT FROM o.points OR n.player_id <> o.player_id)
+                    )
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION stats_players_changed() RETURNS TRIGGER AS $$
+        DECLARE
+            players_delta BIGINT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                players_delta := (SELECT COUNT(*) FROM new_rows WHERE is_active);
+            ELSIF TG_OP = 'DELETE' THEN
+                players_delta := -(SELECT COUNT(*) FROM old_rows WHERE is_active);
+            ELSE
+                players_delta := (SELECT COUNT(*) FROM new_rows WHERE is_active)
+                    - (SELECT COUNT(*) FROM old_rows WHERE is_active);
+                -- Ativar/desativar um jogador soma/subtrai todos os seus scores
+                PERFORM stats_apply_score_delta(
+                    ARRAY(
+                        SELECT s.points FROM new_rows n JOIN old_rows o ON o.id = n.id
+                        JOIN scores s ON s.player_id = n.id
+                        WHERE n.is_active AND NOT o.is_active
+                    ),
+                    ARRAY(
+                        SELECT s.points FROM new_rows n JOIN old_rows o ON o.id = n.id
+                        JOIN scores s ON s.player_id = n.id
+                        WHERE o.is_active AND NOT n.is_active
+                    )
+                );
+            END IF;
+
+            IF players_delta <> 0 THEN
+                UPDATE stats_counters
+                SET total_players = total_players + players_delta, updated_at = NOW() AT TIME ZONE 'UTC'
+                WHERE id = 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION stats_tournaments_changed() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE stats_counters
+                SET total_tournaments = total_tournaments + (SELECT COUNT(*) FROM new_rows),
+                    updated_at = NOW() AT TIME ZONE 'UTC'
+                WHERE id = 1;
+            ELSE
+                UPDATE stats_counters
+                SET total_tournaments = total_tournaments - (SELECT COUNT(*) FROM old_rows),
+                    updated_at = NOW() AT TIME ZONE 'UTC'
+                WHERE id = 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table, event, referencing, function in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER stats_{table}_{event.lower()} AFTER {event} ON {table}
+            {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """)
+
+    op.execute("""
+        INSERT INTO stats_counters (
+            id, total_players, total_tournaments, total_scores, positive_scores, negative_scores,
+            points_sum, highest_score, lowest_score, updated_at
+        )
+        SELECT
+            1,
+            (SELECT COUNT(*) FROM players WHERE is_active),
+            (SELECT COUNT(*) FROM tournaments),
+            COUNT(s.id),
+            COUNT(s.id) FILTER (WHERE s.points > 0),
+            COUNT(s.id) FILTER (WHERE s.points < 0),
+            COALESCE(SUM(s.points), 0),
+            MAX(s.points),
+            MIN(s.points),
+            NOW() AT TIME ZONE 'UTC'
+        FROM scores s JOIN players p ON p.id = s.player_id
+        WHERE p.is_active
+    """)
+
+
+def downgrade() -> None:
+    for table, event, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS stats_{table}_{event.lower()} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS stats_tournaments_changed()")
+    op.execute("DROP FUNCTION IF EXISTS stats_players_changed()")
+    op.execute("DROP FUNCTION IF EXISTS stats_scores_changed()")
+    op.execute("DROP FUNCTION IF EXISTS stats_apply_score_delta(DOUBLE PRECISION[], DOUBLE PRECISION[])")
+    op.drop_index(op.f('ix_tournaments_end_date'), table_name='tournaments')
+    op.drop_index(op.f('ix_scores_points'), table_name='scores')
+    op.drop_table('stats_counters')
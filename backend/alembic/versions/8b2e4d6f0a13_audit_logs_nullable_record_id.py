@@ -0,0 +1,28 @@
+"""Allow audit_logs without record_id
+
+Revision ID: 8b2e4d6f0a13
+Revises: 3f1a9c2d7e41
+Create Date: 2026-10-18 10:03:51.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f0a13'
+down_revision: Union[str, None] = '3f1a9c2d7e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ações em lote (IMPORT) não se referem a um único registro
+    op.alter_column('audit_logs', 'record_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM audit_logs WHERE record_id IS NULL")
+    op.alter_column('audit_logs', 'record_id', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,62 @@
+"""Add tournament_rankings position snapshots
+
+Revision ID: 9a4f2c6e8b13
+Revises: 7e3b9d2c5a61
+Create Date: 2026-10-19 02:10:37.205114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f2c6e8b13'
+down_revision: Union[str, None] = '7e3b9d2c5a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tournament_rankings',
+    sa.Column('tournament_id', sa.Integer(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('score_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['tournament_id'], ['tournaments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['score_id'], ['scores.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('tournament_id', 'player_id')
+    )
+    op.create_index(op.f('ix_tournament_rankings_player_id'), 'tournament_rankings', ['player_id'], unique=False)
+    op.create_index('ix_tournament_rankings_tournament_position', 'tournament_rankings', ['tournament_id', 'position'], unique=False)
+
+    # Posições iniciais de todos os torneios; os já encerrados ficam congelados.
+    # Scores duplicados por (jogador, torneio) contam uma vez, pelo melhor
+    # (mesma regra do INSERT_SQL de tournament_position_service)
+    op.execute("""
+        INSERT INTO tournament_rankings (tournament_id, player_id, score_id, position, points, computed_at)
+        SELECT
+            tournament_id, player_id, score_id,
+            RANK() OVER (PARTITION BY tournament_id ORDER BY sort_key),
+            points,
+            NOW() AT TIME ZONE 'UTC'
+        FROM (
+            SELECT DISTINCT ON (s.tournament_id, s.player_id)
+                s.tournament_id, s.player_id, s.id AS score_id, s.points,
+                CASE WHEN t.sort_criteria = 'points_desc' THEN -s.points ELSE s.points END AS sort_key
+            FROM scores s
+            JOIN players p ON p.id = s.player_id AND p.is_active
+            JOIN tournaments t ON t.id = s.tournament_id
+            ORDER BY s.tournament_id, s.player_id, sort_key, s.id
+        ) best
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tournament_rankings_tournament_position', table_name='tournament_rankings')
+    op.drop_index(op.f('ix_tournament_rankings_player_id'), table_name='tournament_rankings')
+    op.drop_table('tournament_rankings')
@@ -0,0 +1,127 @@
+"""Add ranking_snapshots and the ranking_deltas ledger
+
+Revision ID: b3e8d1f6a7c2
+Revises: 9a4f2c6e8b13
+Create Date: 2026-10-19 03:02:48.661270
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8d1f6a7c2'
+down_revision: Union[str, None] = '9a4f2c6e8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Triggers por comando, como os de stats_counters: uma linha de delta por
+# jogador afetado em cada comando
+TRIGGERS = [
+    ('scores', 'INSERT', 'REFERENCING NEW TABLE AS new_rows', 'ranking_scores_changed'),
+    ('scores', 'UPDATE', 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows', 'ranking_scores_changed'),
+    ('scores', 'DELETE', 'REFERENCING OLD TABLE AS old_rows', 'ranking_scores_changed'),
+    ('players', 'UPDATE', 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows', 'ranking_players_changed'),
+]
+
+
+def upgrade() -> None:
+    op.create_table('ranking_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.Column('player_count', sa.Integer(), nullable=False),
+    sa.Column('player_ids', sa.LargeBinary(), nullable=False),
+    sa.Column('positions', sa.LargeBinary(), nullable=False),
+    sa.Column('total_points', sa.LargeBinary(), nullable=False),
+    sa.Column('score_counts', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ranking_snapshots_taken_at'), 'ranking_snapshots', ['taken_at'], unique=True)
+
+    op.create_table('ranking_deltas',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('points_delta', sa.Float(), nullable=False),
+    sa.Column('count_delta', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), server_default=sa.text("(NOW() AT TIME ZONE 'UTC')"), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ranking_deltas_changed_at'), 'ranking_deltas', ['changed_at'], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ranking_scores_changed() RETURNS TRIGGER AS $$
+        BEGIN
+            -- Scores de jogadores inativos não estão no ranking
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+                SELECT n.player_id, SUM(n.points), COUNT(*)
+                FROM new_rows n JOIN players p ON p.id = n.player_id
+                WHERE p.is_active
+                GROUP BY n.player_id;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+                SELECT o.player_id, -SUM(o.points), -COUNT(*)
+                FROM old_rows o JOIN players p ON p.id = o.player_id
+                WHERE p.is_active
+                GROUP BY o.player_id;
+            ELSE
+                -- Apenas linhas cujos pontos ou jogador mudaram
+                INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+                SELECT changes.player_id, SUM(changes.points), SUM(changes.scores)
+                FROM (
+                    SELECT n.player_id, n.points, 1 AS scores
+                    FROM new_rows n JOIN old_rows o ON o.id = n.id
+                    WHERE n.points IS DISTINCT FROM o.points OR n.player_id <> o.player_id
+                    UNION ALL
+                    SELECT o.player_id, -o.points, -1
+                    FROM old_rows o JOIN new_rows n ON n.id = o.id
+                    WHERE n.points IS DISTINCT FROM o.points OR n.player_id <> o.player_id
+                ) changes
+                JOIN players p ON p.id = changes.player_id
+                WHERE p.is_active
+                GROUP BY changes.player_id
+                HAVING SUM(changes.points) <> 0 OR SUM(changes.scores) <> 0;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ranking_players_changed() RETURNS TRIGGER AS $$
+        BEGIN
+            -- Ativar/desativar um jogador coloca/tira todos os seus scores do ranking
+            INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+            SELECT
+                n.id,
+                CASE WHEN n.is_active THEN SUM(s.points) ELSE -SUM(s.points) END,
+                CASE WHEN n.is_active THEN COUNT(*) ELSE -COUNT(*) END
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            JOIN scores s ON s.player_id = n.id
+            WHERE n.is_active <> o.is_active
+            GROUP BY n.id, n.is_active;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table, event, referencing, function in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER ranking_{table}_{event.lower()} AFTER {event} ON {table}
+            {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """)
+
+
+def downgrade() -> None:
+    for table, event, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS ranking_{table}_{event.lower()} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS ranking_players_changed()")
+    op.execute("DROP FUNCTION IF EXISTS ranking_scores_changed()")
+    op.drop_index(op.f('ix_ranking_deltas_changed_at'), table_name='ranking_deltas')
+    op.drop_table('ranking_deltas')
+    op.drop_index(op.f('ix_ranking_snapshots_taken_at'), table_name='ranking_snapshots')
+    op.drop_table('ranking_snapshots')
@@ -0,0 +1,99 @@
+"""Order ranking_deltas against snapshots with a shared write lock
+
+Revision ID: d4a7c3e9f2b5
+Revises: b3e8d1f6a7c2
+Create Date: 2026-10-19 05:41:09.372518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7c3e9f2b5'
+down_revision: Union[str, None] = 'b3e8d1f6a7c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# RANKING_SNAPSHOT_LOCK_KEY de ranking_history_service ("hist"). Os triggers
+# pegam o lock compartilhado até o fim da transação do escritor e o snapshot
+# o exclusivo: o snapshot espera as escritas em andamento terminarem e as
+# seguintes esperam o snapshot. Com changed_at lido do relógio depois do
+# lock (clock_timestamp(), não o início da transação), todo delta que está
+# no snapshot fica antes de taken_at e todo delta que não está fica depois.
+WRITE_LOCK = "PERFORM pg_advisory_xact_lock_shared(1751741300);"
+
+SCORES_FUNCTION = """
+    CREATE OR REPLACE FUNCTION ranking_scores_changed() RETURNS TRIGGER AS $$
+    BEGIN
+        {lock}
+        -- Scores de jogadores inativos não estão no ranking
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+            SELECT n.player_id, SUM(n.points), COUNT(*)
+            FROM new_rows n JOIN players p ON p.id = n.player_id
+            WHERE p.is_active
+            GROUP BY n.player_id;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+            SELECT o.player_id, -SUM(o.points), -COUNT(*)
+            FROM old_rows o JOIN players p ON p.id = o.player_id
+            WHERE p.is_active
+            GROUP BY o.player_id;
+        ELSE
+            -- Apenas linhas cujos pontos ou jogador mudaram
+            INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+            SELECT changes.player_id, SUM(changes.points), SUM(changes.scores)
+            FROM (
+                SELECT n.player_id, n.points, 1 AS scores
+                FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.points IS DISTINCT FROM o.points OR n.player_id <> o.player_id
+                UNION ALL
+                SELECT o.player_id, -o.points, -1
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE n.points IS DISTINCT FROM o.points OR n.player_id <> o.player_id
+            ) changes
+            JOIN players p ON p.id = changes.player_id
+            WHERE p.is_active
+            GROUP BY changes.player_id
+            HAVING SUM(changes.points) <> 0 OR SUM(changes.scores) <> 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+PLAYERS_FUNCTION = """
+    CREATE OR REPLACE FUNCTION ranking_players_changed() RETURNS TRIGGER AS $$
+    BEGIN
+        {lock}
+        -- Ativar/desativar um jogador coloca/tira todos os seus scores do ranking
+        INSERT INTO ranking_deltas (player_id, points_delta, count_delta)
+        SELECT
+            n.id,
+            CASE WHEN n.is_active THEN SUM(s.points) ELSE -SUM(s.points) END,
+            CASE WHEN n.is_active THEN COUNT(*) ELSE -COUNT(*) END
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN scores s ON s.player_id = n.id
+        WHERE n.is_active <> o.is_active
+        GROUP BY n.id, n.is_active;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.alter_column('ranking_deltas', 'changed_at', server_default=sa.text("(clock_timestamp() AT TIME ZONE 'UTC')"))
+    op.execute(SCORES_FUNCTION.format(lock=WRITE_LOCK))
+    op.execute(PLAYERS_FUNCTION.format(lock=WRITE_LOCK))
+
+
+def downgrade() -> None:
+    op.execute(PLAYERS_FUNCTION.format(lock=""))
+    op.execute(SCORES_FUNCTION.format(lock=""))
+    op.alter_column('ranking_deltas', 'changed_at', server_default=sa.text("(NOW() AT TIME ZONE 'UTC')"))
@@ -0,0 +1,74 @@
+"""Store ranking snapshot vectors ordered by player id
+
+Revision ID: e6b1f4a9c3d7
+Revises: d4a7c3e9f2b5
+Create Date: 2026-10-19 09:12:44.180355
+
+"""
+from array import array
+from typing import Sequence, Union
+import sys
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b1f4a9c3d7'
+down_revision: Union[str, None] = 'd4a7c3e9f2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Vetores little-endian de cada snapshot (ver models/ranking_snapshot.py)
+VECTORS = (("player_ids", "i"), ("positions", "i"), ("total_points", "d"), ("score_counts", "i"))
+
+snapshots = sa.table(
+    "ranking_snapshots",
+    sa.column("id", sa.Integer),
+    *(sa.column(name, sa.LargeBinary) for name, _ in VECTORS),
+)
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    vector = array(typecode)
+    vector.frombytes(data)
+    if sys.byteorder == "big":
+        vector.byteswap()
+    return vector
+
+
+def _pack(vector: array) -> bytes:
+    if sys.byteorder == "big":
+        vector.byteswap()
+    return vector.tobytes()
+
+
+def _reorder(sort_key):
+    """Regravar os vetores de cada snapshot na ordem de `sort_key(player_id, position)`"""
+    conn = op.get_bind()
+    ids = conn.execute(sa.select(snapshots.c.id).order_by(snapshots.c.id)).scalars().all()
+    # Um snapshot por vez: cada um pode ter alguns MB
+    for snapshot_id in ids:
+        row = conn.execute(sa.select(snapshots).where(snapshots.c.id == snapshot_id)).mappings().one()
+        vectors = {name: _unpack(typecode, row[name]) for name, typecode in VECTORS}
+        order = sorted(
+            range(len(vectors["player_ids"])),
+            key=lambda index: sort_key(vectors["player_ids"][index], vectors["positions"][index]),
+        )
+        conn.execute(
+            snapshots.update().where(snapshots.c.id == snapshot_id).values({
+                name: _pack(array(typecode, (vectors[name][index] for index in order)))
+                for name, typecode in VECTORS
+            })
+        )
+
+
+def upgrade() -> None:
+    # Ordem de id: o histórico de um jogador acha seu índice por busca binária
+    _reorder(lambda player_id, position: player_id)
+
+
+def downgrade() -> None:
+    # De volta à ordem do ranking
+    _reorder(lambda player_id, position: (position, player_id))
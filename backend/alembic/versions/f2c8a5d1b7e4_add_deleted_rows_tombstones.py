@@ -0,0 +1,66 @@
+"""Record deleted rows in deleted_rows, in the deleting transaction
+
+Revision ID: f2c8a5d1b7e4
+Revises: e6b1f4a9c3d7
+Create Date: 2026-10-19 10:27:31.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a5d1b7e4'
+down_revision: Union[str, None] = 'e6b1f4a9c3d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# As tabelas com upsert nos backups incrementais (ver backup_service). O log
+# de DELETE da auditoria é gravado depois do commit, em outra transação, e
+# pode faltar; o trigger grava a remoção junto com ela.
+TABLES = ["admins", "players", "tournaments", "scores"]
+
+
+def upgrade() -> None:
+    op.create_table('deleted_rows',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text("(NOW() AT TIME ZONE 'UTC')"), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_deleted_rows_deleted_at'), 'deleted_rows', ['deleted_at'], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION record_deleted_rows() RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO deleted_rows (table_name, record_id)
+            SELECT TG_TABLE_NAME, o.id FROM old_rows o;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_deleted_rows AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION record_deleted_rows()
+        """)
+
+    # Remoções anteriores: as que a auditoria registrou, para o próximo incremental
+    op.execute(f"""
+        INSERT INTO deleted_rows (table_name, record_id, deleted_at)
+        SELECT table_name, record_id, timestamp FROM audit_logs
+        WHERE action = 'DELETE' AND record_id IS NOT NULL
+          AND table_name IN ({", ".join(f"'{table}'" for table in TABLES)})
+    """)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_deleted_rows ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS record_deleted_rows()")
+    op.drop_index(op.f('ix_deleted_rows_deleted_at'), table_name='deleted_rows')
+    op.drop_table('deleted_rows')
@@ -4,7 +4,6 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime, timedelta
 import logging
-from copy import deepcopy
 
 from ....core.database import get_async_session
 from ....core.dependencies import require_admin_level, get_current_active_admin
@@ -66,9 +65,8 @@ async def update_admin(
     if admin_id == current_admin.id and admin_data.is_active == False:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot deactivate yourself")
 
-    old_admin_data = AdminResponse.model_validate(deepcopy(admin)).model_dump()
-    
     update_data = admin_data.model_dump(exclude_unset=True)
+    old_values = {field: getattr(admin, field) for field in update_data}
     
     for field, value in update_data.items():
         setattr(admin, field, value)
@@ -84,8 +82,8 @@ async def update_admin(
     await audit_service.log_action(
         session=session, action="UPDATE", table_name="admins",
         record_id=admin.id, admin_id=current_admin.id,
-        old_values=old_admin_data,
-        new_values=AdminResponse.model_validate(admin).model_dump()
+        old_values=old_values,
+        new_values=update_data
     )
     
     return AdminResponse.model_validate(admin)
@@ -111,7 +109,7 @@ async def delete_admin(
         if count_res.first() <= 1:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete the last super admin")
 
-    old_admin_data = AdminResponse.model_validate(deepcopy(admin)).model_dump()
+    old_admin_data = AdminResponse.model_validate(admin).model_dump()
 
     await session.delete(admin)
     await session.commit()
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+
+from ....core.database import get_async_session
+from ....core.dependencies import get_current_active_admin
+from ....models.admin import Admin
+from ....models.import_job import ImportJob
+from ....schemas.imports import ImportJobResponse
+from ....services.import_service import detect_import_format, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+from ....services.import_job_service import import_job_service, FINISHED_STATUSES
+
+router = APIRouter(prefix="/imports", tags=["Admin - Imports"])
+logger = logging.getLogger(__name__)
+
+
+async def _submit_import(
+    kind: str,
+    file: UploadFile,
+    preview_only: bool,
+    chunk_size: int,
+    session: AsyncSession,
+    current_admin: Admin
+) -> ImportJobResponse:
+    import_format = detect_import_format(file.filename, file.content_type)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported file format. Use CSV or NDJSON"
+        )
+
+    job = await import_job_service.submit(
+        session=session, kind=kind, upload=file, file_format=import_format,
+        chunk_size=chunk_size, preview_only=preview_only, admin_id=current_admin.id
+    )
+
+    logger.info(f"Import job {job.id} ({kind}) submitted by admin {current_admin.email}")
+    return ImportJobResponse.model_validate(job)
+
+
+@router.post("/players", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_players_import(
+    file: UploadFile = File(..., description="Arquivo CSV (com cabeçalho) ou NDJSON"),
+    preview_only: bool = Query(False, description="Apenas validar, sem gravar"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE, description="Linhas por bloco"),
+    session: AsyncSession = Depends(get_async_session),
+    current_admin: Admin = Depends(get_current_active_admin)
+):
+    """Enviar importação de jogadores para processamento em segundo plano"""
+    return await _submit_import("players", file, preview_only, chunk_size, session, current_admin)
+
+
+@router.post("/scores", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_scores_import(
+    file: UploadFile = File(..., description="Arquivo CSV (com cabeçalho) ou NDJSON"),
+    preview_only: bool = Query(False, description="Apenas validar, sem gravar"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE, description="Linhas por bloco"),
+    session: AsyncSession = Depends(get_async_session),
+    current_admin: Admin = Depends(get_current_active_admin)
+):
+    """Enviar importação de pontuações para processamento em segundo plano"""
+    return await _submit_import("scores", file, preview_only, chunk_size, session, current_admin)
+
+
+@router.get("/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_admin: Admin = Depends(get_current_active_admin)
+):
+    """Consultar status e progresso de um job de importação"""
+    
+    job = await session.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    
+    return ImportJobResponse.model_validate(job)
+
+
+@router.post("/{job_id}/cancel", response_model=ImportJobResponse)
+async def cancel_import_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_admin: Admin = Depends(get_current_active_admin)
+):
+    """Cancelar um job de importação pendente ou em execução"""
+    
+    job = await session.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    
+    if job.status in FINISHED_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Import job already finished with status '{job.status}'"
+        )
+    
+    job = await import_job_service.cancel(session, job_id)
+    
+    logger.info(f"Import job {job_id} cancellation requested by admin {current_admin.email}")
+    return ImportJobResponse.model_validate(job)
@@ -1,26 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlmodel import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from math import ceil
+from datetime import datetime
 import logging
-from copy import deepcopy
 
 from ....core.database import get_async_session
 from ....core.dependencies import get_current_active_admin
+from ....core.events import event_bus, SCORES_CHANGED
 from ....models.player import Player
+from ....models.score import Score
 from ....models.admin import Admin
 from ....schemas.player import (
     PlayerCreate, PlayerUpdate, PlayerResponse, PlayerListResponse,
     PlayerImportRequest, PlayerImportResponse
 )
 from ....services.audit_service import audit_service
-from ....services.import_service import import_service
+from ....services.import_service import (
+    import_service, detect_import_format, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+)
 
 router = APIRouter(prefix="/players", tags=["Admin - Players"])
 logger = logging.getLogger(__name__)
 
 
+async def _player_tournament_ids(session: AsyncSession, player_id: int) -> List[int]:
+    """Torneios em que o jogador tem pontuação"""
+    result = await session.exec(select(Score.tournament_id).where(Score.player_id == player_id).distinct())
+    return sorted(result.all())
+
+
 @router.get("/", response_model=PlayerListResponse)
 async def list_players(
     page: int = Query(1, ge=1, description="Página"),
@@ -143,9 +154,8 @@ async def update_player(
             detail="Player not found"
         )
 
-    old_player_data = PlayerResponse.model_validate(deepcopy(player)).model_dump()
-    
     update_data = player_data.model_dump(exclude_unset=True)
+    old_values = {field: getattr(player, field) for field in update_data}
     
     if "nickname" in update_data and update_data["nickname"] != player.nickname:
         existing_res = await session.exec(select(Player).where(
@@ -171,6 +181,7 @@ async def update_player(
     
     for field, value in update_data.items():
         setattr(player, field, value)
+    player.updated_at = datetime.utcnow()
     
     session.add(player)
     await session.commit()
@@ -181,9 +192,21 @@ async def update_player(
     await audit_service.log_action(
         session=session, action="UPDATE", table_name="players",
         record_id=player.id, admin_id=current_admin.id,
-        old_values=old_player_data,
-        new_values=PlayerResponse.model_validate(player).model_dump()
+        old_values=old_values,
+        new_values=update_data
     )
+    changed = {field for field, value in update_data.items() if value != old_values[field]}
+    tournament_ids = await _player_tournament_ids(session, player_id)
+    if "is_active" in changed:
+        # Entrar ou sair dos rankings muda as posições, mesmo nos torneios encerrados
+        payload = {"tournament_ids": None, "force_ids": tournament_ids}
+    elif "nickname" in changed:
+        # O apelido aparece em todos os rankings
+        payload = {"tournament_ids": None}
+    else:
+        # Os demais dados só aparecem nos rankings dos torneios do jogador (e no geral)
+        payload = {"tournament_ids": tournament_ids}
+    await event_bus.publish(SCORES_CHANGED, payload)
     
     return PlayerResponse.model_validate(player)
 
@@ -203,9 +226,10 @@ async def delete_player(
             detail="Player not found"
         )
 
-    old_player_data = PlayerResponse.model_validate(deepcopy(player)).model_dump()
+    old_values = {"is_active": player.is_active}
     
     player.is_active = False
+    player.updated_at = datetime.utcnow()
     session.add(player)
     await session.commit()
     
@@ -214,9 +238,13 @@ async def delete_player(
     await audit_service.log_action(
         session=session, action="DEACTIVATE", table_name="players",
         record_id=player.id, admin_id=current_admin.id,
-        old_values=old_player_data,
-        new_values=PlayerResponse.model_validate(player).model_dump()
+        old_values=old_values,
+        new_values={"is_active": player.is_active}
     )
+    # Sem o jogador, as posições dos demais mudam, mesmo nos torneios encerrados
+    await event_bus.publish(SCORES_CHANGED, {
+        "tournament_ids": None, "force_ids": await _player_tournament_ids(session, player_id)
+    })
     
     return
 
@@ -249,3 +277,42 @@ async def import_players(
         previewed=result["previewed"],
         message=message
     )
+
+
+@router.post("/import/stream")
+async def import_players_stream(
+    file: UploadFile = File(..., description="Arquivo CSV (com cabeçalho) ou NDJSON"),
+    preview_only: bool = Query(False, description="Apenas validar, sem gravar"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE, description="Linhas por bloco"),
+    session: AsyncSession = Depends(get_async_session),
+    current_admin: Admin = Depends(get_current_active_admin)
+):
+    """Importar jogadores a partir de um arquivo, em blocos, reportando o progresso em NDJSON."""
+
+    import_format = detect_import_format(file.filename, file.content_type)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported file format. Use CSV or NDJSON"
+        )
+
+    # Um bloco com erro faz rollback da sessão e expira `current_admin`: ler antes
+    admin_id, filename = current_admin.id, file.filename
+
+    async def progress_events():
+        progress = None
+        async for progress in import_service.stream_import(
+            session=session, kind="players", read_block=file.read, fmt=import_format,
+            chunk_size=chunk_size, preview_only=preview_only
+        ):
+            yield progress.model_dump_json() + "\n"
+
+        if not preview_only and progress and progress.success > 0:
+            await audit_service.log_action(
+                session=session, action="IMPORT", table_name="players",
+                admin_id=admin_id,
+                new_values={"count": progress.success, "errors": progress.failed, "file": filename}
+            )
+
+    logger.info(f"Streaming players import started: {file.filename} by admin {current_admin.email}")
+    return StreamingResponse(progress_events(), media_type="application/x-ndjson")
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlmodel import select, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from datetime import datetime
 import logging
-from copy import deepcopy
 
 from ....core.database import get_async_session
 from ....core.dependencies import get_current_active_admin
+from ....core.events import event_bus, SCORES_CHANGED
 from ....models.admin import Admin
 from ....models.score import Score
 from ....models.player import Player
@@ -17,7 +18,9 @@ from ....schemas.score import (
     ScoreImportRequest, ScoreImportResponse, ScoreWithDetails
 )
 from ....services.audit_service import audit_service
-from ....services.import_service import import_service
+from ....services.import_service import (
+    import_service, detect_import_format, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+)
 
 router = APIRouter(prefix="/scores", tags=["Admin - Scores"])
 logger = logging.getLogger(__name__)
@@ -119,6 +122,8 @@ async def create_score(
         record_id=score.id, admin_id=current_admin.id,
         new_values=ScoreResponse.model_validate(score).model_dump()
     )
+    # Correção do admin: vale também para torneios já encerrados (congelados)
+    await event_bus.publish(SCORES_CHANGED, {"tournament_ids": [score.tournament_id], "force_ids": [score.tournament_id]})
     
     return ScoreResponse.model_validate(score)
 
@@ -136,9 +141,8 @@ async def update_score(
     if not score:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Score not found")
 
-    old_score_data = ScoreResponse.model_validate(deepcopy(score)).model_dump()
-    
     update_data = score_data.model_dump(exclude_unset=True)
+    old_values = {field: getattr(score, field) for field in update_data}
     for field, value in update_data.items():
         setattr(score, field, value)
     
@@ -153,9 +157,11 @@ async def update_score(
     await audit_service.log_action(
         session=session, action="UPDATE", table_name="scores",
         record_id=score.id, admin_id=current_admin.id,
-        old_values=old_score_data,
-        new_values=ScoreResponse.model_validate(score).model_dump()
+        old_values=old_values,
+        new_values=update_data
     )
+    # Correção do admin: vale também para torneios já encerrados (congelados)
+    await event_bus.publish(SCORES_CHANGED, {"tournament_ids": [score.tournament_id], "force_ids": [score.tournament_id]})
     
     return ScoreResponse.model_validate(score)
 
@@ -172,7 +178,7 @@ async def delete_score(
     if not score:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Score not found")
 
-    old_score_data = ScoreResponse.model_validate(deepcopy(score)).model_dump()
+    old_score_data = ScoreResponse.model_validate(score).model_dump()
     
     await session.delete(score)
     await session.commit()
@@ -184,6 +190,8 @@ async def delete_score(
         record_id=score_id, admin_id=current_admin.id,
         old_values=old_score_data
     )
+    tournament_ids = [old_score_data["tournament_id"]]
+    await event_bus.publish(SCORES_CHANGED, {"tournament_ids": tournament_ids, "force_ids": tournament_ids})
     
     return
 
@@ -208,6 +216,7 @@ async def import_scores(
             admin_id=current_admin.id,
             new_values={"count": result["success"], "errors": len(result["errors"])}
         )
+        await event_bus.publish(SCORES_CHANGED, {"tournament_ids": sorted({item.tournament_id for item in import_data.scores})})
 
     message = f"Preview completed" if import_data.preview_only else f"Import completed: {result['success']} scores created"
     
@@ -217,3 +226,43 @@ async def import_scores(
         previewed=result["previewed"],
         message=message
     )
+
+
+@router.post("/import/stream")
+async def import_scores_stream(
+    file: UploadFile = File(..., description="Arquivo CSV (com cabeçalho) ou NDJSON"),
+    preview_only: bool = Query(False, description="Apenas validar, sem gravar"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE, description="Linhas por bloco"),
+    session: AsyncSession = Depends(get_async_session),
+    current_admin: Admin = Depends(get_current_active_admin)
+):
+    """Importar pontuações a partir de um arquivo, em blocos, reportando o progresso em NDJSON."""
+
+    import_format = detect_import_format(file.filename, file.content_type)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported file format. Use CSV or NDJSON"
+        )
+
+    # Um bloco com erro faz rollback da sessão e expira `current_admin`: ler antes
+    admin_id, filename = current_admin.id, file.filename
+
+    async def progress_events():
+        progress = None
+        async for progress in import_service.stream_import(
+            session=session, kind="scores", read_block=file.read, fmt=import_format,
+            chunk_size=chunk_size, preview_only=preview_only, admin_id=admin_id
+        ):
+            yield progress.model_dump_json() + "\n"
+
+        if not preview_only and progress and progress.success > 0:
+            await audit_service.log_action(
+                session=session, action="IMPORT", table_name="scores",
+                admin_id=admin_id,
+                new_values={"count": progress.success, "errors": progress.failed, "file": filename}
+            )
+            await event_bus.publish(SCORES_CHANGED, {"tournament_ids": None})
+
+    logger.info(f"Streaming scores import started: {file.filename} by admin {current_admin.email}")
+    return StreamingResponse(progress_events(), media_type="application/x-ndjson")
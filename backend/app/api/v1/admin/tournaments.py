@@ -4,10 +4,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime
 import logging
-from copy import deepcopy
 
 from ....core.database import get_async_session
 from ....core.dependencies import get_current_active_admin
+from ....core.events import event_bus, SCORES_CHANGED
 from ....models.admin import Admin
 from ....models.tournament import Tournament
 from ....models.score import Score
@@ -16,6 +16,7 @@ from ....schemas.tournament import (
     TournamentListResponse, TournamentConfig
 )
 from ....services.audit_service import audit_service
+from ....services.tournament_position_service import tournament_position_service
 from ....services.notification_service import notification_service, NotificationType
 
 router = APIRouter(prefix="/tournaments", tags=["Admin - Tournaments"])
@@ -154,9 +155,8 @@ async def update_tournament(
             detail="Tournament not found"
         )
     
-    old_tournament_data = TournamentResponse.model_validate(deepcopy(tournament)).model_dump()
-
     update_data = tournament_data.model_dump(exclude_unset=True)
+    old_values = {field: getattr(tournament, field) for field in update_data}
     
     start_date = update_data.get('start_date', tournament.start_date)
     end_date = update_data.get('end_date', tournament.end_date)
@@ -198,13 +198,38 @@ async def update_tournament(
         table_name="tournaments",
         record_id=tournament.id,
         admin_id=current_admin.id,
-        old_values=old_tournament_data,
-        new_values=TournamentResponse.model_validate(tournament).model_dump()
+        old_values=old_values,
+        new_values=update_data
     )
+    # Os dados do torneio fazem parte da resposta do seu ranking
+    await event_bus.publish(SCORES_CHANGED, {"tournament_ids": [tournament.id]})
     
     return TournamentResponse.model_validate(tournament)
 
 
+@router.post("/{tournament_id}/rankings/refresh", status_code=status.HTTP_204_NO_CONTENT)
+async def refresh_tournament_rankings(
+    tournament_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_admin: Admin = Depends(get_current_active_admin)
+):
+    """Recalcular as posições do torneio, mesmo que já esteja congelado (encerrado)"""
+    
+    tournament = await session.get(Tournament, tournament_id)
+    if not tournament:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tournament not found"
+        )
+    
+    await tournament_position_service.recompute([tournament_id], force=True)
+    
+    logger.info(f"Tournament {tournament_id} rankings refreshed by admin {current_admin.email}")
+    
+    # Os rankings em cache foram montados com as posições anteriores
+    await event_bus.publish(SCORES_CHANGED, {"tournament_ids": [tournament_id]})
+
+
 @router.delete("/{tournament_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_tournament(
     tournament_id: int,
@@ -220,7 +245,7 @@ async def delete_tournament(
             detail="Tournament not found"
         )
     
-    old_tournament_data = TournamentResponse.model_validate(deepcopy(tournament)).model_dump()
+    old_tournament_data = TournamentResponse.model_validate(tournament).model_dump()
 
     scores_count_res = await session.exec(
         select(func.count(Score.id)).where(Score.tournament_id == tournament_id)
@@ -247,5 +272,6 @@ async def delete_tournament(
         admin_id=current_admin.id,
         old_values=old_tournament_data
     )
+    await event_bus.publish(SCORES_CHANGED, {"tournament_ids": [tournament_id]})
     
     return
\ No newline at end of file
@@ -4,13 +4,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import logging
 
-from ....core.database import get_async_session
-from ....core.security import verify_password, create_token_response, verify_token
-from ....models.admin import Admin
-from ....schemas.auth import LoginRequest, LoginResponse, TokenResponse, RefreshTokenRequest, AdminResponse
-from ....services.audit_service import audit_service
-from ....core.cache import cache_service
-from ....core.dependencies import security
+from ...core.database import get_async_session
+from ...core.security import verify_password, create_token_response, verify_token
+from ...models.admin import Admin
+from ...schemas.auth import LoginRequest, LoginResponse, TokenResponse, RefreshTokenRequest, AdminResponse
+from ...services.audit_service import audit_service
+from ...core.cache import cache_service
+from ...core.dependencies import security
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 logger = logging.getLogger(__name__)
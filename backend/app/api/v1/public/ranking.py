@@ -1,91 +1,258 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
 import logging
 
-from ....core.database import get_async_session
-from ....schemas.ranking import RankingResponse, TournamentRanking, PlayerStats, GeneralStats
+from ....core.database import get_async_session, AsyncSessionLocal
+from ....core.compression import precompressed_json
+from ....core.http_cache import CacheValidators, conditional_json, ranking_versions
+from ....models.player import Player
+from ....models.tournament import Tournament
+from ....schemas.ranking import RankingResponse, TournamentRanking, PlayerStats, GeneralStats, PlayerRankingHistory
 from ....services.ranking_service import ranking_service
+from ....services.ranking_history_service import ranking_history_service
+from ....services.stats_service import stats_service
+from ....services.ranking_stream_service import ranking_stream_service, GENERAL_CHANNEL, tournament_channel
 
 router = APIRouter(prefix="/ranking", tags=["Public - Ranking"])
 logger = logging.getLogger(__name__)
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _as_utc(moment: datetime) -> datetime:
+    """Datas com fuso viram UTC sem fuso, como as gravadas no banco"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
 
 @router.get("/", response_model=RankingResponse)
 async def get_general_ranking(
+    request: Request,
     page: int = Query(1, ge=1, description="Página"),
     size: int = Query(10, ge=1, le=100, description="Itens por página"),
+    as_of: Optional[datetime] = Query(None, description="Ranking nesta data (UTC)"),
     session: AsyncSession = Depends(get_async_session)
 ):
-    """Obter ranking geral (todos os torneios) a partir do serviço de ranking."""
-    ranking_data = await ranking_service.get_general_ranking(session, page, size)
-    return RankingResponse.model_validate(ranking_data)
+    """
+    Obter ranking geral (todos os torneios) a partir do serviço de ranking.
+
+    O ETag vem da versão do ranking: com `If-None-Match` igual, a resposta
+    é 304 sem consultar banco nem cache. O corpo é serializado e comprimido
+    uma vez por versão e servido pronto do cache; `response_model` só documenta
+    o formato, o dict do serviço já o segue e não é validado de novo.
+
+    Com `as_of` no passado, o ranking daquela data é reconstruído a partir do
+    snapshot mais próximo (sem melhor/pior score por jogador).
+    """
+    if as_of is not None:
+        as_of = _as_utc(as_of)
+        if as_of < datetime.utcnow():
+            ranking = await ranking_history_service.get_general_ranking_as_of(session, as_of, page, size)
+            if ranking is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="No ranking history for this date"
+                )
+            return conditional_json(request, ranking)
+
+    version = ranking_versions.general()
+    validators = CacheValidators.for_version("general", version)
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+
+    async def load():
+        return await ranking_service.get_general_ranking(session, page, size)
+
+    return await precompressed_json(request, f"general:{version}:{page}:{size}", load, validators)
+
+
+@router.get("/stream")
+async def stream_general_ranking():
+    """
+    Mudanças do ranking geral em tempo real (Server-Sent Events).
+
+    Cada evento `ranking` traz as entradas cujas posições ou pontos mudaram
+    (com `previous_position`) e os jogadores que saíram do ranking.
+    """
+    return StreamingResponse(
+        ranking_stream_service.stream(GENERAL_CHANNEL), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+@router.get("/tournament/{tournament_id}/stream")
+async def stream_tournament_ranking(tournament_id: int):
+    """Mudanças do ranking de um torneio em tempo real (Server-Sent Events)."""
+    # Sessão curta: uma dependência de sessão ficaria aberta enquanto durar o stream
+    async with AsyncSessionLocal() as session:
+        tournament = await session.get(Tournament, tournament_id)
+    if not tournament:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tournament not found"
+        )
+    return StreamingResponse(
+        ranking_stream_service.stream(tournament_channel(tournament_id)), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+@router.websocket("/live")
+async def live_leaderboard(websocket: WebSocket):
+    """
+    Placar ao vivo por WebSocket.
+
+    O cliente envia `{"action": "subscribe", "tournament_id": 1, "page": 1,
+    "size": 10}` e recebe um frame `snapshot` com a página e depois apenas
+    frames `diff` (entradas novas, campos alterados e jogadores que saíram da
+    página). Um novo `subscribe` troca a página; `unsubscribe` interrompe o
+    envio.
+    """
+    await websocket.accept()
+    subscription = None
+    sender = None
+
+    async def send_frames(sink):
+        while True:
+            await websocket.send_text(await sink.queue.get())
+            if sink.overflowed and sink.queue.empty():
+                # Cliente lento: pedir que se inscreva de novo para receber um snapshot
+                await websocket.send_json({"type": "resync"})
+                return
+
+    async def unsubscribe():
+        nonlocal subscription, sender
+        if sender is not None:
+            # Esperar o cancelamento também recolhe a exceção de um envio que falhou
+            # (ex.: cliente desconectado), que de outro modo só apareceria no log
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            sender = None
+        if subscription is not None:
+            ranking_stream_service.unsubscribe_view(*subscription)
+            subscription = None
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            action = message.get("action") if isinstance(message, dict) else None
+
+            if action == "subscribe":
+                try:
+                    tournament_id = int(message["tournament_id"])
+                    page = int(message.get("page", 1))
+                    size = int(message.get("size", 10))
+                except (KeyError, TypeError, ValueError):
+                    await websocket.send_json({"type": "error", "detail": "tournament_id, page and size must be integers"})
+                    continue
+                if page < 1 or not 1 <= size <= 100:
+                    await websocket.send_json({"type": "error", "detail": "page must be >= 1 and size between 1 and 100"})
+                    continue
+                async with AsyncSessionLocal() as session:
+                    tournament = await session.get(Tournament, tournament_id)
+                if not tournament:
+                    await websocket.send_json({"type": "error", "detail": "Tournament not found"})
+                    continue
+
+                await unsubscribe()
+                subscription = await ranking_stream_service.subscribe_view(tournament_id, page, size)
+                sender = asyncio.create_task(send_frames(subscription[1]))
+            elif action == "unsubscribe":
+                await unsubscribe()
+            else:
+                await websocket.send_json({"type": "error", "detail": "Unknown action"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await unsubscribe()
 
 
 @router.get("/tournament/{tournament_id}", response_model=TournamentRanking)
 async def get_tournament_ranking(
+    request: Request,
     tournament_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Obter ranking de um torneio específico a partir do serviço de ranking."""
-    ranking_data = await ranking_service.get_tournament_ranking(session, tournament_id, page, size)
-    if not ranking_data:
+    version = ranking_versions.tournament(tournament_id)
+    validators = CacheValidators.for_version(f"tournament{tournament_id}", version)
+    # Ainda não se sabe se existe: `If-None-Match: *` não vale
+    if validators.is_not_modified(request, exists=False):
+        return validators.not_modified()
+
+    async def load():
+        return await ranking_service.get_tournament_ranking(session, tournament_id, page, size)
+
+    cached = await precompressed_json(request, f"tournament:{tournament_id}:{version}:{page}:{size}", load, validators)
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tournament not found"
         )
-    return TournamentRanking.model_validate(ranking_data)
+    return cached
 
 
 @router.get("/player/{player_id}/stats", response_model=PlayerStats)
 async def get_player_stats(
+    request: Request,
+    response: Response,
     player_id: int,
     session: AsyncSession = Depends(get_async_session)
 ):
     """Obter estatísticas de um jogador a partir do serviço de ranking."""
+    validators = CacheValidators.for_version(f"player{player_id}", ranking_versions.general())
+    # Ainda não se sabe se existe: `If-None-Match: *` não vale
+    if validators.is_not_modified(request, exists=False):
+        return validators.not_modified()
     stats_data = await ranking_service.get_player_stats(session, player_id)
     if not stats_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Player not found or is inactive"
         )
+    validators.apply(response)
     return stats_data
 
+@router.get("/player/{player_id}/history", response_model=PlayerRankingHistory)
+async def get_player_ranking_history(
+    request: Request,
+    player_id: int,
+    days: int = Query(30, ge=1, le=365, description="Dias de histórico"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Posição do jogador no ranking geral em cada snapshot dos últimos `days` dias e agora."""
+    player = await session.get(Player, player_id)
+    if not player or not player.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Player not found or is inactive"
+        )
+    history = await ranking_history_service.get_player_history(
+        session, player_id, datetime.utcnow() - timedelta(days=days)
+    )
+    return conditional_json(request, {
+        "player_id": player.id,
+        "player_name": player.name,
+        "player_nickname": player.nickname,
+        "history": history,
+    })
+
 # O endpoint de estatísticas gerais pode permanecer aqui por enquanto,
 # ou ser movido para um `SystemStatsService` no futuro.
 @router.get("/stats", response_model=GeneralStats)
-async def get_general_stats(session: AsyncSession = Depends(get_async_session)):
-    # ... (a implementação atual pode ser mantida ou movida para um serviço)
-    from sqlmodel import text
-    stats_query = text("""
-        SELECT 
-            COUNT(DISTINCT p.id) as total_players,
-            COUNT(DISTINCT t.id) as total_tournaments,
-            COUNT(s.id) as total_scores,
-            AVG(s.points) as average_score,
-            MAX(s.points) as highest_score,
-            MIN(s.points) as lowest_score
-        FROM players p
-        LEFT JOIN scores s ON p.id = s.player_id
-        LEFT JOIN tournaments t ON s.tournament_id = t.id
-        WHERE p.is_active = true
-    """)
-    result = (await session.execute(stats_query)).first()
-
-    active_tournaments_query = text("SELECT COUNT(*) FROM tournaments t WHERE t.end_date >= NOW()")
-    active_tournaments = (await session.execute(active_tournaments_query)).scalar_one_or_none() or 0
-    
+async def get_general_stats(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """Estatísticas gerais, lidas da linha de contadores mantida pelo banco."""
+    stats = await stats_service.get_general_stats(session)
     logger.info("General stats requested")
     
-    return GeneralStats(
-        total_players=result.total_players or 0,
-        total_tournaments=result.total_tournaments or 0,
-        active_tournaments=active_tournaments,
-        total_scores=result.total_scores or 0,
-        average_score=float(result.average_score or 0),
-        highest_score=float(result.highest_score or 0),
-        lowest_score=float(result.lowest_score or 0),
-        positive_scores=0, 
-        negative_scores=0
-    )
\ No newline at end of file
+    # Torneios ativos dependem do relógio, então o ETag é o hash do conteúdo
+    return conditional_json(request, stats)
\ No newline at end of file
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlmodel import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 import logging
 
-from ....core.database import get_async_session
+from ....core.database import get_async_session, rows_as_dicts
+from ....core.http_cache import conditional_json
 from ....models.player import Player
 from ....models.tournament import Tournament
+from ....services.tournament_position_service import tournament_position_service
 from ....schemas.search import (
     SearchResult, PlayerSearchResult, TournamentSearchResult,
     SearchResponse, SearchSuggestion
@@ -17,8 +19,16 @@ router = APIRouter(prefix="/search", tags=["Public - Search"])
 logger = logging.getLogger(__name__)
 
 
-async def _search_players(query: str, limit: int, session: AsyncSession) -> List[PlayerSearchResult]:
-    """Helper function to search for players efficiently."""
+async def _search_players(query: str, limit: int, session: AsyncSession) -> List[Dict]:
+    """
+    Helper function to search for players efficiently.
+
+    As linhas já têm o formato de PlayerSearchResult e viram dicts direto,
+    sem validação por linha; a rota serializa sem passar pelo response_model.
+    A melhor colocação em torneios vem de tournament_rankings, pelo índice
+    de player_id.
+    """
+    await tournament_position_service.flush()
     search_filter = f"%{query}%"
     players_query = text("""
         WITH player_ranks AS (
@@ -34,19 +44,20 @@ async def _search_players(query: str, limit: int, session: AsyncSession) -> List
             p.id, p.name, p.nickname, p.avatar_url,
             COALESCE(pr.total_tournaments, 0) as total_tournaments,
             COALESCE(pr.total_points, 0) as total_points,
-            COALESCE(pr.position, 0) as position
+            COALESCE(pr.position, 0) as position,
+            (SELECT MIN(tr.position) FROM tournament_rankings tr WHERE tr.player_id = p.id) as best_position
         FROM players p
         LEFT JOIN player_ranks pr ON p.id = pr.player_id
         WHERE p.is_active = true
         AND (p.name ILIKE :query OR p.nickname ILIKE :query)
         ORDER BY total_points DESC
         LIMIT :limit
-    ")
+    """)
     
     result = await session.execute(players_query, {"query": search_filter, "limit": limit})
-    return [PlayerSearchResult.model_validate(row, from_attributes=True) for row in result.mappings()]
+    return rows_as_dicts(result)
 
-async def _search_tournaments(query: str, limit: int, session: AsyncSession) -> List[TournamentSearchResult]:
+async def _search_tournaments(query: str, limit: int, session: AsyncSession) -> List[Dict]:
     """Helper function to search for tournaments efficiently."""
     search_filter = f"%{query}%"
     tournaments_query = text("""
@@ -60,14 +71,15 @@ async def _search_tournaments(query: str, limit: int, session: AsyncSession) ->
         GROUP BY t.id, t.name, t.description, t.start_date, t.end_date
         ORDER BY t.start_date DESC
         LIMIT :limit
-    ")
+    """)
     
     result = await session.execute(tournaments_query, {"query": search_filter, "limit": limit})
-    return [TournamentSearchResult.model_validate(row, from_attributes=True) for row in result.mappings()]
+    return rows_as_dicts(result)
 
 
 @router.get("/", response_model=SearchResponse)
 async def search_all(
+    request: Request,
     query: str = Query(..., min_length=2, description="Termo de busca"),
     limit: int = Query(10, ge=1, le=50, description="Limite de resultados"),
     session: AsyncSession = Depends(get_async_session)
@@ -79,16 +91,18 @@ async def search_all(
     
     logger.info(f"Search performed: '{query}' - {len(player_results)} players, {len(tournament_results)} tournaments")
     
-    return SearchResponse(
-        query=query,
-        players=player_results,
-        tournaments=tournament_results,
-        total_results=len(player_results) + len(tournament_results)
-    )
+    # Os resultados dependem de cadastros e do relógio: ETag pelo conteúdo
+    return conditional_json(request, {
+        "query": query,
+        "players": player_results,
+        "tournaments": tournament_results,
+        "total_results": len(player_results) + len(tournament_results)
+    })
 
 
 @router.get("/players", response_model=List[PlayerSearchResult])
 async def search_players(
+    request: Request,
     query: str = Query(..., min_length=2, description="Termo de busca"),
     limit: int = Query(20, ge=1, le=100, description="Limite de resultados"),
     session: AsyncSession = Depends(get_async_session)
@@ -96,11 +110,12 @@ async def search_players(
     """Busca específica por jogadores"""
     players = await _search_players(query, limit, session)
     logger.info(f"Player search: '{query}' - {len(players)} results")
-    return players
+    return conditional_json(request, players)
 
 
 @router.get("/tournaments", response_model=List[TournamentSearchResult])
 async def search_tournaments(
+    request: Request,
     query: str = Query(..., min_length=2, description="Termo de busca"),
     active_only: bool = Query(False, description="Apenas torneios ativos"),
     limit: int = Query(20, ge=1, le=100, description="Limite de resultados"),
@@ -123,17 +138,18 @@ async def search_tournaments(
         GROUP BY t.id, t.name, t.description, t.start_date, t.end_date
         ORDER BY t.start_date DESC
         LIMIT :limit
-    ")
+    """)
     
     result = await session.execute(tournaments_query, {"query": search_filter, "limit": limit})
-    tournaments = [TournamentSearchResult.model_validate(row, from_attributes=True) for row in result.mappings()]
+    tournaments = rows_as_dicts(result)
     
     logger.info(f"Tournament search: '{query}' - {len(tournaments)} results")
-    return tournaments
+    return conditional_json(request, tournaments)
 
 
 @router.get("/suggestions", response_model=List[SearchSuggestion])
 async def get_search_suggestions(
+    request: Request,
     query: str = Query(..., min_length=1, description="Termo de busca"),
     limit: int = Query(5, ge=1, le=10, description="Limite de sugestões"),
     session: AsyncSession = Depends(get_async_session)
@@ -142,31 +158,30 @@ async def get_search_suggestions(
     search_filter = f"{query}%"
     
     player_query = text("""
-        (SELECT name as text, 'player' as type FROM players WHERE is_active = true AND name ILIKE :query)
+        (SELECT name as text, 'player' as type, 'name' as field FROM players WHERE is_active = true AND name ILIKE :query)
         UNION
-        (SELECT nickname as text, 'player' as type FROM players WHERE is_active = true AND nickname ILIKE :query)
+        (SELECT nickname as text, 'player' as type, 'nickname' as field FROM players WHERE is_active = true AND nickname ILIKE :query)
         LIMIT :limit
-    ")
+    """)
     player_res = await session.execute(player_query, {"query": search_filter, "limit": limit})
     
     tournament_query = text("""
-        SELECT name as text, 'tournament' as type FROM tournaments WHERE name ILIKE :query
+        SELECT name as text, 'tournament' as type, 'name' as field FROM tournaments WHERE name ILIKE :query
         LIMIT :limit
-    ")
+    """)
     tournament_res = await session.execute(tournament_query, {"query": search_filter, "limit": limit})
 
-    suggestions = [SearchSuggestion(text=row.text, type=row.type) for row in player_res.mappings()] \
-                  + [SearchSuggestion(text=row.text, type=row.type) for row in tournament_res.mappings()]
+    suggestions = rows_as_dicts(player_res) + rows_as_dicts(tournament_res)
 
     # Remove duplicates and limit
     seen = set()
     unique_suggestions = []
     for s in suggestions:
-        if s.text.lower() not in seen:
+        if s["text"].lower() not in seen:
             unique_suggestions.append(s)
-            seen.add(s.text.lower())
+            seen.add(s["text"].lower())
         if len(unique_suggestions) >= limit:
             break
 
     logger.info(f"Search suggestions for '{query}': {len(unique_suggestions)} results")
-    return unique_suggestions
+    return conditional_json(request, unique_suggestions)
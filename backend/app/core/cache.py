@@ -4,11 +4,12 @@ Sistema de cache com Redis para otimização de performance
 """
 import json
 import pickle
-from typing import Any, Optional, Union, Dict, List
+from typing import Any, Optional, Union, Dict, List, Tuple
 from datetime import datetime, timedelta
 import logging
 import hashlib
 import uuid
+from collections import OrderedDict
 
 try:
     import redis.asyncio as redis
@@ -18,6 +19,7 @@ except ImportError:
     redis = None
 
 from .config import settings
+from .responses import dumps
 
 logger = logging.getLogger(__name__)
 
@@ -29,12 +31,16 @@ class CacheService:
         self.redis_client = None
         self.memory_cache = {}
         self.default_ttl = 300  # 5 minutos
+        self.memory_purge_size = 1000
         self._initialize_redis()
     
     def _initialize_redis(self):
         if not REDIS_AVAILABLE:
             logger.warning("Redis library not found, using memory cache fallback.")
             return
+        if not settings.redis_url:
+            logger.info("Redis URL not configured, using memory cache fallback.")
+            return
         try:
             self.redis_client = redis.from_url(settings.redis_url, decode_responses=True)
             logger.info("Redis cache connection configured.")
@@ -46,7 +52,8 @@ class CacheService:
         return f"{prefix}:{key}"
 
     def _serialize(self, value: Any) -> str:
-        return json.dumps(value, default=str)
+        # Mesma serialização das respostas: um hit devolve o que um miss devolveria
+        return dumps(value).decode()
 
     def _deserialize(self, value: str) -> Any:
         return json.loads(value)
@@ -59,11 +66,20 @@ class CacheService:
         if self.redis_client:
             await self.redis_client.setex(cache_key, ttl, serialized_value)
         else:
+            if len(self.memory_cache) >= self.memory_purge_size:
+                self._purge_expired()
             self.memory_cache[cache_key] = {
                 'value': serialized_value,
                 'expires_at': datetime.utcnow() + timedelta(seconds=ttl)
             }
 
+    def _purge_expired(self):
+        """Remover entradas expiradas que não serão mais lidas (ex.: versões antigas do ranking)"""
+        now = datetime.utcnow()
+        self.memory_cache = {key: item for key, item in self.memory_cache.items() if item['expires_at'] > now}
+        # Evitar purgas a cada set quando o cache está cheio de entradas válidas
+        self.memory_purge_size = max(1000, 2 * len(self.memory_cache))
+
     async def get(self, key: str) -> Optional[Any]:
         cache_key = self._generate_key(key)
         if self.redis_client:
@@ -98,31 +114,52 @@ class CacheService:
 class RankingCacheManager:
     def __init__(self, cache: CacheService):
         self.cache = cache
+        self._encoded_bodies: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
 
-    async def get_general_ranking(self, page: int, size: int) -> Optional[Dict]:
-        key = f"general_ranking:{page}:{size}"
+    # As chaves incluem a versão do ranking (ver core.http_cache.RankingVersions):
+    # uma alteração muda a versão e as entradas antigas apenas expiram.
+
+    async def get_general_ranking(self, page: int, size: int, version: int = 0) -> Optional[Dict]:
+        key = f"general_ranking:{version}:{page}:{size}"
         return await self.cache.get(key)
 
-    async def set_general_ranking(self, data: Dict, page: int, size: int, ttl: int = 300):
-        key = f"general_ranking:{page}:{size}"
+    async def set_general_ranking(self, data: Dict, page: int, size: int, ttl: int = 300, version: int = 0):
+        key = f"general_ranking:{version}:{page}:{size}"
         await self.cache.set(key, data, ttl)
 
-    async def get_tournament_ranking(self, tournament_id: int, page: int, size: int) -> Optional[Dict]:
-        key = f"tournament_ranking:{tournament_id}:{page}:{size}"
+    async def get_tournament_ranking(self, tournament_id: int, page: int, size: int, version: int = 0) -> Optional[Dict]:
+        key = f"tournament_ranking:{tournament_id}:{version}:{page}:{size}"
         return await self.cache.get(key)
 
-    async def set_tournament_ranking(self, tournament_id: int, data: Dict, page: int, size: int, ttl: int = 600):
-        key = f"tournament_ranking:{tournament_id}:{page}:{size}"
+    async def set_tournament_ranking(self, tournament_id: int, data: Dict, page: int, size: int, ttl: int = 600, version: int = 0):
+        key = f"tournament_ranking:{tournament_id}:{version}:{page}:{size}"
         await self.cache.set(key, data, ttl)
 
-    async def get_player_stats(self, player_id: int) -> Optional[Dict]:
-        key = f"player_stats:{player_id}"
+    async def get_player_stats(self, player_id: int, version: int = 0) -> Optional[Dict]:
+        key = f"player_stats:{version}:{player_id}"
         return await self.cache.get(key)
 
-    async def set_player_stats(self, player_id: int, data: Dict, ttl: int = 300):
-        key = f"player_stats:{player_id}"
+    async def set_player_stats(self, player_id: int, data: Dict, ttl: int = 300, version: int = 0):
+        key = f"player_stats:{version}:{player_id}"
         await self.cache.set(key, data, ttl)
 
+    # Corpos HTTP prontos (JSON serializado e já comprimido) ficam em memória
+    # no worker, em LRU: são bytes quentes, servidos sem passar por Redis nem
+    # serialização. A chave também carrega a versão, que avança ao menos a
+    # cada `ranking_version_max_age`: nenhum corpo é servido por mais tempo.
+
+    def get_encoded_body(self, key: str, encoding: str) -> Optional[bytes]:
+        body = self._encoded_bodies.get((key, encoding))
+        if body is not None:
+            self._encoded_bodies.move_to_end((key, encoding))
+        return body
+
+    def set_encoded_body(self, key: str, encoding: str, body: bytes):
+        self._encoded_bodies[(key, encoding)] = body
+        self._encoded_bodies.move_to_end((key, encoding))
+        while len(self._encoded_bodies) > settings.precompressed_cache_size:
+            self._encoded_bodies.popitem(last=False)
+
     async def invalidate_all_rankings(self):
         # Esta é uma operação complexa e cara, especialmente sem Redis.
         # Para simplificar, a invalidação pode ser feita pela expiração natural (TTL baixo)
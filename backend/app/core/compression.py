@@ -0,0 +1,253 @@
+"""
+Compressão de respostas HTTP (gzip, brotli e zstd)
+"""
+import gzip
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import RankingCache
+from .config import settings
+from .responses import dumps
+
+# Em ordem de preferência do servidor (desempate entre pesos iguais)
+SUPPORTED_ENCODINGS: List[str] = (
+    (["zstd"] if ZSTD_AVAILABLE else [])
+    + (["br"] if BROTLI_AVAILABLE else [])
+    + ["gzip"]
+)
+
+# Respostas de longa duração que precisam chegar ao cliente evento a evento
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Escolher a codificação pelo Accept-Encoding (pesos q), ou None para identity"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.compression_zstd_level).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_quality)
+    # mtime=0 deixa a saída determinística para o mesmo corpo
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0)
+
+
+class _StreamCompressor:
+    """Compressão incremental; cada pedaço é descarregado para não atrasar o cliente"""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+            self._process = compressor.compress
+            self._flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = compressor.flush
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+            self._process = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+            self._process = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        return self._process(data) + (self._finish() if final else self._flush())
+
+
+def etag_for_encoding(etag: str, encoding: str) -> str:
+    """ETag forte de uma representação comprimida: '"x"' vira '"x-br"'"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def strip_etag_encoding(etag: str) -> str:
+    """Inverso de `etag_for_encoding`, para comparar com o ETag do recurso"""
+    for encoding in ("gzip", "br", "zstd"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas a partir de `minimum_size` bytes com a codificação
+    negociada. Respostas que já trazem Content-Encoding (corpos
+    pré-comprimidos) e Server-Sent Events passam intactas; respostas em
+    streaming são comprimidas pedaço a pedaço. Toda resposta que poderia ser
+    comprimida leva `Vary: Accept-Encoding`, mesmo quando sai sem compressão
+    (corpo pequeno ou cliente sem Accept-Encoding), para que caches
+    compartilhados não a sirvam a clientes com outro Accept-Encoding.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding"))
+        responder = _CompressionResponder(send, encoding, self.minimum_size, headers.get("if-none-match", ""))
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: Optional[str], minimum_size: int, if_none_match: str):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.if_none_match = if_none_match
+        self.start_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.compressor: Optional[_StreamCompressor] = None
+
+    async def send(self, message: Message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Segurar o início até saber se o corpo será comprimido
+            self.start_message = message
+            headers = MutableHeaders(raw=message["headers"])
+            negotiable = not (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(UNCOMPRESSED_MEDIA_TYPES)
+                or message["status"] == 204
+            )
+            if negotiable:
+                headers.add_vary_header("Accept-Encoding")
+            self.passthrough = not negotiable or self.encoding is None or message["status"] == 304
+            if message["status"] == 304:
+                self._tag_not_modified(headers)
+            return
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.started:
+            if self.compressor is not None:
+                message = {**message, "body": self.compressor.chunk(body, final=not more_body)}
+            await self._send(message)
+            return
+
+        self.started = True
+        if self.passthrough or (len(body) < self.minimum_size and not more_body):
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if more_body:
+            self.compressor = _StreamCompressor(self.encoding)
+            body = self.compressor.chunk(body, final=False)
+            del headers["content-length"]
+        else:
+            body = compress(body, self.encoding)
+            headers["content-length"] = str(len(body))
+        headers["content-encoding"] = self.encoding
+        if "etag" in headers:
+            headers["etag"] = etag_for_encoding(headers["etag"], self.encoding)
+
+        await self._send(self.start_message)
+        await self._send({**message, "body": body})
+
+    def _tag_not_modified(self, headers: MutableHeaders):
+        # Devolver o ETag da representação que o cliente já tem
+        etag = headers.get("etag")
+        if etag is None:
+            return
+        for encoding in SUPPORTED_ENCODINGS:
+            if etag_for_encoding(etag, encoding) in self.if_none_match:
+                headers["etag"] = etag_for_encoding(etag, encoding)
+                return
+
+
+def _encoded_response(body: bytes, encoding: Optional[str], validators) -> Response:
+    response = Response(body, media_type="application/json", headers=validators.headers())
+    # Mesmo sem compressão: outro Accept-Encoding receberia outro corpo
+    response.headers.add_vary_header("Accept-Encoding")
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+        response.headers["ETag"] = etag_for_encoding(validators.etag, encoding)
+    return response
+
+
+async def precompressed_json(
+    request: Request,
+    cache_key: str,
+    load: Callable[[], Awaitable],
+    validators,
+) -> Optional[Response]:
+    """
+    Resposta JSON servida de corpos já serializados e comprimidos no
+    RankingCache. `cache_key` deve conter a versão do recurso, assim cada
+    página é comprimida uma vez por versão e codificação. `load` só é chamado
+    quando nem o JSON pronto está em cache; se devolver None, retorna None
+    (ex.: recurso inexistente).
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None:
+        body = RankingCache.get_encoded_body(cache_key, encoding)
+        if body is not None:
+            return _encoded_response(body, encoding, validators)
+
+    identity = RankingCache.get_encoded_body(cache_key, "identity")
+    if identity is None:
+        content = await load()
+        if content is None:
+            return None
+        identity = dumps(content)
+        RankingCache.set_encoded_body(cache_key, "identity", identity)
+
+    if encoding is None or len(identity) < settings.compression_minimum_size:
+        return _encoded_response(identity, None, validators)
+
+    body = compress(identity, encoding)
+    RankingCache.set_encoded_body(cache_key, encoding, body)
+    return _encoded_response(body, encoding, validators)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 
@@ -23,10 +23,83 @@ class Settings(BaseSettings):
     environment: str = "development"
     debug: bool = True
     
+    # Redis (cache e pub/sub entre workers; opcional)
+    redis_url: Optional[str] = None
+    
     # Rate Limiting
     rate_limit_requests: int = 100
     rate_limit_window: int = 60
     
+    # Imports
+    import_upload_dir: str = "./imports"
+    import_workers: int = 2
+    import_parse_workers: int = 2
+    import_job_stale_after: int = 600  # segundos sem progresso até um job em execução ser dado como interrompido (0 desativa)
+    
+    # Audit
+    audit_async: bool = True
+    audit_queue_size: int = 10000
+    audit_batch_size: int = 500
+    audit_flush_interval: float = 0.5
+    audit_sync_actions: List[str] = ["DELETE"]
+    audit_archive_dir: str = "./audit_archive"
+    audit_retention_days: int = 365
+    
+    # Backup
+    backup_compressor: str = "gzip"  # gzip, zstd ou none
+    backup_compression_level: Optional[int] = None
+    backup_compression_threads: int = 0  # 0 = todos os núcleos (zstd/pigz)
+    backup_progress_interval: float = 5.0
+    backup_format: str = "plain"  # plain ou directory (pg_dump -Fd)
+    backup_jobs: int = 4
+    backup_schedule: Optional[str] = None  # expressão cron em UTC, ex.: "0 3 * * *"
+    backup_verify_workers: int = 4
+    backup_incremental_overlap: float = 300.0  # segundos relidos antes da marca d'água anterior
+    
+    # Notifications
+    smtp_enabled: bool = False
+    smtp_host: str = "localhost"
+    smtp_port: int = 587
+    smtp_user: str = ""
+    smtp_password: str = ""
+    smtp_starttls: bool = True
+    smtp_from: str = "noreply@ranking.com"
+    smtp_timeout: float = 10.0
+    smtp_pool_size: int = 2
+    notification_queue_size: int = 1000
+    notification_batch_size: int = 50  # destinatários por mensagem
+    notification_max_retries: int = 3
+    notification_retry_backoff: float = 1.0
+    
+    # Cache HTTP das rotas públicas
+    public_cache_max_age: int = 5
+    ranking_version_max_age: int = 300  # segundos; as versões dos rankings avançam ao menos a cada intervalo (0 desativa)
+    public_cors_max_age: int = 600  # cache do preflight no navegador
+    
+    # Estatísticas gerais
+    stats_reconcile_interval: float = 3600.0  # segundos entre reconciliações dos contadores (0 desativa)
+    
+    # Posições por torneio (tabela tournament_rankings)
+    tournament_positions_coalesce: float = 1.0  # segundos agrupando mudanças antes de recalcular
+    ranking_numpy_engine: bool = True  # recálculos completos em memória quando o NumPy estiver instalado
+    
+    # Histórico do ranking geral
+    ranking_snapshot_interval: float = 86400.0  # segundos entre snapshots (0 desativa)
+    ranking_history_retention_days: int = 365  # snapshots mantidos, e deltas desde o mais antigo (0 mantém tudo)
+    
+    # Compressão de respostas (brotli e zstd só se as bibliotecas estiverem instaladas)
+    compression_minimum_size: int = 500  # bytes
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_zstd_level: int = 3
+    precompressed_cache_size: int = 256  # corpos prontos por worker
+    
+    # Ranking ao vivo
+    ranking_stream_coalesce: float = 0.5  # segundos agrupando mudanças antes de recalcular
+    ranking_stream_heartbeat: float = 15.0
+    ranking_stream_queue_size: int = 64
+    ranking_ws_max_fps: float = 2.0  # frames por segundo por página inscrita
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
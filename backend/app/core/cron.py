@@ -0,0 +1,83 @@
+"""
+Expressões cron de 5 campos para agendamento de tarefas em segundo plano
+"""
+from datetime import datetime, timedelta
+from typing import Set
+
+
+class CronSchedule:
+    """
+    Expressão cron no formato "minuto hora dia mês dia-da-semana".
+
+    Cada campo aceita `*`, valores, intervalos (`1-5`), listas (`1,15`) e
+    passos (`*/15`, `0-30/10`). Dia da semana vai de 0 (domingo) a 6, com 7
+    também valendo domingo. Como no cron, se dia e dia da semana forem
+    restritos, basta um dos dois coincidir.
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression (expected 5 fields): {expression}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELD_RANGES)
+        )
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        self.day_restricted = parts[2] != "*"
+        self.weekday_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            try:
+                step = 1
+                if "/" in part:
+                    part, step_value = part.split("/", 1)
+                    step = int(step_value)
+                if part == "*":
+                    start, end = low, high
+                elif "-" in part:
+                    start, end = (int(value) for value in part.split("-", 1))
+                else:
+                    start = int(part)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"Invalid cron field: {field}")
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Invalid cron field: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Primeiro minuto estritamente posterior a `moment` que satisfaz a expressão"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 29/02 numa segunda-feira pode levar anos; além disso a expressão é impossível (ex.: 31/02)
+        limit = candidate + timedelta(days=366 * 28)
+
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"Cron expression never matches: {self.expression}")
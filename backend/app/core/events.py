@@ -0,0 +1,119 @@
+"""
+Barramento de eventos interno, com Redis pub/sub entre workers
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pontuações (ou jogadores/torneios que afetam o ranking) mudaram.
+# Payload: {"tournament_ids": [ids] ou None quando todos podem ter mudado}, e
+# opcionalmente "force_ids": torneios corrigidos pelo admin, recalculados
+# mesmo se já congelados (encerrados)
+SCORES_CHANGED = "ranking.scores_changed"
+
+REDIS_CHANNEL_PREFIX = "events:"
+
+
+class EventBus:
+    """
+    Pub/sub em processo para avisar serviços de segundo plano sobre mudanças.
+
+    Com `redis_url` configurado (e a biblioteca redis instalada), `publish`
+    envia o evento ao Redis e cada worker o recebe pela sua assinatura, o que
+    inclui o próprio worker que publicou; sem Redis o evento é entregue só
+    aos handlers locais. Handlers são síncronos e devem ser baratos (apenas
+    registrar o trabalho a fazer).
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, handler: Callable[[Dict[str, Any]], None]):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def unsubscribe(self, channel: str, handler: Callable[[Dict[str, Any]], None]):
+        handlers = self._handlers.get(channel, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    async def start(self):
+        """Conectar ao Redis e começar a receber eventos dos outros workers"""
+        if not REDIS_AVAILABLE or not settings.redis_url or self._listener_task is not None:
+            return
+        try:
+            self._redis = redis.from_url(settings.redis_url, decode_responses=True)
+            pubsub = self._redis.pubsub()
+            await pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+        except Exception as e:
+            logger.warning(f"Redis event bus unavailable, using local delivery only: {e}")
+            self._redis = None
+            return
+        self._listener_task = asyncio.create_task(self._listen(pubsub), name="event-bus-listener")
+        logger.info("Event bus connected to Redis")
+
+    async def stop(self):
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            await asyncio.gather(self._listener_task, return_exceptions=True)
+            self._listener_task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def publish(self, channel: str, payload: Dict[str, Any]):
+        """
+        Publicar um evento; falhas de publicação nunca propagam para quem
+        publicou. O payload recebe `published_at` (ms), igual em todos os workers.
+        """
+        payload = {**payload, "published_at": int(time.time() * 1000)}
+        if self._redis is not None:
+            try:
+                await self._redis.publish(REDIS_CHANNEL_PREFIX + channel, json.dumps(payload))
+                return
+            except Exception as e:
+                logger.warning(f"Redis publish failed, delivering {channel} locally: {e}")
+        self._dispatch(channel, payload)
+
+    async def _listen(self, pubsub):
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"][len(REDIS_CHANNEL_PREFIX):]
+                    self._dispatch(channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.error(f"Event bus listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+                try:
+                    await pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+                except Exception:
+                    pass
+
+    def _dispatch(self, channel: str, payload: Dict[str, Any]):
+        for handler in list(self._handlers.get(channel, [])):
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f"Event handler for {channel} failed: {e}")
+
+
+event_bus = EventBus()
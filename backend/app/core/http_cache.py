@@ -0,0 +1,132 @@
+"""
+Validadores HTTP (ETag) para respostas condicionais
+"""
+import hashlib
+import time
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from .compression import strip_etag_encoding
+from .config import settings
+from .events import event_bus, SCORES_CHANGED
+from .responses import FastJSONResponse
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class RankingVersions:
+    """
+    Versões dos rankings, avançadas a cada evento SCORES_CHANGED.
+
+    A versão é o instante da mudança em milissegundos, carimbado pelo
+    `event_bus` na publicação, então com Redis todos os workers chegam ao
+    mesmo valor. Cada torneio tem a sua versão; o ranking geral (e tudo que
+    soma torneios) usa a mais recente de todas.
+
+    Mudanças que não passam pelo barramento deste processo (outros workers
+    sem Redis, scripts, restaurações em outro processo, SQL manual) não
+    avançam nada. Por isso nenhuma versão fica abaixo do início do intervalo
+    atual de `ranking_version_max_age` segundos: o intervalo vem do relógio,
+    igual em todos os workers, e limita por quanto tempo um ETag ou um corpo
+    pré-comprimido pode ficar velho. Em vários workers, configure o Redis
+    para que as mudanças apareçam antes do fim do intervalo.
+    """
+
+    def __init__(self):
+        self.max_age_ms = settings.ranking_version_max_age * 1000
+        self._started = _now_ms()
+        self._latest = 0
+        self._base = 0
+        self._tournaments: Dict[int, int] = {}
+
+    def _floor(self) -> int:
+        if self.max_age_ms <= 0:
+            return self._started
+        now = _now_ms()
+        return now - now % self.max_age_ms
+
+    def on_scores_changed(self, payload: Dict):
+        # Sempre maior que a anterior, mesmo com dois eventos no mesmo milissegundo
+        stamp = max(payload.get("published_at") or _now_ms(), self.general() + 1)
+        tournament_ids = payload.get("tournament_ids")
+        if tournament_ids is None:
+            self._base = max(self._base, stamp)
+            self._tournaments.clear()
+        else:
+            for tournament_id in tournament_ids:
+                self._tournaments[tournament_id] = max(self._tournaments.get(tournament_id, 0), stamp)
+        self._latest = max(self._latest, stamp)
+
+    def general(self) -> int:
+        return max(self._latest, self._floor())
+
+    def tournament(self, tournament_id: int) -> int:
+        return max(self._base, self._tournaments.get(tournament_id, 0), self._floor())
+
+
+ranking_versions = RankingVersions()
+event_bus.subscribe(SCORES_CHANGED, ranking_versions.on_scores_changed)
+
+
+class CacheValidators:
+    """
+    ETag forte e Cache-Control de uma resposta pública.
+
+    Sem Last-Modified: as versões mudam em milissegundos e a data HTTP só tem
+    segundos, então duas versões no mesmo segundo passariam por iguais num
+    If-Modified-Since.
+    """
+
+    def __init__(self, etag: str, max_age: Optional[int] = None):
+        self.etag = etag
+        self.max_age = settings.public_cache_max_age if max_age is None else max_age
+
+    @classmethod
+    def for_version(cls, scope: str, version: int) -> "CacheValidators":
+        """Validadores de um recurso que só muda quando `version` muda"""
+        return cls(f'"{scope}-{version}"')
+
+    @classmethod
+    def for_content(cls, body: bytes) -> "CacheValidators":
+        """Validadores a partir do hash do corpo já serializado"""
+        return cls(f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+    def is_not_modified(self, request: Request, exists: bool = True) -> bool:
+        """
+        Se o If-None-Match corresponde ao ETag. `*` só corresponde quando o
+        recurso sabidamente existe: com `exists=False` (ainda não consultado,
+        ex.: um torneio que pode não existir) só um ETag igual vale.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is None:
+            return False
+        # If-None-Match usa comparação fraca: W/"x" também corresponde a "x",
+        # assim como as variantes comprimidas ("x-gzip", "x-br", ...)
+        tags = {strip_etag_encoding(tag.strip().removeprefix("W/")) for tag in if_none_match.split(",")}
+        return (exists and "*" in tags) or self.etag in tags
+
+    def headers(self) -> Dict[str, str]:
+        return {"ETag": self.etag, "Cache-Control": f"public, max-age={self.max_age}"}
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers())
+
+
+def conditional_json(request: Request, content) -> Response:
+    """
+    Resposta JSON com ETag pelo hash do corpo, para recursos sem versão
+    (dependem do relógio ou de dados que não publicam eventos). Economiza a
+    transferência, não a consulta.
+    """
+    response = FastJSONResponse(content)
+    validators = CacheValidators.for_content(response.body)
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    validators.apply(response)
+    return response
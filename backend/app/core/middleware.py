@@ -0,0 +1,46 @@
+"""
+Middlewares por grupo de rotas
+"""
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+from starlette.middleware import Middleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+@dataclass
+class RouteGroup:
+    """Prefixos de caminho e a pilha de middlewares que só eles recebem"""
+    prefixes: Tuple[str, ...]
+    middleware: List[Middleware] = field(default_factory=list)
+
+    def matches(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.prefixes)
+
+
+class RouteGroupMiddleware:
+    """
+    Despacha cada requisição para a pilha de middlewares do primeiro grupo
+    cujo prefixo casa com o caminho; caminhos fora de qualquer grupo vão
+    direto para a aplicação, sem middleware algum. As pilhas são montadas
+    uma vez, na mesma ordem do parâmetro `middleware` do Starlette (o
+    primeiro da lista é o mais externo).
+    """
+
+    def __init__(self, app: ASGIApp, groups: Sequence[RouteGroup]):
+        self.app = app
+        self.stacks: List[Tuple[RouteGroup, ASGIApp]] = []
+        for group in groups:
+            stack = app
+            for middleware in reversed(group.middleware):
+                stack = middleware.cls(stack, **middleware.options)
+            self.stacks.append((group, stack))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            for group, stack in self.stacks:
+                if group.matches(path):
+                    await stack(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
@@ -46,11 +46,12 @@ class PerformanceOptimizer:
             "CREATE INDEX IF NOT EXISTS idx_admins_active ON admins(is_active) WHERE is_active = true;",
             "CREATE INDEX IF NOT EXISTS idx_admins_permission ON admins(permission_level);",
             
-            # Índices para tabela audit_log
-            "CREATE INDEX IF NOT EXISTS idx_audit_resource ON audit_log(resource_type, resource_id);",
-            "CREATE INDEX IF NOT EXISTS idx_audit_admin ON audit_log(admin_id);",
-            "CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log(timestamp DESC);",
-            "CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_log(action);",
+            # Índices para tabela audit_logs (particionada por mês; os índices
+            # compostos terminam em (timestamp, id) para a paginação por cursor)
+            "CREATE INDEX IF NOT EXISTS ix_audit_logs_timestamp_id ON audit_logs(timestamp, id);",
+            "CREATE INDEX IF NOT EXISTS ix_audit_logs_table_record_timestamp ON audit_logs(table_name, record_id, timestamp, id);",
+            "CREATE INDEX IF NOT EXISTS ix_audit_logs_admin_timestamp ON audit_logs(admin_id, timestamp, id);",
+            "CREATE INDEX IF NOT EXISTS ix_audit_logs_action_timestamp ON audit_logs(action, timestamp, id);",
             
             # Índices compostos para queries complexas
             "CREATE INDEX IF NOT EXISTS idx_scores_player_tournament_points ON scores(player_id, tournament_id, points DESC);",
@@ -1,16 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware import Middleware
 from starlette.middleware.sessions import SessionMiddleware
 import logging
 import sys
 
 try:
     from .core.config import settings
+    from .core.compression import CompressionMiddleware
+    from .core.middleware import RouteGroup, RouteGroupMiddleware
+    from .core.responses import FastJSONResponse
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
     from app.core.config import settings
+    from app.core.compression import CompressionMiddleware
+    from app.core.middleware import RouteGroup, RouteGroupMiddleware
+    from app.core.responses import FastJSONResponse
 
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper()),
@@ -28,30 +35,101 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    debug=settings.debug
+    debug=settings.debug,
+    default_response_class=FastJSONResponse
 )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins_list,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Sessão e CORS com credenciais só onde há autenticação; as rotas públicas
+# (anônimas) recebem um CORS mínimo e /health, /ready e /docs nenhum middleware.
+# Novos middlewares de autenticação entram na pilha do grupo "admin".
+app.add_middleware(RouteGroupMiddleware, groups=[
+    RouteGroup(
+        prefixes=("/api/v1/auth", "/api/v1/admin"),
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=settings.cors_origins_list,
+                allow_credentials=True,
+                allow_methods=["*"],
+                allow_headers=["*"],
+            ),
+            Middleware(SessionMiddleware, secret_key=settings.secret_key),
+        ],
+    ),
+    RouteGroup(
+        prefixes=("/api/v1/public",),
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=["*"],
+                allow_methods=["GET"],
+                allow_headers=["If-None-Match"],
+                expose_headers=["ETag"],
+                max_age=settings.public_cors_max_age,
+            ),
+        ],
+    ),
+])
 
-app.add_middleware(SessionMiddleware, secret_key=settings.secret_key)
+# Por último para ficar mais externo e comprimir o que os demais produzirem
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
 
 # Include API routes
 try:
     from .api.v1 import api_router
+    from .services.import_job_service import import_job_service
+    from .services.import_service import import_service
+    from .services.audit_service import audit_service
+    from .services.backup_service import backup_service
+    from .services.notification_service import notification_service
+    from .services.ranking_stream_service import ranking_stream_service
+    from .services.stats_service import stats_service
+    from .services.tournament_position_service import tournament_position_service
+    from .services.ranking_history_service import ranking_history_service
+    from .core.events import event_bus
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
     from app.api.v1 import api_router
+    from app.services.import_job_service import import_job_service
+    from app.services.import_service import import_service
+    from app.services.audit_service import audit_service
+    from app.services.backup_service import backup_service
+    from app.services.notification_service import notification_service
+    from app.services.ranking_stream_service import ranking_stream_service
+    from app.services.stats_service import stats_service
+    from app.services.tournament_position_service import tournament_position_service
+    from app.services.ranking_history_service import ranking_history_service
+    from app.core.events import event_bus
     
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def start_background_workers():
+    await event_bus.start()
+    await audit_service.start()
+    await import_job_service.start()
+    await backup_service.start()
+    await notification_service.start()
+    await ranking_stream_service.start()
+    await stats_service.start()
+    await tournament_position_service.start()
+    await ranking_history_service.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await ranking_history_service.stop()
+    await tournament_position_service.stop()
+    await stats_service.stop()
+    await ranking_stream_service.stop()
+    await backup_service.stop()
+    await import_job_service.stop()
+    import_service.shutdown()
+    await audit_service.stop()
+    await notification_service.stop()
+    await event_bus.stop()
+
 @app.get("/")
 async def root():
     logger.info("Root endpoint accessed")
@@ -3,11 +3,23 @@ from .player import Player
 from .admin import Admin
 from .score import Score
 from .audit_log import AuditLog
+from .import_job import ImportJob
+from .stats_counters import StatsCounters
+from .tournament_position import TournamentPosition
+from .ranking_snapshot import RankingSnapshot
+from .ranking_delta import RankingDelta
+from .deleted_row import DeletedRow
 
 __all__ = [
     "Tournament",
     "Player", 
     "Admin",
     "Score",
-    "AuditLog"
+    "AuditLog",
+    "ImportJob",
+    "StatsCounters",
+    "TournamentPosition",
+    "RankingSnapshot",
+    "RankingDelta",
+    "DeletedRow"
 ]
\ No newline at end of file
@@ -1,17 +1,26 @@
 from sqlmodel import SQLModel, Field, Column
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Index
 from typing import Optional, Dict, Any
 from datetime import datetime
 
 
 class AuditLog(SQLModel, table=True):
     __tablename__ = "audit_logs"
+    # No PostgreSQL a tabela é particionada por mês em `timestamp` (ver migração
+    # 5c7d1e9a4b20); os índices compostos seguem os filtros de get_audit_logs
+    # e terminam em (timestamp, id) para a paginação por cursor.
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_table_record_timestamp", "table_name", "record_id", "timestamp", "id"),
+        Index("ix_audit_logs_admin_timestamp", "admin_id", "timestamp", "id"),
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp", "id"),
+    )
     
     id: Optional[int] = Field(primary_key=True)
-    table_name: str = Field(max_length=50, nullable=False, index=True)
-    record_id: int = Field(nullable=False, index=True)
+    table_name: str = Field(max_length=50, nullable=False)
+    record_id: Optional[int] = Field(default=None, nullable=True)
     action: str = Field(max_length=10, nullable=False)
     old_values: Optional[Dict[str, Any]] = Field(sa_column=Column(JSON), default=None)
     new_values: Optional[Dict[str, Any]] = Field(sa_column=Column(JSON), default=None)
     admin_id: int = Field(foreign_key="admins.id", nullable=False)
-    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
\ No newline at end of file
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,17 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class DeletedRow(SQLModel, table=True):
+    """
+    Linha removida de admins, players, tournaments ou scores, registrada por
+    triggers (no PostgreSQL) na mesma transação do DELETE. Os backups
+    incrementais exportam daqui as remoções do período.
+    """
+    __tablename__ = "deleted_rows"
+
+    id: Optional[int] = Field(primary_key=True)
+    table_name: str = Field(nullable=False)
+    record_id: int = Field(nullable=False)
+    deleted_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,29 @@
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import JSON
+from typing import Optional, List
+from datetime import datetime
+
+
+class ImportJob(SQLModel, table=True):
+    __tablename__ = "import_jobs"
+    
+    id: Optional[int] = Field(primary_key=True)
+    kind: str = Field(max_length=20, nullable=False)
+    status: str = Field(default="pending", max_length=20, index=True)
+    filename: Optional[str] = Field(max_length=255, default=None)
+    file_path: str = Field(nullable=False)
+    file_format: str = Field(max_length=10, nullable=False)
+    chunk_size: int = Field(nullable=False)
+    preview_only: bool = Field(default=False)
+    cancel_requested: bool = Field(default=False)
+    processed: int = Field(default=0)
+    success: int = Field(default=0)
+    failed: int = Field(default=0)
+    chunks: int = Field(default=0)
+    errors: Optional[List[str]] = Field(sa_column=Column(JSON), default=None)
+    message: Optional[str] = None
+    admin_id: int = Field(foreign_key="admins.id", nullable=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,19 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class RankingDelta(SQLModel, table=True):
+    """
+    Variação do total de um jogador no ranking geral, registrada por triggers
+    em scores e players (no PostgreSQL) para reconstruir o ranking entre
+    snapshots. Só conta o que entra no ranking: scores de jogadores ativos,
+    e ativar/desativar um jogador soma/subtrai todos os seus scores.
+    """
+    __tablename__ = "ranking_deltas"
+
+    id: Optional[int] = Field(primary_key=True)
+    player_id: int = Field(nullable=False)
+    points_delta: float = Field(nullable=False)
+    count_delta: int = Field(nullable=False)
+    changed_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,22 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, LargeBinary
+from typing import Optional
+from datetime import datetime
+
+
+class RankingSnapshot(SQLModel, table=True):
+    """
+    Ranking geral em um instante, compactado em vetores ordenados pelo id do
+    jogador: cada coluna binária é um array little-endian (int32 para ids,
+    posições e contagens, float64 para pontos) com `player_count` elementos.
+    Ver `ranking_history_service`.
+    """
+    __tablename__ = "ranking_snapshots"
+
+    id: Optional[int] = Field(primary_key=True)
+    taken_at: datetime = Field(nullable=False, unique=True, index=True)
+    player_count: int = Field(nullable=False)
+    player_ids: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    positions: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    total_points: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    score_counts: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
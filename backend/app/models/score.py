@@ -9,7 +9,7 @@ class Score(SQLModel, table=True):
     id: Optional[int] = Field(primary_key=True)
     player_id: int = Field(foreign_key="players.id", nullable=False, index=True)
     tournament_id: int = Field(foreign_key="tournaments.id", nullable=False, index=True)
-    points: float = Field(nullable=False)
+    points: float = Field(nullable=False, index=True)
     notes: Optional[str] = None
     admin_id: int = Field(foreign_key="admins.id", nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
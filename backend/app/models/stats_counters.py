@@ -0,0 +1,23 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class StatsCounters(SQLModel, table=True):
+    """
+    Contadores das estatísticas gerais (linha única, id = 1), mantidos por
+    triggers em scores, players e tournaments. Scores só contam para
+    jogadores ativos.
+    """
+    __tablename__ = "stats_counters"
+
+    id: Optional[int] = Field(default=1, primary_key=True)
+    total_players: int = Field(default=0)
+    total_tournaments: int = Field(default=0)
+    total_scores: int = Field(default=0)
+    positive_scores: int = Field(default=0)
+    negative_scores: int = Field(default=0)
+    points_sum: float = Field(default=0)
+    highest_score: Optional[float] = None
+    lowest_score: Optional[float] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
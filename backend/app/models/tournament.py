@@ -10,7 +10,7 @@ class Tournament(SQLModel, table=True):
     name: str = Field(max_length=255, nullable=False)
     description: Optional[str] = None
     start_date: datetime
-    end_date: datetime
+    end_date: datetime = Field(index=True)
     logo_url: Optional[str] = None
     sort_criteria: str = Field(default="points_desc", max_length=50)
     created_at: datetime = Field(default_factory=datetime.utcnow)
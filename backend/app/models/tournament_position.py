@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, ForeignKey, Index, Integer
+from datetime import datetime
+
+
+class TournamentPosition(SQLModel, table=True):
+    """
+    Posição de cada jogador em cada torneio, recalculada quando os scores do
+    torneio mudam e congelada depois do `end_date` (ver
+    `tournament_position_service`). Segue as regras do ranking do torneio:
+    só jogadores ativos, ordem pelo sort_criteria, empates com RANK(); com
+    scores duplicados no torneio, vale o melhor do jogador.
+    """
+    __tablename__ = "tournament_rankings"
+    __table_args__ = (
+        Index("ix_tournament_rankings_tournament_position", "tournament_id", "position"),
+    )
+
+    tournament_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("tournaments.id", ondelete="CASCADE"), primary_key=True)
+    )
+    player_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("players.id", ondelete="CASCADE"), primary_key=True, index=True)
+    )
+    score_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("scores.id", ondelete="CASCADE"), nullable=False)
+    )
+    position: int = Field(nullable=False)
+    points: float = Field(nullable=False)
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
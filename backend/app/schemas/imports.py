@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+
+class ImportProgress(BaseModel):
+    """Evento de progresso emitido durante uma importação em streaming"""
+    event: str  # "progress" ou "completed"
+    processed: int
+    success: int
+    failed: int
+    chunks: int
+    errors: List[str] = []
+    message: Optional[str] = None
+
+
+class ImportJobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    filename: Optional[str] = None
+    preview_only: bool
+    cancel_requested: bool
+    processed: int
+    success: int
+    failed: int
+    chunks: int
+    errors: Optional[List[str]] = None
+    message: Optional[str] = None
+    admin_id: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
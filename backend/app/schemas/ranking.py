@@ -12,8 +12,8 @@ class RankingEntry(BaseModel):
     total_points: float
     total_tournaments: int
     average_points: float
-    best_score: float
-    worst_score: float
+    best_score: Optional[float] = None  # ausente no ranking histórico (as_of)
+    worst_score: Optional[float] = None
     score_date: Optional[datetime] = None
     notes: Optional[str] = None
 
@@ -25,6 +25,7 @@ class RankingResponse(BaseModel):
     size: int
     pages: int
     ranking_type: str = "general"
+    as_of: Optional[datetime] = None
 
 
 class TournamentRanking(BaseModel):
@@ -62,7 +63,20 @@ class PlayerStats(BaseModel):
     positive_scores: int
     negative_scores: int
     general_position: int
-    tournaments: List[dict]
+    tournaments: List[PlayerTournamentResult]
+
+
+class RankingHistoryPoint(BaseModel):
+    taken_at: datetime
+    position: int
+    total_points: float
+
+
+class PlayerRankingHistory(BaseModel):
+    player_id: int
+    player_name: str
+    player_nickname: str
+    history: List[RankingHistoryPoint]
 
 
 class GeneralStats(BaseModel):
@@ -11,6 +11,7 @@ class PlayerSearchResult(BaseModel):
     total_tournaments: int
     total_points: float
     position: int
+    best_position: Optional[int] = None  # melhor colocação em um torneio
 
 
 class TournamentSearchResult(BaseModel):
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Script para arquivar logs de auditoria mais antigos que a janela de retenção
+"""
+import sys
+import os
+import asyncio
+
+# Adicionar o diretório backend ao path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.audit_archive_service import audit_archive_service
+
+
+def main():
+    result = asyncio.run(audit_archive_service.archive_old_logs())
+    print(f"Archived {result['archived_rows']} audit logs older than {result['cutoff']}")
+    for month in result['months']:
+        print(f"  - {month}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência da pilha de middlewares: SessionMiddleware e CORS
+globais (antes) contra middlewares por grupo de rotas (depois). As
+requisições vão direto à aplicação ASGI, sem rede nem banco (o ranking
+responde 304 pelo ETag antes de consultar o banco).
+"""
+import sys
+import os
+import asyncio
+import base64
+import json
+import time
+
+from itsdangerous import TimestampSigner
+
+# Adicionar o diretório backend ao path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+
+from app.core.config import settings
+from app.core.http_cache import ranking_versions
+from app.core.middleware import RouteGroupMiddleware
+from app.main import app
+
+REPEAT = 2000
+ROUNDS = 5
+
+
+def _session_cookie() -> str:
+    data = base64.b64encode(json.dumps({"visited": True}).encode())
+    return "session=" + TimestampSigner(settings.secret_key).sign(data).decode()
+
+
+def _requests():
+    etag = f'"general-{ranking_versions.general()}"'
+    origin = settings.cors_origins_list[0]
+    return {
+        "GET /health": ("GET", "/health", {}),
+        "GET /public/ranking (304)": ("GET", "/api/v1/public/ranking/", {"if-none-match": etag}),
+        "  + Origin": ("GET", "/api/v1/public/ranking/", {"if-none-match": etag, "origin": origin}),
+        "  + session cookie": ("GET", "/api/v1/public/ranking/", {"if-none-match": etag, "cookie": _session_cookie()}),
+        "OPTIONS /public/ranking": ("OPTIONS", "/api/v1/public/ranking/", {
+            "origin": origin, "access-control-request-method": "GET", "access-control-request-headers": "if-none-match",
+        }),
+    }
+
+
+async def _request(method: str, path: str, headers: dict) -> int:
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "path": path, "raw_path": path.encode(),
+        "root_path": "", "scheme": "http", "query_string": b"", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(name.encode(), value.encode()) for name, value in headers.items()],
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def _use_stack(user_middleware):
+    app.user_middleware = user_middleware
+    app.middleware_stack = app.build_middleware_stack()
+
+
+async def _measure(method: str, path: str, headers: dict) -> float:
+    """Melhor média entre ROUNDS rodadas, para reduzir o ruído"""
+    for _ in range(200):
+        await _request(method, path, headers)
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            await _request(method, path, headers)
+        timings.append((time.perf_counter() - start) / REPEAT * 1e6)
+    return min(timings)
+
+
+async def main():
+    scoped = list(app.user_middleware)
+    global_stack = [
+        middleware for middleware in scoped if middleware.cls is not RouteGroupMiddleware
+    ] + [
+        Middleware(
+            CORSMiddleware,
+            allow_origins=settings.cors_origins_list,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        ),
+        Middleware(SessionMiddleware, secret_key=settings.secret_key),
+    ]
+
+    results = {}
+    for label, stack in (("before", global_stack), ("after", scoped)):
+        _use_stack(stack)
+        for name, (method, path, headers) in _requests().items():
+            status = await _request(method, path, headers)
+            results.setdefault(name, {})[label] = (await _measure(method, path, headers), status)
+
+    print(f"{'request':<28} {'before µs':>10} {'after µs':>10} {'status':>7}")
+    for name, result in results.items():
+        (before, _), (after, status) = result["before"], result["after"]
+        print(f"{name:<28} {before:>10.1f} {after:>10.1f} {status:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark do recálculo completo dos rankings: SQL (GROUP BY + RANK() no
+banco) contra o motor NumPy (leitura em vetores, cálculo em memória e
+escrita em massa), com scores sintéticos.
+
+Usa o PostgreSQL de `DATABASE_URL` em tabelas temporárias; com `--sqlite`
+(ou sem PostgreSQL acessível) usa um SQLite em memória, só como referência.
+
+    python app/scripts/benchmark_ranking_engine.py --sizes 100000 1000000 10000000
+"""
+import sys
+import os
+import argparse
+import asyncio
+import io
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Adicionar o diretório backend ao path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import text
+
+from app.core.database import async_engine
+from app.services.ranking_engine import (
+    POSITION_COLUMNS, ScoreArrays, decode_scores_copy, encode_positions_copy, general_ranking, tournament_positions,
+)
+
+PLAYERS_PER_TOURNAMENT = 1000
+
+GENERAL_SQL = """
+    SELECT player_id, SUM(points) AS total_points, COUNT(*) AS score_count, AVG(points) AS average_points,
+           MAX(points) AS best_score, MIN(points) AS worst_score,
+           RANK() OVER (ORDER BY SUM(points) DESC) AS position
+    FROM bench_scores GROUP BY player_id ORDER BY position, player_id
+"""
+
+POSITIONS_SQL = """
+    INSERT INTO bench_positions (tournament_id, player_id, score_id, position, points, computed_at)
+    SELECT s.tournament_id, s.player_id, s.id,
+           RANK() OVER (
+               PARTITION BY s.tournament_id
+               ORDER BY CASE WHEN t.descending THEN -s.points ELSE s.points END
+           ),
+           s.points, {now}
+    FROM bench_scores s JOIN bench_tournaments t ON t.id = s.tournament_id
+"""
+
+LOAD_SQL = """
+    SELECT s.id, s.player_id, s.tournament_id, s.points, t.descending
+    FROM bench_scores s JOIN bench_tournaments t ON t.id = s.tournament_id
+"""
+
+
+def synthetic_scores(size: int, seed: int = 42) -> ScoreArrays:
+    """Torneios de PLAYERS_PER_TOURNAMENT jogadores distintos, sobre ~size/20 jogadores"""
+    rng = np.random.default_rng(seed)
+    players = max(PLAYERS_PER_TOURNAMENT, size // 20)
+    index = np.arange(size)
+    tournament_ids = index // PLAYERS_PER_TOURNAMENT + 1
+    player_ids = (index % PLAYERS_PER_TOURNAMENT + tournament_ids * 7919) % players + 1
+    tournaments = int(tournament_ids[-1])
+    return ScoreArrays(
+        score_ids=index + 1,
+        player_ids=player_ids,
+        tournament_ids=tournament_ids,
+        points=rng.integers(-20, 100, size).astype(np.float64),
+        descending=(rng.random(tournaments + 1) < 0.8)[tournament_ids],
+    )
+
+
+def compute(scores: ScoreArrays):
+    general = general_ranking(scores.player_ids, scores.points)
+    positions = tournament_positions(scores.tournament_ids, scores.player_ids, scores.points, scores.descending)
+    rows = positions["order"]
+    return general, {
+        "tournament_ids": scores.tournament_ids[rows], "player_ids": scores.player_ids[rows],
+        "score_ids": scores.score_ids[rows], "positions": positions["position"], "points": scores.points[rows],
+    }
+
+
+def timed(label: str, results: dict, fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    results[label] = time.perf_counter() - start
+    return value
+
+
+async def atimed(label: str, results: dict, coroutine):
+    start = time.perf_counter()
+    value = await coroutine
+    results[label] = time.perf_counter() - start
+    return value
+
+
+def _tournament_rows(scores: ScoreArrays):
+    ids, first = np.unique(scores.tournament_ids, return_index=True)
+    return list(zip(ids.tolist(), scores.descending[first].tolist()))
+
+
+def bench_sqlite(scores: ScoreArrays) -> dict:
+    results = {}
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE bench_scores (id INTEGER PRIMARY KEY, player_id INTEGER, tournament_id INTEGER, points REAL)")
+    db.execute("CREATE TABLE bench_tournaments (id INTEGER PRIMARY KEY, descending BOOLEAN)")
+    db.execute(
+        "CREATE TABLE bench_positions (tournament_id INTEGER, player_id INTEGER, score_id INTEGER, "
+        "position INTEGER, points REAL, computed_at TEXT)"
+    )
+    db.executemany("INSERT INTO bench_scores VALUES (?, ?, ?, ?)", zip(
+        scores.score_ids.tolist(), scores.player_ids.tolist(), scores.tournament_ids.tolist(), scores.points.tolist()
+    ))
+    db.executemany("INSERT INTO bench_tournaments VALUES (?, ?)", _tournament_rows(scores))
+    db.commit()
+
+    timed("sql general", results, lambda: db.execute(GENERAL_SQL).fetchall())
+    timed("sql positions", results, lambda: db.execute(POSITIONS_SQL.format(now="CURRENT_TIMESTAMP")))
+    db.execute("DELETE FROM bench_positions")
+
+    def numpy_path():
+        columns = list(zip(*db.execute(LOAD_SQL).fetchall()))
+        loaded = ScoreArrays(*(np.array(column) for column in columns))
+        _, positions = compute(loaded)
+        db.executemany(
+            "INSERT INTO bench_positions VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+            zip(*(values.tolist() for values in positions.values())),
+        )
+
+    timed("numpy end-to-end", results, numpy_path)
+    db.close()
+    return results
+
+
+async def bench_postgres(scores: ScoreArrays) -> dict:
+    results = {}
+    async with async_engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.execute("""
+            CREATE TEMP TABLE bench_scores (id INTEGER PRIMARY KEY, player_id INTEGER, tournament_id INTEGER, points DOUBLE PRECISION);
+            CREATE TEMP TABLE bench_tournaments (id INTEGER PRIMARY KEY, descending BOOLEAN);
+            CREATE TEMP TABLE bench_positions (
+                tournament_id INTEGER, player_id INTEGER, score_id INTEGER, position INTEGER,
+                points DOUBLE PRECISION, computed_at TIMESTAMP
+            );
+        """)
+        await raw.copy_records_to_table("bench_scores", records=zip(
+            scores.score_ids.tolist(), scores.player_ids.tolist(), scores.tournament_ids.tolist(), scores.points.tolist()
+        ))
+        await raw.copy_records_to_table("bench_tournaments", records=_tournament_rows(scores))
+        await raw.execute("ANALYZE bench_scores; ANALYZE bench_tournaments")
+
+        await atimed("sql general", results, raw.fetch(GENERAL_SQL))
+        await atimed("sql positions", results, raw.execute(POSITIONS_SQL.format(now="NOW() AT TIME ZONE 'UTC'")))
+        await raw.execute("TRUNCATE bench_positions")
+
+        async def numpy_path():
+            buffer = io.BytesIO()
+            await raw.copy_from_query(LOAD_SQL, output=buffer, format="binary")
+            loaded = decode_scores_copy(buffer.getvalue())
+            _, positions = compute(loaded)
+            payload = encode_positions_copy(
+                positions["tournament_ids"], positions["player_ids"], positions["score_ids"],
+                positions["positions"], positions["points"], computed_at=datetime.utcnow(),
+            )
+            await raw.copy_to_table("bench_positions", source=io.BytesIO(payload), columns=POSITION_COLUMNS, format="binary")
+
+        await atimed("numpy end-to-end", results, numpy_path())
+    return results
+
+
+async def postgres_available() -> bool:
+    if async_engine.dialect.name != "postgresql":
+        return False
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 5, 10 ** 6, 10 ** 7])
+    parser.add_argument("--sqlite", action="store_true", help="usar SQLite em memória mesmo com PostgreSQL")
+    args = parser.parse_args()
+
+    backend = "sqlite" if args.sqlite or not await postgres_available() else "postgresql"
+    print(f"SQL backend: {backend}")
+    print(f"{'scores':>10} {'numpy calc s':>13} {'numpy e2e s':>12} {'sql general s':>14} {'sql positions s':>16}")
+    for size in args.sizes:
+        scores = synthetic_scores(size)
+        results = {}
+        timed("numpy compute", results, compute, scores)
+        results.update(bench_sqlite(scores) if backend == "sqlite" else await bench_postgres(scores))
+        print(
+            f"{size:>10} {results['numpy compute']:>13.3f} {results['numpy end-to-end']:>12.3f} "
+            f"{results['sql general']:>14.3f} {results['sql positions']:>16.3f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização de uma página de ranking: caminho antigo
+(model_validate por linha + response_model + json) contra o caminho rápido
+(dicts montados das linhas com `rows_as_dicts` + orjson)
+"""
+import sys
+import os
+import asyncio
+import json
+import time
+
+from sqlalchemy import create_engine, text
+
+# Adicionar o diretório backend ao path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.database import rows_as_dicts
+from app.core.responses import ORJSON_AVAILABLE, dumps
+from app.schemas.ranking import RankingEntry, RankingResponse
+
+
+def _fetch_result(size: int):
+    """Resultado real do SQLAlchemy com as colunas da query do ranking geral"""
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE TABLE r (player_id INT, player_name TEXT, player_nickname TEXT, avatar_url TEXT, "
+            "total_tournaments INT, total_points REAL, average_points REAL, best_score REAL, "
+            "worst_score REAL, score_date TIMESTAMP, notes TEXT, position INT)"
+        ))
+        conn.execute(text("INSERT INTO r VALUES (:i, :name, :nick, NULL, 12, :pts, 10.5, 99.0, -3.0, NULL, NULL, :i)"), [
+            {"i": i, "name": f"Player {i}", "nick": f"player_{i}", "pts": 1000.0 - i} for i in range(size)
+        ])
+        return conn.execute(text("SELECT * FROM r")).freeze()
+
+
+def _page(entries, size: int):
+    return {"entries": entries, "total": 10 * size, "page": 1, "size": size, "pages": 10, "ranking_type": "general"}
+
+
+async def baseline(frozen, size: int, field) -> bytes:
+    entries = [RankingEntry.model_validate(row, from_attributes=True) for row in frozen().mappings()]
+    model = RankingResponse.model_validate(_page([e.model_dump() for e in entries], size))
+    content = await serialize_response(field=field, response_content=model)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+async def fast_path(frozen, size: int) -> bytes:
+    return dumps(_page(rows_as_dicts(frozen()), size))
+
+
+async def _timeit(func, *args, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await func(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def main():
+    field = create_response_field(name="Response_get_general_ranking", type_=RankingResponse, mode="serialization")
+    print(f"orjson: {'yes' if ORJSON_AVAILABLE else 'no (stdlib json)'}")
+    print(f"{'rows':>6} {'baseline µs':>12} {'fast µs':>10} {'speedup':>8}")
+    for size in (10, 100, 1000):
+        frozen = _fetch_result(size)
+        assert json.loads(await baseline(frozen, size, field)) == json.loads(await fast_path(frozen, size))
+        repeat = max(20, 20000 // size)
+        slow = await _timeit(baseline, frozen, size, field, repeat=repeat)
+        fast = await _timeit(fast_path, frozen, size, repeat=repeat)
+        print(f"{size:>6} {slow:>12.1f} {fast:>10.1f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular os contadores de estatísticas gerais e corrigir a deriva
+"""
+import sys
+import os
+import asyncio
+
+# Adicionar o diretório backend ao path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.stats_service import stats_service
+
+
+def main():
+    drift = asyncio.run(stats_service.reconcile())
+    if drift is None:
+        print("Reconciliation already running in another worker")
+        sys.exit(1)
+    for field, values in drift.items():
+        print(f"{field}: {values['stored']} -> {values['actual']}")
+    print(f"{len(drift)} field(s) corrected")
+
+
+if __name__ == "__main__":
+    main()
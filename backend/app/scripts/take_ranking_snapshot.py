@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Script para gravar um snapshot do ranking geral (ex.: via cron, com os
+snapshots periódicos desativados na aplicação)
+"""
+import sys
+import os
+import asyncio
+
+# Adicionar o diretório backend ao path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.ranking_history_service import ranking_history_service
+
+
+def main():
+    force = "--force" in sys.argv[1:]
+    taken_at = asyncio.run(ranking_history_service.take_snapshot(force=force))
+    if taken_at is None:
+        print("Snapshot skipped: the latest one is recent or another worker is taking it (use --force)")
+        sys.exit(1)
+    print(f"Ranking snapshot taken at {taken_at}")
+
+
+if __name__ == "__main__":
+    main()
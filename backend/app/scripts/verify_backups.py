@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Script para conferir os checksums dos backups registrados no índice
+"""
+import sys
+import os
+import asyncio
+
+# Adicionar o diretório backend ao path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.backup_service import backup_service
+
+
+def main():
+    results = asyncio.run(backup_service.verify_backups(sys.argv[1:] or None))
+    for result in results:
+        status = "OK" if result['ok'] else f"FAILED ({result['error']})"
+        print(f"{result['filename']}: {status}")
+    sys.exit(0 if all(result['ok'] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
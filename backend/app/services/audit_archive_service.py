@@ -0,0 +1,253 @@
+"""
+Arquivamento de logs de auditoria antigos em arquivos compactados por dia
+"""
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from datetime import datetime, date, timedelta
+from pathlib import Path
+import asyncio
+import gzip
+import json
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+    pq = None
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = ["id", "table_name", "record_id", "action", "old_values", "new_values", "admin_id", "timestamp"]
+WATERMARK_FILE = "_watermark"
+
+
+def add_months(month_start: datetime, months: int) -> datetime:
+    year, month = divmod(month_start.month - 1 + months, 12)
+    return month_start.replace(year=month_start.year + year, month=month + 1)
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+class _DayFileWriter:
+    """Escrita incremental de um arquivo diário (Parquet com zstd ou NDJSON com gzip)"""
+
+    def __init__(self, path: Path, use_parquet: bool):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".tmp")
+        self.use_parquet = use_parquet
+        self.rows = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if use_parquet:
+            self._writer = pq.ParquetWriter(self.tmp_path, _parquet_schema(), compression="zstd")
+        else:
+            self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+
+    def write(self, records: List[Dict[str, Any]]):
+        if self.use_parquet:
+            columns = {column: [record[column] for record in records] for column in ARCHIVE_COLUMNS}
+            for column in ("old_values", "new_values"):
+                columns[column] = [json.dumps(value, default=str) if value is not None else None for value in columns[column]]
+            self._writer.write_table(pa.table(columns, schema=_parquet_schema()))
+        else:
+            for record in records:
+                self._file.write(json.dumps(record, default=str) + "\n")
+        self.rows += len(records)
+
+    def close(self):
+        if self.use_parquet:
+            self._writer.close()
+        else:
+            self._file.close()
+        # Só aparece com o nome final depois de completo
+        self.tmp_path.replace(self.path)
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("table_name", pa.string()),
+        ("record_id", pa.int64()),
+        ("action", pa.string()),
+        ("old_values", pa.string()),
+        ("new_values", pa.string()),
+        ("admin_id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+    ])
+
+
+class AuditArchiveService:
+    """
+    Move logs de auditoria mais antigos que a janela de retenção para arquivos
+    diários compactados em `audit_archive_dir/year=YYYY/month=MM/`, e depois
+    os remove do banco. Meses inteiros são arquivados de cada vez para que,
+    no PostgreSQL, a partição mensal possa ser removida com DROP TABLE em vez
+    de DELETE (sem inchar a tabela nem depender do vacuum).
+    """
+
+    def __init__(self):
+        self.archive_dir = Path(settings.audit_archive_dir)
+        self.archive_dir.mkdir(exist_ok=True)
+        self.retention_days = settings.audit_retention_days
+        self.use_parquet = PYARROW_AVAILABLE
+        self.batch_size = 5000
+        self.extension = ".parquet" if self.use_parquet else ".ndjson.gz"
+
+    def get_watermark(self) -> Optional[datetime]:
+        """Instante antes do qual todos os logs estão arquivados"""
+        path = self.archive_dir / WATERMARK_FILE
+        if not path.exists():
+            return None
+        return datetime.fromisoformat(path.read_text().strip())
+
+    def _set_watermark(self, value: datetime):
+        path = self.archive_dir / WATERMARK_FILE
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(value.isoformat())
+        tmp_path.replace(path)
+
+    def _day_path(self, day: date) -> Path:
+        return (
+            self.archive_dir / f"year={day.year:04d}" / f"month={day.month:02d}"
+            / f"audit_logs_{day.isoformat()}{self.extension}"
+        )
+
+    async def archive_old_logs(self) -> Dict[str, Any]:
+        """Arquivar e remover todos os meses completos anteriores à janela de retenção"""
+        cutoff = month_start(datetime.utcnow() - timedelta(days=self.retention_days))
+        archived_rows = 0
+        archived_months = []
+
+        async with AsyncSessionLocal() as session:
+            oldest = (await session.execute(
+                select(AuditLog.timestamp).where(AuditLog.timestamp < cutoff)
+                .order_by(AuditLog.timestamp).limit(1)
+            )).scalar_one_or_none()
+
+            if oldest is None:
+                logger.info(f"No audit logs older than {cutoff.date()} to archive")
+                return {"archived_rows": 0, "months": [], "cutoff": cutoff.isoformat()}
+
+            month = month_start(oldest)
+            while month < cutoff:
+                next_month = add_months(month, 1)
+                rows = await self._archive_range(session, month, next_month)
+                await self._drop_range(session, month, next_month)
+                self._set_watermark(next_month)
+                archived_rows += rows
+                archived_months.append(month.strftime("%Y-%m"))
+                logger.info(f"Archived {rows} audit logs from {month.strftime('%Y-%m')}")
+                month = next_month
+
+        return {"archived_rows": archived_rows, "months": archived_months, "cutoff": cutoff.isoformat()}
+
+    async def _archive_range(self, session: AsyncSession, start: datetime, end: datetime) -> int:
+        """Exportar [start, end) em ordem (timestamp, id), um arquivo por dia"""
+        query = (
+            select(AuditLog)
+            .where(AuditLog.timestamp >= start, AuditLog.timestamp < end)
+            .order_by(AuditLog.timestamp, AuditLog.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        writer: Optional[_DayFileWriter] = None
+        pending: List[Dict[str, Any]] = []
+        total = 0
+
+        result = await session.stream(query)
+        async for audit_log in result.scalars():
+            day = audit_log.timestamp.date()
+            if writer is None or writer.path != self._day_path(day):
+                if writer is not None:
+                    await asyncio.to_thread(writer.write, pending)
+                    await asyncio.to_thread(writer.close)
+                    pending = []
+                writer = await asyncio.to_thread(_DayFileWriter, self._day_path(day), self.use_parquet)
+            pending.append({column: getattr(audit_log, column) for column in ARCHIVE_COLUMNS})
+            total += 1
+            if len(pending) >= self.batch_size:
+                await asyncio.to_thread(writer.write, pending)
+                pending = []
+
+        if writer is not None:
+            await asyncio.to_thread(writer.write, pending)
+            await asyncio.to_thread(writer.close)
+
+        return total
+
+    async def _drop_range(self, session: AsyncSession, start: datetime, end: datetime):
+        """Remover o mês arquivado: DROP da partição no PostgreSQL, DELETE nos demais"""
+        if session.get_bind().dialect.name == "postgresql":
+            partition = f"audit_logs_{start.strftime('%Y_%m')}"
+            exists = (await session.execute(text("SELECT to_regclass(:name)"), {"name": partition})).scalar()
+            if exists:
+                await session.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION "{partition}"'))
+                await session.execute(text(f'DROP TABLE "{partition}"'))
+                await session.commit()
+                return
+        await session.execute(delete(AuditLog).where(AuditLog.timestamp >= start, AuditLog.timestamp < end))
+        await session.commit()
+
+    async def stream_archived_logs(
+        self,
+        before: Optional[Tuple[datetime, int]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Ler os arquivos em ordem decrescente de (timestamp, id), um dia por vez.
+
+        `before` é o cursor (timestamp, id) exclusivo; dias fora do intervalo
+        [start_date, end_date] não são abertos. Apenas o arquivo do dia
+        corrente fica em memória, e a leitura roda fora do event loop.
+        """
+        upper = min(filter(None, [end_date, before[0] if before else None]), default=None)
+        day_files = await asyncio.to_thread(self._list_day_files)
+        for day, path in sorted(day_files, reverse=True):
+            if upper is not None and day > upper.date():
+                continue
+            if start_date is not None and day < start_date.date():
+                return
+            for record in reversed(await asyncio.to_thread(self._read_day_file, path)):
+                if before is not None and (record["timestamp"], record["id"]) >= before:
+                    continue
+                if end_date is not None and record["timestamp"] > end_date:
+                    continue
+                if start_date is not None and record["timestamp"] < start_date:
+                    return
+                yield record
+
+    def _list_day_files(self) -> List[Tuple[date, Path]]:
+        files = []
+        for path in self.archive_dir.glob(f"year=*/month=*/audit_logs_*{self.extension}"):
+            day = path.name[len("audit_logs_"):len("audit_logs_") + 10]
+            files.append((date.fromisoformat(day), path))
+        return files
+
+    def _read_day_file(self, path: Path) -> List[Dict[str, Any]]:
+        if path.suffix == ".parquet":
+            records = pq.read_table(path).to_pylist()
+            for record in records:
+                for column in ("old_values", "new_values"):
+                    if record[column] is not None:
+                        record[column] = json.loads(record[column])
+            return records
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        for record in records:
+            record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+        return records
+
+
+# Instância global do serviço
+audit_archive_service = AuditArchiveService()
@@ -2,20 +2,75 @@
 """
 Serviço de auditoria para registrar todas as ações do sistema
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterable, List, Set, Tuple
+from sqlalchemy import insert, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from datetime import datetime, timedelta
+from contextlib import aclosing
+import asyncio
+import base64
 import logging
 import json
 
+from fastapi.encoders import jsonable_encoder
+
+from ..core.config import settings
+from ..core.database import async_engine
 from ..models.audit_log import AuditLog
+from .audit_archive_service import audit_archive_service, add_months
 
 logger = logging.getLogger(__name__)
 
+# Ações que gravam o registro completo; as demais gravam apenas os campos alterados
+SNAPSHOT_ACTIONS = {"CREATE", "DELETE"}
+
 
 class AuditService:
-    """Serviço para registrar logs de auditoria"""
+    """
+    Serviço para registrar logs de auditoria.
+
+    Com o writer em execução (`start`), os registros vão para uma fila em
+    memória limitada e são gravados em lote, com INSERT multi-linha e conexão
+    própria, fora da transação da requisição. Ações listadas em
+    `sync_actions` (ou chamadas com `sync=True`) continuam sendo gravadas de
+    forma síncrona na sessão da requisição.
+
+    Apenas CREATE e DELETE guardam o registro completo; nas demais ações
+    `old_values`/`new_values` contêm só os campos que mudaram, e o estado de
+    um registro em qualquer instante é obtido com `reconstruct_record`.
+    """
+
+    def __init__(self):
+        self.async_enabled = settings.audit_async
+        self.queue_size = settings.audit_queue_size
+        self.batch_size = settings.audit_batch_size
+        self.flush_interval = settings.audit_flush_interval
+        self.sync_actions = set(settings.audit_sync_actions)
+        self.max_retries = 3
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._partition_months: set = set()
+
+    async def start(self):
+        """Criar as partições dos próximos meses e iniciar o writer em lote"""
+        await self.ensure_partitions()
+        if not self.async_enabled or self._writer_task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer_task = asyncio.create_task(self._writer(self._queue), name="audit-writer")
+        logger.info("Audit batch writer started")
+
+    async def stop(self):
+        """Parar o writer gravando tudo que ainda está na fila"""
+        if self._writer_task is None:
+            return
+        queue, self._queue = self._queue, None
+        await queue.put(None)
+        await self._writer_task
+        self._writer_task = None
+        logger.info("Audit batch writer stopped")
     
     async def log_action(
         self,
@@ -25,24 +80,48 @@ class AuditService:
         record_id: Optional[int] = None,
         admin_id: Optional[int] = None,
         old_values: Optional[Dict[str, Any]] = None,
-        new_values: Optional[Dict[str, Any]] = None
+        new_values: Optional[Dict[str, Any]] = None,
+        sync: bool = False
     ) -> AuditLog:
         """
         Registrar uma ação de auditoria
+
+        No modo assíncrono o AuditLog retornado ainda não tem `id`. Quando
+        `old_values` e `new_values` são informados numa ação que não está em
+        SNAPSHOT_ACTIONS, apenas a diferença entre eles é gravada.
         """
+        old_values = jsonable_encoder(old_values)
+        new_values = jsonable_encoder(new_values)
+        if old_values is not None and new_values is not None and action not in SNAPSHOT_ACTIONS:
+            old_values, new_values = self.diff_values(old_values, new_values)
+
+        record = {
+            "action": action,
+            "table_name": table_name,
+            "record_id": record_id,
+            "admin_id": admin_id,
+            "old_values": old_values,
+            "new_values": new_values,
+            "timestamp": datetime.utcnow()
+        }
+
+        if not sync and self._queue is not None and action not in self.sync_actions:
+            try:
+                self._queue.put_nowait(record)
+                return AuditLog(**record)
+            except asyncio.QueueFull:
+                logger.warning("Audit queue full, writing audit log synchronously")
+
         try:
-            audit_log = AuditLog(
-                action=action,
-                table_name=table_name,
-                record_id=record_id,
-                admin_id=admin_id,
-                old_values=old_values,
-                new_values=new_values,
-                timestamp=datetime.utcnow()
-            )
+            months = set()
+            if session.get_bind().dialect.name == "postgresql":
+                months = await self._ensure_partitions(session, [record["timestamp"]])
+
+            audit_log = AuditLog(**record)
             
             session.add(audit_log)
             await session.commit()
+            self._partition_months.update(months)
             await session.refresh(audit_log)
             
             logger.info(f"Audit log created: {action} on {table_name} {record_id} by admin {admin_id}")
@@ -63,10 +142,21 @@ class AuditService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         limit: int = 100,
-        offset: int = 0
+        cursor: Optional[str] = None,
+        include_archived: bool = True
     ) -> List[AuditLog]:
         """
         Buscar logs de auditoria com filtros
+
+        A paginação é por cursor (timestamp, id): passe em `cursor` o valor de
+        `encode_cursor` do último log da página anterior. Cada combinação de
+        filtros tem um índice composto terminando em (timestamp, id), então
+        cada página custa o mesmo independente da profundidade.
+
+        Quando a página não se completa no banco e o intervalo alcança o
+        período arquivado, ela é completada com os arquivos de
+        `audit_archive_service` (os logs arquivados são sempre mais antigos
+        que os do banco, então a ordem se mantém).
         """
         query = select(AuditLog)
         
@@ -87,11 +177,187 @@ class AuditService:
         
         if end_date:
             query = query.where(AuditLog.timestamp <= end_date)
+
+        if cursor:
+            cursor_timestamp, cursor_id = self.decode_cursor(cursor)
+            query = query.where(tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(cursor_timestamp, cursor_id))
         
-        query = query.order_by(AuditLog.timestamp.desc()).offset(offset).limit(limit)
+        query = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit)
         
-        result = await session.exec(query)
-        return result.all()
+        result = await session.execute(query)
+        audit_logs = list(result.scalars().all())
+
+        if include_archived and len(audit_logs) < limit:
+            watermark = audit_archive_service.get_watermark()
+            if watermark is not None and (start_date is None or start_date < watermark):
+                filters = {"table_name": table_name, "record_id": record_id, "admin_id": admin_id, "action": action}
+                filters = {field: value for field, value in filters.items() if value}
+                before = self.decode_cursor(cursor) if cursor else None
+                if audit_logs:
+                    before = (audit_logs[-1].timestamp, audit_logs[-1].id)
+
+                archived = audit_archive_service.stream_archived_logs(before, start_date, end_date)
+                async with aclosing(archived):
+                    async for record in archived:
+                        if all(record[field] == value for field, value in filters.items()):
+                            audit_logs.append(AuditLog(**record))
+                            if len(audit_logs) >= limit:
+                                break
+
+        return audit_logs
+
+    @staticmethod
+    def diff_values(old_values: Dict[str, Any], new_values: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Reduzir dois estados aos campos que diferem entre eles"""
+        changed = [field for field in new_values if old_values.get(field) != new_values[field]]
+        changed += [field for field in old_values if field not in new_values]
+        return (
+            {field: old_values.get(field) for field in changed},
+            {field: new_values.get(field) for field in changed}
+        )
+
+    async def reconstruct_record(
+        self,
+        session: AsyncSession,
+        table_name: str,
+        record_id: int,
+        at: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Estado de um registro no instante `at`, a partir do último CREATE ou
+        DELETE anterior seguido das diferenças gravadas depois dele.
+
+        Retorna None se o registro não existia (ou já tinha sido removido)
+        em `at`, ou se não há snapshot de criação nos logs disponíveis.
+        """
+        entries: List[AuditLog] = []
+        cursor = None
+        while True:
+            page = await self.get_audit_logs(
+                session, table_name=table_name, record_id=record_id,
+                end_date=at, limit=100, cursor=cursor
+            )
+            snapshot = next((i for i, log in enumerate(page) if log.action in SNAPSHOT_ACTIONS), None)
+            if snapshot is not None:
+                entries += page[:snapshot + 1]
+                break
+            entries += page
+            if len(page) < 100:
+                return None
+            cursor = self.encode_cursor(page[-1])
+
+        base = entries[-1]
+        if base.action == "DELETE":
+            return None
+        state = dict(base.new_values or {})
+        for log in reversed(entries[:-1]):
+            state.update(log.new_values or {})
+        return state
+
+    @staticmethod
+    def encode_cursor(audit_log: AuditLog) -> str:
+        """Cursor opaco para continuar a listagem após este log"""
+        raw = f"{audit_log.timestamp.isoformat()}|{audit_log.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            timestamp, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(timestamp), int(log_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid audit cursor: {cursor}") from e
+
+    async def ensure_partitions(self, months_ahead: int = 2):
+        """Criar as partições mensais do mês corrente e dos próximos meses"""
+        if async_engine.dialect.name != "postgresql":
+            return
+        today = datetime.utcnow().replace(day=1)
+        months = [add_months(today, n) for n in range(months_ahead + 1)]
+        try:
+            async with async_engine.begin() as conn:
+                created = await self._ensure_partitions(conn, months)
+            self._partition_months.update(created)
+        except Exception as e:
+            logger.warning(f"Could not create audit_logs partitions: {e}")
+
+    async def _ensure_partitions(self, conn, timestamps: Iterable[datetime]) -> Set[str]:
+        """
+        Garantir que as partições dos meses de `timestamps` existam, pulando
+        os meses já no cache local. Retorna os meses a pôr no cache só depois
+        do commit da transação de `conn`: se ela for desfeita, o CREATE TABLE
+        também é, e um mês no cache sem partição faria todo INSERT do mês falhar.
+        """
+        months = {}
+        for timestamp in timestamps:
+            months.setdefault(timestamp.strftime("%Y-%m"), timestamp)
+        for month, timestamp in months.items():
+            if month not in self._partition_months:
+                await conn.execute(text("SELECT audit_logs_ensure_partition(:ts)"), {"ts": timestamp})
+        return set(months) - self._partition_months
+
+    async def _writer(self, queue: asyncio.Queue):
+        """Consumir a fila e gravar lotes até receber o sinal de parada"""
+        stopping = False
+        loop = asyncio.get_running_loop()
+
+        while not stopping:
+            record = await queue.get()
+            if record is None:
+                break
+            batch = [record]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                try:
+                    record = queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            await self._flush(batch)
+
+        # Drenar o que sobrou na fila após o sinal de parada
+        remaining = []
+        while not queue.empty():
+            record = queue.get_nowait()
+            if record is not None:
+                remaining.append(record)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """Gravar um lote com um único INSERT multi-linha, isolando linhas inválidas em caso de erro"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                months = set()
+                async with async_engine.begin() as conn:
+                    if conn.dialect.name == "postgresql":
+                        months = await self._ensure_partitions(conn, (record["timestamp"] for record in batch))
+                    await conn.execute(insert(AuditLog).values(batch))
+                self._partition_months.update(months)
+                logger.debug(f"Audit batch written: {len(batch)} records")
+                return
+            except Exception as e:
+                logger.warning(f"Audit batch write failed (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+
+        for record in batch:
+            try:
+                months = set()
+                async with async_engine.begin() as conn:
+                    if conn.dialect.name == "postgresql":
+                        months = await self._ensure_partitions(conn, [record["timestamp"]])
+                    await conn.execute(insert(AuditLog).values(record))
+                self._partition_months.update(months)
+            except Exception as e:
+                logger.error(f"Audit log lost: {record['action']} on {record['table_name']} {record['record_id']} by admin {record['admin_id']}: {e}")
+
 
 # Instância global do serviço
 audit_service = AuditService()
@@ -2,22 +2,123 @@
 Serviço de backup automático do banco de dados
 """
 import os
-import gzip
+import re
+import json
+import fcntl
+import hashlib
 import shutil
-import subprocess
-from typing import List, Dict, Optional
+import signal
+import tempfile
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import List, Dict, Optional, Callable, Awaitable
 from datetime import datetime, timedelta
 from pathlib import Path
+import asyncio
 import logging
 
+from sqlalchemy import text
+
 from ..core.config import settings
-from .notification_service import notification_service
+from ..core.cron import CronSchedule
+from ..core.database import async_engine
+from ..core.events import event_bus, SCORES_CHANGED
+from .notification_service import notification_service, NotificationType
 
 logger = logging.getLogger(__name__)
 
+PIPE_CHUNK_SIZE = 1024 * 1024
+
+# Extensão de cada compressor; a restauração escolhe o descompressor pela extensão
+BACKUP_EXTENSIONS = {
+    "gzip": ".sql.gz",
+    "zstd": ".sql.zst",
+    "none": ".sql",
+}
+DIRECTORY_EXTENSION = ".pgdir"
+INCREMENTAL_EXTENSION = ".incr"
+MANIFEST_FILE = "manifest.json"
+
+# Mensagens do modo verbose usadas para medir o tempo de cada tabela
+TABLE_START_PATTERN = re.compile(
+    r'(?:dumping contents of table "(?P<dumping>[^"]+)"|launching item \d+ TABLE DATA (?P<launching>\S+))'
+)
+TABLE_FINISH_PATTERN = re.compile(r'finished item \d+ TABLE DATA (?P<table>\S+)')
+# Linha de `pg_restore --list`: "3335; 0 16390 TABLE DATA public scores postgres"
+TOC_TABLE_DATA_PATTERN = re.compile(r'^(?P<dump_id>\d+); \d+ \d+ TABLE DATA \S+ (?P<table>\S+)')
+
+
+def _table_name(qualified: str) -> str:
+    """Nome da tabela sem schema nem aspas (public.scores -> scores)"""
+    return qualified.replace('"', "").rsplit(".", 1)[-1]
+
+
+def _store_chunk(f_out, digest, chunk: bytes):
+    digest.update(chunk)
+    f_out.write(chunk)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f_in:
+        while chunk := f_in.read(PIPE_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _files_digest(files: Dict[str, str]) -> str:
+    """Hash único de um backup em diretório a partir dos hashes de cada arquivo"""
+    listing = "".join(f"{name} {sha256}\n" for name, sha256 in sorted(files.items()))
+    return hashlib.sha256(listing.encode()).hexdigest()
+
+
+MAX_TRACKED_JOBS = 100
+BACKUP_INDEX_FILE = "backup_index.json"
+# Tabelas cujas contagens de linhas são registradas no índice a cada backup
+ROW_COUNT_TABLES = ["admins", "players", "tournaments", "scores", "audit_logs", "import_jobs"]
+# Chave do advisory lock que garante um único worker por backup agendado
+SCHEDULED_BACKUP_LOCK_KEY = 0x62_61_6B_70  # "bakp"
+LAST_SCHEDULED_FILE = "_last_scheduled_backup"
+INDEX_FIELDS = [
+    "filename", "path", "format", "compressor", "compressed", "size", "compressed_size",
+    "duration_seconds", "sha256", "row_counts", "watermark", "parent", "base", "created_at"
+]
+
+# Tabelas exportadas nos backups incrementais, em ordem de dependência (FKs),
+# com a coluna que marca a última alteração de cada linha. audit_logs só
+# recebe inserções; remoções nas demais vêm de deleted_rows, gravada por
+# triggers na mesma transação do DELETE (migração f2c8a5d1b7e4).
+INCREMENTAL_TABLES = {
+    "admins": "updated_at",
+    "players": "updated_at",
+    "tournaments": "updated_at",
+    "scores": "updated_at",
+    "audit_logs": "timestamp",
+}
+APPEND_ONLY_TABLES = {"audit_logs"}
+DELETED_ROWS_FILE = "deleted"
+
+
+class BackupJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 
 class BackupService:
-    """Serviço para backup automático do banco de dados"""
+    """
+    Serviço para backup automático do banco de dados.
+
+    pg_dump, pg_restore, psql e os compressores rodam como subprocessos
+    asyncio. `submit_backup`/`submit_restore` executam em segundo plano e
+    retornam um job consultável com `get_job`; com `backup_schedule` definido,
+    `start` inicia um agendador cron que chama `schedule_automatic_backup`.
+    """
     
     def __init__(self):
         self.backup_dir = Path("./backups")
@@ -25,10 +126,32 @@ class BackupService:
         
         # Configurações de backup
         self.max_backups = 30  # Manter 30 backups
-        self.compress_backups = True
+        self.compressor = settings.backup_compressor
+        self.compression_level = settings.backup_compression_level
+        self.compression_threads = settings.backup_compression_threads
+        self.progress_interval = settings.backup_progress_interval
+        self.backup_format = settings.backup_format
+        self.backup_jobs = settings.backup_jobs
+        self.incremental_overlap = settings.backup_incremental_overlap
+        self.compress_backups = self.compressor != "none"
+        if self.compressor not in BACKUP_EXTENSIONS:
+            raise ValueError(f"Unknown backup compressor: {self.compressor}")
+        # Compressor do formato directory, conferido com a versão do pg_dump
+        self._directory_compressor: Optional[str] = None
         
         # Configurações do PostgreSQL
         self.db_config = self._parse_database_url()
+
+        # Jobs em segundo plano e agendamento
+        self.schedule = CronSchedule(settings.backup_schedule) if settings.backup_schedule else None
+        self._jobs: Dict[str, Dict[str, any]] = {}
+        self._job_tasks: Dict[str, asyncio.Task] = {}
+        self._run_lock = asyncio.Lock()
+        self._scheduler_task: Optional[asyncio.Task] = None
+
+        # Índice de backups (cache: mtime do arquivo, conteúdo)
+        self.verify_workers = settings.backup_verify_workers
+        self._index_cache: Optional[tuple] = None
     
     def _parse_database_url(self) -> Dict[str, str]:
         """Extrair configurações do banco da URL"""
@@ -65,224 +188,1192 @@ class BackupService:
             "database": database
         }
     
-    def create_backup(self, backup_name: Optional[str] = None) -> Dict[str, any]:
+    def _pg_env(self) -> Dict[str, str]:
+        """Ambiente dos comandos do PostgreSQL, com a senha via PGPASSWORD"""
+        env = os.environ.copy()
+        if self.db_config['password']:
+            env['PGPASSWORD'] = self.db_config['password']
+        return env
+
+    def _pg_connection_args(self) -> List[str]:
+        return [
+            f"--host={self.db_config['host']}",
+            f"--port={self.db_config['port']}",
+            f"--username={self.db_config['user']}",
+            f"--dbname={self.db_config['database']}",
+        ]
+
+    def _compressor_command(self) -> Optional[List[str]]:
+        """Comando de compressão (stdin -> stdout) do compressor configurado"""
+        if self.compressor == "zstd":
+            cmd = ["zstd", "-q", "-c", f"-T{self.compression_threads}"]
+        elif self.compressor == "gzip":
+            # pigz é o gzip multi-thread, com saída compatível
+            if shutil.which("pigz"):
+                cmd = ["pigz", "-c"]
+                if self.compression_threads:
+                    cmd.append(f"--processes={self.compression_threads}")
+            else:
+                cmd = ["gzip", "-c"]
+        else:
+            return None
+        if self.compression_level is not None:
+            cmd.append(f"-{self.compression_level}")
+        return cmd
+
+    def _decompressor_command(self, backup_path: Path) -> Optional[List[str]]:
+        """Comando de descompressão (arquivo -> stdout) pela extensão do backup"""
+        if backup_path.suffix == ".zst":
+            return ["zstd", "-q", "-d", "-c"]
+        if backup_path.suffix == ".gz":
+            return ["pigz" if shutil.which("pigz") else "gzip", "-d", "-c"]
+        return None
+
+    async def start(self):
+        """Iniciar o agendador de backups automáticos (se `backup_schedule` estiver definido)"""
+        await self._check_directory_compressor()
+        if self.schedule is None or self._scheduler_task is not None:
+            return
+        self._scheduler_task = asyncio.create_task(self._scheduler(), name="backup-scheduler")
+        logger.info(f"Backup scheduler started: {self.schedule.expression} (UTC)")
+
+    async def stop(self):
+        """Parar o agendador e cancelar jobs em andamento (os processos são encerrados)"""
+        tasks = [task for task in [self._scheduler_task, *self._job_tasks.values()] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduler_task = None
+        self._job_tasks = {}
+        logger.info("Backup scheduler stopped")
+
+    def submit_backup(
+        self,
+        backup_name: Optional[str] = None,
+        backup_format: Optional[str] = None,
+        jobs: Optional[int] = None
+    ) -> Dict[str, any]:
+        """Enfileirar um backup em segundo plano e retornar o job para acompanhamento"""
+        return self._submit_job("backup", lambda on_progress: self.create_backup(
+            backup_name, on_progress=on_progress, backup_format=backup_format, jobs=jobs
+        ))
+
+    def submit_restore(self, backup_filename: str, confirm: bool = False, jobs: Optional[int] = None) -> Dict[str, any]:
+        """Enfileirar uma restauração em segundo plano e retornar o job para acompanhamento"""
+        if not confirm:
+            raise ValueError("Restore operation requires explicit confirmation (confirm=True)")
+        return self._submit_job("restore", lambda on_progress: self.restore_backup(
+            backup_filename, confirm=True, on_progress=on_progress, jobs=jobs
+        ))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, any]]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, any]]:
+        return sorted(self._jobs.values(), key=lambda job: job["created_at"], reverse=True)
+
+    def _submit_job(self, operation: str, run: Callable[[Callable], Awaitable[Dict[str, any]]]) -> Dict[str, any]:
+        job = self._new_job(operation)
+        task = asyncio.create_task(self._run_job(job, run), name=f"backup-job-{job['id']}")
+        self._job_tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._job_tasks.pop(job["id"], None))
+        logger.info(f"Backup job {job['id']} submitted: {operation}")
+        return job
+
+    def _new_job(self, operation: str) -> Dict[str, any]:
+        job = {
+            "id": uuid.uuid4().hex,
+            "operation": operation,
+            "status": BackupJobStatus.PENDING,
+            "progress": None,
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None
+        }
+        self._jobs[job["id"]] = job
+        # Manter só o histórico recente de jobs em memória
+        for old_id in list(self._jobs)[:-MAX_TRACKED_JOBS]:
+            if self._jobs[old_id]["status"] not in (BackupJobStatus.PENDING, BackupJobStatus.RUNNING):
+                del self._jobs[old_id]
+        return job
+
+    async def _run_job(self, job: Dict[str, any], run: Callable[[Callable], Awaitable[Dict[str, any]]]):
+        """Executar um job; backups e restaurações do processo rodam um de cada vez"""
+        def on_progress(progress: Dict[str, any]):
+            job["progress"] = progress
+
+        async with self._run_lock:
+            job["status"] = BackupJobStatus.RUNNING
+            job["started_at"] = datetime.utcnow().isoformat()
+            try:
+                job["result"] = await run(on_progress)
+                job["status"] = BackupJobStatus.COMPLETED
+            except asyncio.CancelledError:
+                job["status"] = BackupJobStatus.FAILED
+                job["error"] = "Cancelled"
+                raise
+            except Exception as e:
+                job["status"] = BackupJobStatus.FAILED
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = datetime.utcnow().isoformat()
+                logger.info(f"Backup job {job['id']} finished with status {job['status'].value}")
+
+    async def _notify_error(self, title: str, message: str, data: Dict[str, any]):
+        """Registrar uma notificação de sistema sem deixar uma falha de notificação mascarar o erro original"""
+        try:
+            await notification_service.send_notification(
+                session=None, notification_type=NotificationType.SYSTEM_ERROR,
+                title=title, message=message, data=data
+            )
+        except Exception as e:
+            logger.error(f"Could not send backup notification: {e}")
+
+    def _collect_stderr(self, process: asyncio.subprocess.Process, max_lines: int = 50) -> Callable[[], Awaitable[str]]:
+        """
+        Drenar o stderr do processo em uma task, guardando só as últimas
+        linhas; a função retornada espera o fim da leitura e devolve o texto.
+        """
+        lines = deque(maxlen=max_lines)
+
+        async def drain():
+            async for line in process.stderr:
+                lines.append(line.decode(errors="replace").rstrip())
+
+        task = asyncio.create_task(drain())
+
+        async def collected() -> str:
+            await task
+            return "\n".join(lines)
+
+        return collected
+
+    @staticmethod
+    async def _terminate(*processes: Optional[asyncio.subprocess.Process]):
+        """
+        Encerrar e aguardar processos que ainda estejam rodando (ex.: job
+        cancelado). Cada processo roda em sua própria sessão, então o grupo
+        inteiro é encerrado, incluindo os workers do pg_dump/pg_restore -j.
+        Quem lê o stdout do processo já deve ter parado; o stderr é lido até o
+        fim pela task de `_collect_stderr`.
+        """
+        for process in processes:
+            if process is not None and process.returncode is None:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                # wait() só retorna quando os pipes chegam ao fim: descartar a
+                # saída que ninguém mais vai ler até o EOF
+                if process.stdout is not None:
+                    while await process.stdout.read(PIPE_CHUNK_SIZE):
+                        pass
+                await process.wait()
+
+    async def _pump(
+        self,
+        read: Callable[[int], Awaitable[bytes]],
+        write: Callable[[bytes], Awaitable[None]],
+        operation: str,
+        on_progress: Optional[Callable[[Dict[str, any]], None]] = None
+    ) -> Dict[str, any]:
+        """
+        Copiar de `read` para `write` em blocos, reportando bytes transferidos
+        e vazão a cada `progress_interval` segundos.
+        """
+        transferred = 0
+        started = time.monotonic()
+        next_report = started + self.progress_interval
+
+        while True:
+            chunk = await read(PIPE_CHUNK_SIZE)
+            if not chunk:
+                break
+            await write(chunk)
+            transferred += len(chunk)
+
+            now = time.monotonic()
+            if now >= next_report:
+                progress = self._progress(transferred, now - started)
+                logger.info(f"{operation}: {progress['mb']} MB ({progress['mb_per_second']} MB/s)")
+                if on_progress:
+                    on_progress(progress)
+                next_report = now + self.progress_interval
+
+        progress = self._progress(transferred, time.monotonic() - started)
+        if on_progress:
+            on_progress(progress)
+        return progress
+
+    @staticmethod
+    async def _store_stream(reader: asyncio.StreamReader, f_out, digest) -> int:
+        """Gravar tudo que sair de `reader` no arquivo, atualizando o hash"""
+        stored = 0
+        while True:
+            chunk = await reader.read(PIPE_CHUNK_SIZE)
+            if not chunk:
+                return stored
+            await asyncio.to_thread(_store_chunk, f_out, digest, chunk)
+            stored += len(chunk)
+
+    @staticmethod
+    def _progress(transferred: int, elapsed: float) -> Dict[str, any]:
+        mb = transferred / (1024 * 1024)
+        return {
+            "bytes": transferred,
+            "mb": round(mb, 2),
+            "seconds": round(elapsed, 2),
+            "mb_per_second": round(mb / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+    async def create_backup(
+        self,
+        backup_name: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, any]], None]] = None,
+        backup_format: Optional[str] = None,
+        jobs: Optional[int] = None
+    ) -> Dict[str, any]:
         """
         Criar backup do banco de dados
-        
+
+        No formato "plain" o dump é um único arquivo SQL comprimido em
+        streaming; no formato "directory" o pg_dump grava um arquivo por tabela
+        com `jobs` processos em paralelo, e um manifest.json registra o tempo
+        de cada tabela. O formato "incremental" exporta só as linhas alteradas
+        desde o backup anterior (ver `_create_incremental_backup`). Os
+        processos rodam via asyncio, sem bloquear o event loop; para não
+        esperar o fim do dump use `submit_backup`.
+
         Args:
             backup_name: Nome personalizado do backup
-            
+            on_progress: Chamado periodicamente com o progresso do dump
+            backup_format: "plain", "directory" ou "incremental" (padrão: settings.backup_format)
+            jobs: Processos paralelos no formato directory (padrão: settings.backup_jobs)
+
         Returns:
             Dict com informações do backup criado
         """
         try:
             timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            
-            if backup_name:
-                filename = f"{backup_name}_{timestamp}.sql"
-            else:
-                filename = f"ranking_backup_{timestamp}.sql"
-            
-            backup_path = self.backup_dir / filename
-            
-            # Comando pg_dump
-            cmd = [
-                "pg_dump",
-                f"--host={self.db_config['host']}",
-                f"--port={self.db_config['port']}",
-                f"--username={self.db_config['user']}",
-                f"--dbname={self.db_config['database']}",
-                "--verbose",
-                "--clean",
-                "--no-owner",
-                "--no-acl",
-                f"--file={backup_path}"
-            ]
-            
-            # Configurar senha via variável de ambiente
-            env = os.environ.copy()
-            if self.db_config['password']:
-                env['PGPASSWORD'] = self.db_config['password']
-            
-            # Executar pg_dump
-            logger.info(f"Starting backup: {filename}")
-            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                error_msg = f"pg_dump failed: {result.stderr}"
-                logger.error(error_msg)
-                notification_service.notify_system_error(
-                    "Backup Failed",
-                    error_msg,
-                    {"command": " ".join(cmd)}
-                )
-                raise Exception(error_msg)
-            
-            # Obter tamanho do arquivo
-            file_size = backup_path.stat().st_size
-            
-            # Comprimir se habilitado
-            if self.compress_backups:
-                compressed_path = backup_path.with_suffix(".sql.gz")
-                with open(backup_path, 'rb') as f_in:
-                    with gzip.open(compressed_path, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                
-                # Remover arquivo original
-                backup_path.unlink()
-                backup_path = compressed_path
-                compressed_size = backup_path.stat().st_size
+            prefix = backup_name or "ranking_backup"
+
+            backup_format = backup_format or self.backup_format
+            if backup_format == "incremental":
+                backup_info = await self._create_incremental_backup(f"{prefix}_{timestamp}", on_progress)
             else:
-                compressed_size = file_size
-            
-            backup_info = {
-                "filename": backup_path.name,
-                "path": str(backup_path),
-                "size": file_size,
-                "compressed_size": compressed_size,
-                "compressed": self.compress_backups,
-                "created_at": datetime.utcnow().isoformat(),
-                "success": True
-            }
-            
-            logger.info(f"Backup created successfully: {backup_path.name} ({compressed_size} bytes)")
-            
-            # Limpar backups antigos
-            self._cleanup_old_backups()
-            
+                # Linhas alteradas a partir daqui entram no próximo incremental
+                watermark = datetime.utcnow()
+                row_counts = await self._row_counts()
+                if backup_format == "directory":
+                    backup_info = await self._create_directory_backup(f"{prefix}_{timestamp}", jobs or self.backup_jobs, on_progress)
+                else:
+                    backup_info = await self._create_plain_backup(f"{prefix}_{timestamp}", on_progress)
+                backup_info["row_counts"] = row_counts
+                backup_info["watermark"] = watermark.isoformat()
+
+            # Registrar no índice e limpar backups antigos
+            await asyncio.to_thread(self._add_to_index, backup_info)
+            await asyncio.to_thread(self._cleanup_old_backups)
+
             return backup_info
-            
+
         except Exception as e:
             logger.error(f"Error creating backup: {e}")
-            notification_service.notify_system_error(
+            await self._notify_error(
                 "Backup Error",
                 str(e),
                 {"operation": "create_backup"}
             )
             raise
-    
-    def restore_backup(self, backup_filename: str, confirm: bool = False) -> Dict[str, any]:
+
+    async def restore_backup(
+        self,
+        backup_filename: str,
+        confirm: bool = False,
+        on_progress: Optional[Callable[[Dict[str, any]], None]] = None,
+        jobs: Optional[int] = None
+    ) -> Dict[str, any]:
         """
         Restaurar backup do banco de dados
-        
+
         ATENÇÃO: Esta operação irá SUBSTITUIR todos os dados atuais!
-        
+
+        Backups em diretório são restaurados com `pg_restore -j`; os demais
+        são descomprimidos em streaming direto para o psql. Um backup
+        incremental restaura o backup completo em que se baseia e aplica a
+        cadeia de incrementais até ele (ver `restore_point_in_time`).
+
         Args:
-            backup_filename: Nome do arquivo de backup
+            backup_filename: Nome do arquivo (ou diretório) de backup
             confirm: Confirmação de que quer realmente restaurar
-            
+            on_progress: Chamado periodicamente com o progresso da restauração
+            jobs: Processos paralelos do pg_restore (padrão: settings.backup_jobs)
+
         Returns:
             Dict com resultado da operação
         """
         if not confirm:
             raise ValueError("Restore operation requires explicit confirmation (confirm=True)")
-        
+
         try:
             backup_path = self.backup_dir / backup_filename
-            
+
             if not backup_path.exists():
                 raise FileNotFoundError(f"Backup file not found: {backup_filename}")
-            
-            # Se o arquivo está comprimido, descomprimir temporariamente
-            if backup_path.suffix == ".gz":
-                temp_path = backup_path.with_suffix("")
-                with gzip.open(backup_path, 'rb') as f_in:
-                    with open(temp_path, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                sql_file = temp_path
-                cleanup_temp = True
+
+            if backup_path.suffix == INCREMENTAL_EXTENSION:
+                restore_info = await self._restore_incremental_chain(backup_path, jobs or self.backup_jobs, on_progress)
+            elif backup_path.is_dir():
+                restore_info = await self._restore_directory_backup(backup_path, jobs or self.backup_jobs, on_progress)
             else:
-                sql_file = backup_path
-                cleanup_temp = False
-            
-            # Comando psql para restaurar
-            cmd = [
-                "psql",
-                f"--host={self.db_config['host']}",
-                f"--port={self.db_config['port']}",
-                f"--username={self.db_config['user']}",
-                f"--dbname={self.db_config['database']}",
-                "--quiet",
-                f"--file={sql_file}"
-            ]
-            
-            # Configurar senha
-            env = os.environ.copy()
-            if self.db_config['password']:
-                env['PGPASSWORD'] = self.db_config['password']
-            
-            # Executar restore
-            logger.warning(f"Starting database restore from: {backup_filename}")
-            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
-            # Limpar arquivo temporário se necessário
-            if cleanup_temp:
-                temp_path.unlink()
-            
-            if result.returncode != 0:
-                error_msg = f"psql restore failed: {result.stderr}"
-                logger.error(error_msg)
-                notification_service.notify_system_error(
-                    "Restore Failed",
-                    error_msg,
-                    {"backup_file": backup_filename}
-                )
-                raise Exception(error_msg)
-            
-            restore_info = {
-                "backup_file": backup_filename,
-                "restored_at": datetime.utcnow().isoformat(),
-                "success": True
-            }
-            
+                restore_info = await self._restore_plain_backup(backup_path, on_progress)
+
             logger.warning(f"Database restored successfully from: {backup_filename}")
-            notification_service.notify_system_error(
+            # Rankings em cache e posições calculadas vêm de antes da restauração
+            await event_bus.publish(SCORES_CHANGED, {"tournament_ids": None})
+            await self._notify_error(
                 "Database Restored",
                 f"Database was restored from backup: {backup_filename}",
                 restore_info
             )
-            
+
             return restore_info
-            
+
         except Exception as e:
             logger.error(f"Error restoring backup: {e}")
-            notification_service.notify_system_error(
+            await self._notify_error(
                 "Restore Error",
                 str(e),
                 {"backup_file": backup_filename}
             )
             raise
-    
+
+    async def _create_plain_backup(
+        self,
+        name: str,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Backup em SQL puro: a saída do pg_dump passa direto para o compressor
+        e dele para o arquivo final (`pg_dump | compressor | arquivo`), sem
+        arquivo intermediário descomprimido.
+        """
+        filename = f"{name}{BACKUP_EXTENSIONS[self.compressor]}"
+        backup_path = self.backup_dir / filename
+        # O arquivo só recebe o nome final quando o dump termina com sucesso
+        partial_path = backup_path.with_name(filename + ".partial")
+
+        # Comando pg_dump (saída em stdout)
+        cmd = [
+            "pg_dump",
+            *self._pg_connection_args(),
+            "--verbose",
+            "--clean",
+            "--no-owner",
+            "--no-acl",
+        ]
+        compressor_cmd = self._compressor_command()
+        dump = compressor = store_task = None
+
+        logger.info(f"Starting backup: {filename}")
+        try:
+            with open(partial_path, "wb") as f_out:
+                dump = await asyncio.create_subprocess_exec(
+                    *cmd, env=self._pg_env(), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
+                )
+                dump_errors = self._collect_stderr(dump)
+                # O SHA-256 do arquivo é calculado enquanto ele é gravado
+                digest = hashlib.sha256()
+                if compressor_cmd:
+                    compressor = await asyncio.create_subprocess_exec(
+                        *compressor_cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE, start_new_session=True
+                    )
+                    compressor_errors = self._collect_stderr(compressor)
+                    store_task = asyncio.create_task(self._store_stream(compressor.stdout, f_out, digest))
+
+                    async def write(chunk: bytes):
+                        compressor.stdin.write(chunk)
+                        await compressor.stdin.drain()
+                else:
+                    async def write(chunk: bytes):
+                        await asyncio.to_thread(_store_chunk, f_out, digest, chunk)
+
+                try:
+                    progress = await self._pump(dump.stdout.read, write, f"Backup {filename}", on_progress)
+                except (BrokenPipeError, ConnectionResetError):
+                    # O compressor parou de ler: sem ninguém lendo sua saída, o pg_dump não terminaria
+                    progress = None
+                    await self._terminate(dump)
+                finally:
+                    if compressor:
+                        compressor.stdin.close()
+
+                await dump.wait()
+                if compressor:
+                    await store_task
+                    await compressor.wait()
+
+            if compressor and (compressor.returncode != 0 or progress is None):
+                raise Exception(f"{compressor_cmd[0]} failed: {await compressor_errors()}")
+            if dump.returncode != 0:
+                error_msg = f"pg_dump failed: {await dump_errors()}"
+                logger.error(error_msg)
+                await self._notify_error(
+                    "Backup Failed",
+                    error_msg,
+                    {"command": " ".join(cmd)}
+                )
+                raise Exception(error_msg)
+
+            partial_path.replace(backup_path)
+        finally:
+            if store_task is not None:
+                store_task.cancel()
+                await asyncio.gather(store_task, return_exceptions=True)
+            await self._terminate(dump, compressor)
+            partial_path.unlink(missing_ok=True)
+
+        # Tamanho do dump (medido no pipe) e do arquivo gravado
+        file_size = progress["bytes"]
+        compressed_size = backup_path.stat().st_size
+
+        backup_info = {
+            "filename": backup_path.name,
+            "path": str(backup_path),
+            "size": file_size,
+            "compressed_size": compressed_size,
+            "compressed": self.compress_backups,
+            "compressor": self.compressor,
+            "format": "plain",
+            "sha256": digest.hexdigest(),
+            "duration_seconds": progress["seconds"],
+            "throughput_mb_s": progress["mb_per_second"],
+            "created_at": datetime.utcnow().isoformat(),
+            "success": True
+        }
+
+        logger.info(
+            f"Backup created successfully: {backup_path.name} ({compressed_size} bytes, "
+            f"{progress['mb']} MB dumped at {progress['mb_per_second']} MB/s)"
+        )
+
+        return backup_info
+
+    async def _restore_plain_backup(
+        self,
+        backup_path: Path,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Restaurar um backup SQL descomprimindo em streaming direto para o psql
+        (`arquivo | descompressor | psql`), sem arquivo temporário.
+        """
+        # Comando psql para restaurar (SQL via stdin)
+        cmd = [
+            "psql",
+            *self._pg_connection_args(),
+            "--quiet",
+        ]
+        decompressor_cmd = self._decompressor_command(backup_path)
+        restore = decompressor = None
+
+        # Executar restore
+        logger.warning(f"Starting database restore from: {backup_path.name}")
+        try:
+            with open(backup_path, "rb") as f_in:
+                restore = await asyncio.create_subprocess_exec(
+                    *cmd, env=self._pg_env(), stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
+                )
+                restore_errors = self._collect_stderr(restore)
+                if decompressor_cmd:
+                    decompressor = await asyncio.create_subprocess_exec(
+                        *decompressor_cmd, stdin=f_in, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                        start_new_session=True
+                    )
+                    decompressor_errors = self._collect_stderr(decompressor)
+                    read = decompressor.stdout.read
+                else:
+                    async def read(size: int) -> bytes:
+                        return await asyncio.to_thread(f_in.read, size)
+
+                async def write(chunk: bytes):
+                    restore.stdin.write(chunk)
+                    await restore.stdin.drain()
+
+                try:
+                    progress = await self._pump(read, write, f"Restore {backup_path.name}", on_progress)
+                except (BrokenPipeError, ConnectionResetError):
+                    # O psql parou de ler: o descompressor ficaria bloqueado escrevendo
+                    progress = None
+                    await self._terminate(decompressor)
+                finally:
+                    restore.stdin.close()
+
+                await restore.wait()
+                if decompressor:
+                    await decompressor.wait()
+        finally:
+            await self._terminate(restore, decompressor)
+
+        if restore.returncode != 0 or progress is None:
+            error_msg = f"psql restore failed: {await restore_errors()}"
+            logger.error(error_msg)
+            await self._notify_error(
+                "Restore Failed",
+                error_msg,
+                {"backup_file": backup_path.name}
+            )
+            raise Exception(error_msg)
+        if decompressor and decompressor.returncode != 0:
+            raise Exception(f"{decompressor_cmd[0]} failed: {await decompressor_errors()}")
+
+        restore_info = {
+            "backup_file": backup_path.name,
+            "restored_at": datetime.utcnow().isoformat(),
+            "size": progress["bytes"],
+            "duration_seconds": progress["seconds"],
+            "throughput_mb_s": progress["mb_per_second"],
+            "success": True
+        }
+
+        return restore_info
+
+    async def _pg_dump_supports_zstd(self) -> bool:
+        """
+        Testar --compress=zstd no pg_dump instalado: a opção só existe a partir
+        da versão 16 e depende de o build ter zstd. O pg_dump valida a opção
+        antes de conectar, então o teste aponta para um socket inexistente e
+        só verifica se o erro é de compressão.
+        """
+        with tempfile.TemporaryDirectory() as probe_dir:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    "pg_dump", "--format=directory", "--compress=zstd", "--schema-only",
+                    f"--file={probe_dir}/dump", f"--host={probe_dir}",
+                    env={**os.environ, "LC_ALL": "C"},
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+                )
+            except OSError as e:
+                logger.warning(f"Could not run pg_dump: {e}")
+                return False
+            _, stderr = await process.communicate()
+        error = stderr.decode(errors="replace").strip()
+        if "compress" in error.lower():
+            logger.warning(f"pg_dump does not support zstd in directory backups; using gzip ({error})")
+            return False
+        return True
+
+    async def _check_directory_compressor(self) -> str:
+        """
+        Compressor usado no formato directory: zstd só se o pg_dump o aceitar
+        (ver `_pg_dump_supports_zstd`; o docker-compose traz o PostgreSQL 15),
+        senão gzip. Conferido uma vez, no `start` ou no primeiro backup em
+        diretório.
+        """
+        if self._directory_compressor is None:
+            compressor = self.compressor
+            if compressor == "zstd" and not await self._pg_dump_supports_zstd():
+                compressor = "gzip"
+            self._directory_compressor = compressor
+        return self._directory_compressor
+
+    def _directory_compress_option(self) -> str:
+        """Opção --compress do pg_dump -Fd (ver `_check_directory_compressor`)"""
+        compressor = self._directory_compressor or self.compressor
+        if compressor == "zstd":
+            level = f":{self.compression_level}" if self.compression_level is not None else ""
+            return f"--compress=zstd{level}"
+        if compressor == "gzip":
+            # Um nível pensado para o zstd pode passar do máximo do gzip
+            return f"--compress={min(self.compression_level, 9) if self.compression_level is not None else 6}"
+        return "--compress=0"
+
+    async def _run_with_table_timings(
+        self,
+        cmd: List[str],
+        operation: str,
+        parallel: bool,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Executar pg_dump/pg_restore em modo verbose, medindo o tempo de cada
+        tabela a partir das mensagens de início e fim de cada item no stderr.
+
+        Sem paralelismo o pg_dump não informa o fim de cada tabela; nesse caso
+        uma tabela termina quando a próxima começa.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd, env=self._pg_env(), stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+        started = time.monotonic()
+        running: Dict[str, float] = {}
+        tables: Dict[str, Dict[str, float]] = {}
+        errors = deque(maxlen=50)
+
+        def finish(table: str, now: float):
+            table_started = running.pop(table, None)
+            if table_started is None:
+                return
+            tables[table] = {"seconds": round(now - table_started, 3)}
+            if on_progress:
+                on_progress({"table": table, "tables_done": len(tables), "seconds": round(now - started, 2)})
+
+        try:
+            async for raw_line in process.stderr:
+                line = raw_line.decode(errors="replace").rstrip()
+                now = time.monotonic()
+                match = TABLE_START_PATTERN.search(line)
+                if match:
+                    table = _table_name(match.group("dumping") or match.group("launching"))
+                    if not parallel:
+                        for previous in list(running):
+                            finish(previous, now)
+                    running[table] = now
+                    continue
+                match = TABLE_FINISH_PATTERN.search(line)
+                if match:
+                    finish(_table_name(match.group("table")), now)
+                    continue
+                errors.append(line)
+
+            await process.wait()
+        finally:
+            await self._terminate(process)
+
+        finished = time.monotonic()
+        for table in list(running):
+            finish(table, finished)
+
+        if process.returncode != 0:
+            raise Exception(f"{cmd[0]} failed: " + "\n".join(errors))
+
+        logger.info(f"{operation}: {len(tables)} tables in {finished - started:.1f}s")
+        return {"duration_seconds": round(finished - started, 2), "tables": tables}
+
+    async def _directory_table_sizes(self, backup_path: Path) -> Dict[str, int]:
+        """Tamanho em disco do arquivo de dados de cada tabela (via `pg_restore -l`)"""
+        process = await asyncio.create_subprocess_exec(
+            "pg_restore", "--list", str(backup_path),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            logger.warning(f"Could not list backup contents: {stderr.decode(errors='replace').strip()}")
+            return {}
+        sizes = {}
+        for line in stdout.decode(errors="replace").splitlines():
+            match = TOC_TABLE_DATA_PATTERN.match(line)
+            if match:
+                sizes[match.group("table")] = sum(
+                    data_file.stat().st_size for data_file in backup_path.glob(f"{match.group('dump_id')}.dat*")
+                )
+        return sizes
+
+    def _read_manifest(self, backup_path: Path) -> Dict[str, any]:
+        manifest_path = backup_path / MANIFEST_FILE
+        if not manifest_path.exists():
+            return {}
+        return json.loads(manifest_path.read_text())
+
+    def _write_manifest(self, backup_path: Path, manifest: Dict[str, any]):
+        manifest_path = backup_path / MANIFEST_FILE
+        tmp_path = manifest_path.with_name(MANIFEST_FILE + ".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        tmp_path.replace(manifest_path)
+
+    async def _create_directory_backup(
+        self,
+        name: str,
+        jobs: int,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Backup em formato diretório (`pg_dump -Fd -j N`): cada tabela vai para
+        um arquivo próprio, dumpado por um dos N processos. O tempo e o
+        tamanho de cada tabela ficam no manifest.json do diretório.
+        """
+        dirname = f"{name}{DIRECTORY_EXTENSION}"
+        backup_path = self.backup_dir / dirname
+        partial_path = backup_path.with_name(dirname + ".partial")
+        compressor = await self._check_directory_compressor()
+
+        cmd = [
+            "pg_dump",
+            *self._pg_connection_args(),
+            "--format=directory",
+            f"--jobs={jobs}",
+            self._directory_compress_option(),
+            "--verbose",
+            "--no-owner",
+            "--no-acl",
+            f"--file={partial_path}",
+        ]
+
+        logger.info(f"Starting directory backup: {dirname} ({jobs} jobs)")
+        try:
+            timings = await self._run_with_table_timings(cmd, f"Backup {dirname}", jobs > 1, on_progress)
+            partial_path.replace(backup_path)
+        except BaseException as e:
+            await asyncio.to_thread(shutil.rmtree, partial_path, ignore_errors=True)
+            if isinstance(e, Exception):
+                logger.error(str(e))
+                await self._notify_error(
+                    "Backup Failed",
+                    str(e),
+                    {"command": " ".join(cmd)}
+                )
+            raise
+
+        sizes = await self._directory_table_sizes(backup_path)
+        for table, table_timing in timings["tables"].items():
+            table_timing["bytes"] = sizes.get(table)
+        data_files = [path for path in backup_path.iterdir() if path.is_file()]
+        compressed_size = sum(path.stat().st_size for path in data_files)
+        files = await self._hash_files(data_files)
+
+        manifest = {
+            "format": "directory",
+            "jobs": jobs,
+            "compressor": compressor,
+            "created_at": datetime.utcnow().isoformat(),
+            "duration_seconds": timings["duration_seconds"],
+            "size": compressed_size,
+            "tables": timings["tables"],
+            "files": files,
+        }
+        self._write_manifest(backup_path, manifest)
+
+        slowest = sorted(timings["tables"].items(), key=lambda item: item[1]["seconds"], reverse=True)[:3]
+        slowest_tables = ", ".join(f"{table} {timing['seconds']}s" for table, timing in slowest)
+        logger.info(
+            f"Backup created successfully: {dirname} ({compressed_size} bytes in {timings['duration_seconds']}s; "
+            f"slowest tables: {slowest_tables})"
+        )
+
+        return {
+            "filename": dirname,
+            "path": str(backup_path),
+            "size": compressed_size,
+            "compressed_size": compressed_size,
+            "compressed": self.compress_backups,
+            "compressor": compressor,
+            "format": "directory",
+            "jobs": jobs,
+            "sha256": _files_digest(files),
+            "duration_seconds": timings["duration_seconds"],
+            "tables": timings["tables"],
+            "created_at": manifest["created_at"],
+            "success": True
+        }
+
+    async def _restore_directory_backup(
+        self,
+        backup_path: Path,
+        jobs: int,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Restaurar um backup em diretório com `pg_restore -j N`; os tempos por
+        tabela da restauração também são gravados no manifest.
+        """
+        cmd = [
+            "pg_restore",
+            *self._pg_connection_args(),
+            f"--jobs={jobs}",
+            "--clean",
+            "--if-exists",
+            "--no-owner",
+            "--no-acl",
+            "--verbose",
+            str(backup_path),
+        ]
+
+        logger.warning(f"Starting database restore from: {backup_path.name} ({jobs} jobs)")
+        try:
+            timings = await self._run_with_table_timings(cmd, f"Restore {backup_path.name}", True, on_progress)
+        except Exception as e:
+            logger.error(str(e))
+            await self._notify_error(
+                "Restore Failed",
+                str(e),
+                {"backup_file": backup_path.name}
+            )
+            raise
+
+        restore_info = {
+            "backup_file": backup_path.name,
+            "restored_at": datetime.utcnow().isoformat(),
+            "jobs": jobs,
+            "duration_seconds": timings["duration_seconds"],
+            "tables": timings["tables"],
+            "success": True
+        }
+
+        manifest = self._read_manifest(backup_path)
+        manifest.setdefault("restores", []).append(restore_info)
+        self._write_manifest(backup_path, manifest)
+
+        return restore_info
+
+    # Backups incrementais
+    #
+    # Cada incremental é um diretório <nome>.incr com um CSV comprimido por
+    # tabela (COPY das linhas com updated_at/timestamp depois da marca d'água
+    # do backup anterior), um CSV com as linhas removidas no período (tabela
+    # deleted_rows) e um manifest.json. A cadeia é registrada no índice:
+    # `parent` é o backup anterior e `base` o backup completo de onde ela parte.
+
+    def _incremental_parent(self) -> Dict[str, any]:
+        """Backup mais recente com marca d'água, do qual o próximo incremental continua"""
+        for entry in self._load_index()["backups"]:
+            if entry.get("watermark") and (self.backup_dir / entry["filename"]).exists():
+                return entry
+        raise ValueError("Incremental backup requires a previous full backup with a watermark")
+
+    async def _create_incremental_backup(
+        self,
+        name: str,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Exportar as linhas alteradas desde a marca d'água do backup anterior.
+
+        Todas as tabelas são lidas numa única transação REPEATABLE READ, então
+        o incremental é um retrato consistente. O intervalo começa
+        `backup_incremental_overlap` segundos antes da marca anterior para
+        cobrir transações que gravaram updated_at antes dela mas só fizeram
+        commit depois; como a aplicação é um upsert, a sobreposição é inócua.
+        """
+        if async_engine.dialect.name != "postgresql":
+            raise RuntimeError("Incremental backups require PostgreSQL")
+
+        parent = self._incremental_parent()
+        since = datetime.fromisoformat(parent["watermark"]) - timedelta(seconds=self.incremental_overlap)
+        dirname = f"{name}{INCREMENTAL_EXTENSION}"
+        backup_path = self.backup_dir / dirname
+        partial_path = backup_path.with_name(dirname + ".partial")
+        partial_path.mkdir()
+        suffix = BACKUP_EXTENSIONS[self.compressor].replace(".sql", "")
+        started = time.monotonic()
+        tables: Dict[str, Dict[str, any]] = {}
+        files: Dict[str, str] = {}
+
+        logger.info(f"Starting incremental backup: {dirname} (changes since {since.isoformat()})")
+        try:
+            async with async_engine.connect() as conn:
+                driver = (await conn.get_raw_connection()).driver_connection
+                async with driver.transaction(isolation="repeatable_read", readonly=True):
+                    watermark = datetime.utcnow()
+                    exports = {
+                        table: (
+                            f"SELECT * FROM {table} WHERE {column} > $1 AND {column} <= $2 ORDER BY id",
+                            [since, watermark]
+                        )
+                        for table, column in INCREMENTAL_TABLES.items()
+                    }
+                    exports[DELETED_ROWS_FILE] = (
+                        "SELECT table_name, record_id FROM deleted_rows "
+                        "WHERE deleted_at > $1 AND deleted_at <= $2 ORDER BY id",
+                        [since, watermark]
+                    )
+                    for table, (query, args) in exports.items():
+                        filename = f"{table}.csv{suffix}"
+                        rows, digest = await self._copy_query_to_file(
+                            driver, query, args, partial_path / filename, on_progress
+                        )
+                        tables[table] = {"rows": rows, "file": filename}
+                        files[filename] = digest
+        except BaseException:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            raise
+
+        compressed_size = sum(path.stat().st_size for path in partial_path.iterdir())
+        manifest = {
+            "format": "incremental",
+            "created_at": datetime.utcnow().isoformat(),
+            "since": since.isoformat(),
+            "watermark": watermark.isoformat(),
+            "parent": parent["filename"],
+            "base": parent.get("base") or parent["filename"],
+            "compressor": self.compressor,
+            "tables": tables,
+            "files": files,
+        }
+        self._write_manifest(partial_path, manifest)
+        partial_path.rename(backup_path)
+
+        duration = round(time.monotonic() - started, 3)
+        logger.info(
+            f"Incremental backup created: {dirname} ({compressed_size} bytes in {duration}s; "
+            + ", ".join(f"{table}={info['rows']}" for table, info in tables.items()) + ")"
+        )
+
+        return {
+            "filename": dirname,
+            "path": str(backup_path),
+            "size": compressed_size,
+            "compressed_size": compressed_size,
+            "compressed": self.compress_backups,
+            "compressor": self.compressor,
+            "format": "incremental",
+            "sha256": _files_digest(files),
+            "duration_seconds": duration,
+            "row_counts": {table: info["rows"] for table, info in tables.items()},
+            "since": manifest["since"],
+            "watermark": manifest["watermark"],
+            "parent": manifest["parent"],
+            "base": manifest["base"],
+            "created_at": manifest["created_at"],
+            "success": True
+        }
+
+    async def _copy_query_to_file(
+        self,
+        driver,
+        query: str,
+        args: List[any],
+        path: Path,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> tuple:
+        """COPY (query) TO STDOUT em CSV, passando pelo compressor até o arquivo"""
+        compressor_cmd = self._compressor_command()
+        digest = hashlib.sha256()
+        compressor = store_task = None
+        with open(path, "wb") as f_out:
+            try:
+                if compressor_cmd:
+                    compressor = await asyncio.create_subprocess_exec(
+                        *compressor_cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE, start_new_session=True
+                    )
+                    compressor_errors = self._collect_stderr(compressor)
+                    store_task = asyncio.create_task(self._store_stream(compressor.stdout, f_out, digest))
+
+                    async def write(chunk: bytes):
+                        compressor.stdin.write(chunk)
+                        await compressor.stdin.drain()
+                else:
+                    async def write(chunk: bytes):
+                        await asyncio.to_thread(_store_chunk, f_out, digest, chunk)
+
+                status = await driver.copy_from_query(query, *args, output=write, format="csv", header=True)
+                if compressor:
+                    compressor.stdin.close()
+                    await store_task
+                    if await compressor.wait() != 0:
+                        raise Exception(f"{compressor_cmd[0]} failed: {await compressor_errors()}")
+            finally:
+                if store_task is not None:
+                    # COPY interrompido: a gravação da saída do compressor não termina sozinha
+                    store_task.cancel()
+                    await asyncio.gather(store_task, return_exceptions=True)
+                await self._terminate(compressor)
+
+        rows = int(status.split()[-1])
+        if on_progress:
+            on_progress({"table": path.name.split(".")[0], "rows": rows})
+        return rows, digest.hexdigest()
+
+    def _incremental_chain(self, backup_path: Path) -> List[Dict[str, any]]:
+        """Cadeia [completo, incremental, ..., backup_path] seguindo `parent` no índice"""
+        entries = {entry["filename"]: entry for entry in self._load_index()["backups"]}
+        chain = []
+        filename = backup_path.name
+        while filename is not None:
+            entry = entries.get(filename)
+            if entry is None or not (self.backup_dir / filename).exists():
+                raise FileNotFoundError(f"Backup chain is broken: {filename} is missing")
+            chain.append(entry)
+            filename = entry.get("parent")
+        return list(reversed(chain))
+
+    async def _restore_incremental_chain(
+        self,
+        backup_path: Path,
+        jobs: int,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Restaurar o backup completo da cadeia e aplicar cada incremental em
+        ordem. Os checksums da cadeia inteira são conferidos antes de tocar no
+        banco.
+        """
+        if async_engine.dialect.name != "postgresql":
+            raise RuntimeError("Incremental restores require PostgreSQL")
+
+        chain = self._incremental_chain(backup_path)
+        checks = await self.verify_backups([entry["filename"] for entry in chain])
+        failed = [check for check in checks if not check["ok"] and check["expected"] is not None]
+        if failed:
+            raise ValueError(f"Backup chain failed verification: {', '.join(check['filename'] for check in failed)}")
+
+        base, increments = chain[0], chain[1:]
+        base_path = self.backup_dir / base["filename"]
+        started = time.monotonic()
+        if base_path.is_dir():
+            base_info = await self._restore_directory_backup(base_path, jobs, on_progress)
+        else:
+            base_info = await self._restore_plain_backup(base_path, on_progress)
+
+        applied = []
+        for entry in increments:
+            applied.append(await self._apply_increment(self.backup_dir / entry["filename"], on_progress))
+
+        return {
+            "backup_file": backup_path.name,
+            "base": base_info,
+            "increments": applied,
+            "restored_to": chain[-1]["watermark"],
+            "restored_at": datetime.utcnow().isoformat(),
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "success": True
+        }
+
+    async def _apply_increment(
+        self,
+        increment_path: Path,
+        on_progress: Optional[Callable[[Dict[str, any]], None]]
+    ) -> Dict[str, any]:
+        """
+        Aplicar um incremental numa única transação: cada CSV vai via COPY
+        para uma tabela temporária e dela para a tabela real com upsert por
+        id (audit_logs só recebe as linhas que ainda não existem), e então as
+        linhas removidas no período são apagadas em ordem inversa de FK.
+        """
+        manifest = self._read_manifest(increment_path)
+        logger.warning(f"Applying incremental backup: {increment_path.name}")
+        applied = {}
+
+        async with async_engine.connect() as conn:
+            driver = (await conn.get_raw_connection()).driver_connection
+            async with driver.transaction():
+                for table in [*INCREMENTAL_TABLES, DELETED_ROWS_FILE]:
+                    info = manifest["tables"][table]
+                    staging = f"incr_{table}"
+                    if table == DELETED_ROWS_FILE:
+                        await driver.execute(
+                            f"CREATE TEMP TABLE {staging} (table_name text, record_id integer) ON COMMIT DROP"
+                        )
+                    else:
+                        await driver.execute(
+                            f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                        )
+                    if info["rows"]:
+                        await self._copy_file_to_table(driver, increment_path / info["file"], staging)
+
+                    if table == "audit_logs":
+                        await driver.execute(
+                            "SELECT audit_logs_ensure_partition(month) FROM "
+                            "(SELECT DISTINCT date_trunc('month', timestamp) AS month FROM incr_audit_logs) months"
+                        )
+                        await driver.execute(
+                            "INSERT INTO audit_logs SELECT * FROM incr_audit_logs ON CONFLICT (id, timestamp) DO NOTHING"
+                        )
+                    elif table != DELETED_ROWS_FILE:
+                        columns = [
+                            row["attname"] for row in await driver.fetch(
+                                "SELECT attname FROM pg_attribute WHERE attrelid = $1::regclass "
+                                "AND attnum > 0 AND NOT attisdropped ORDER BY attnum", table
+                            )
+                        ]
+                        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column != "id")
+                        await driver.execute(
+                            f"INSERT INTO {table} SELECT * FROM {staging} ON CONFLICT (id) DO UPDATE SET {updates}"
+                        )
+                    if table != DELETED_ROWS_FILE:
+                        await driver.execute(
+                            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"GREATEST((SELECT max(id) FROM {table}), 1))"
+                        )
+                    applied[table] = info["rows"]
+
+                for table in reversed([t for t in INCREMENTAL_TABLES if t not in APPEND_ONLY_TABLES]):
+                    await driver.execute(
+                        f"DELETE FROM {table} WHERE id IN "
+                        f"(SELECT record_id FROM incr_{DELETED_ROWS_FILE} WHERE table_name = $1)", table
+                    )
+
+        if on_progress:
+            on_progress({"increment": increment_path.name, "rows": applied})
+        return {"backup_file": increment_path.name, "watermark": manifest["watermark"], "rows": applied}
+
+    async def _copy_file_to_table(self, driver, path: Path, table: str):
+        """Descomprimir um CSV em streaming e carregá-lo com COPY FROM STDIN"""
+        decompressor_cmd = self._decompressor_command(path)
+        decompressor = None
+        try:
+            if decompressor_cmd:
+                decompressor = await asyncio.create_subprocess_exec(
+                    *decompressor_cmd, str(path), stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE, start_new_session=True
+                )
+                decompressor_errors = self._collect_stderr(decompressor)
+
+                async def source():
+                    while chunk := await decompressor.stdout.read(PIPE_CHUNK_SIZE):
+                        yield chunk
+
+                await driver.copy_to_table(table, source=source(), format="csv", header=True)
+                if await decompressor.wait() != 0:
+                    raise Exception(f"{decompressor_cmd[0]} failed: {await decompressor_errors()}")
+            else:
+                await driver.copy_to_table(table, source=path, format="csv", header=True)
+        finally:
+            await self._terminate(decompressor)
+
+    def find_restore_point(self, as_of: datetime) -> Optional[str]:
+        """Backup mais recente (completo ou incremental) cuja marca d'água não passa de `as_of`"""
+        for entry in self._load_index()["backups"]:
+            if entry.get("watermark") and datetime.fromisoformat(entry["watermark"]) <= as_of:
+                return entry["filename"]
+        return None
+
+    async def restore_point_in_time(
+        self,
+        as_of: datetime,
+        confirm: bool = False,
+        on_progress: Optional[Callable[[Dict[str, any]], None]] = None
+    ) -> Dict[str, any]:
+        """
+        Restaurar o banco ao estado mais recente disponível até `as_of`: o
+        backup completo anterior mais os incrementais até esse instante. A
+        precisão é a do intervalo entre incrementais.
+        """
+        filename = self.find_restore_point(as_of)
+        if filename is None:
+            raise FileNotFoundError(f"No backup with a watermark before {as_of.isoformat()}")
+        return await self.restore_backup(filename, confirm=confirm, on_progress=on_progress)
+
     def list_backups(self) -> List[Dict[str, any]]:
-        """Listar todos os backups disponíveis"""
-        backups = []
-        
-        for backup_file in sorted(self.backup_dir.glob("*.sql*"), reverse=True):
-            file_stats = backup_file.stat()
-            
-            backup_info = {
-                "filename": backup_file.name,
-                "path": str(backup_file),
-                "size": file_stats.st_size,
-                "compressed": backup_file.suffix == ".gz",
-                "created_at": datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
-                "age_days": (datetime.now() - datetime.fromtimestamp(file_stats.st_mtime)).days
-            }
-            
-            backups.append(backup_info)
-        
-        return backups
+        """Listar todos os backups disponíveis (do índice, mais recente primeiro)"""
+        now = datetime.utcnow()
+        return [
+            {**entry, "age_days": (now - datetime.fromisoformat(entry["created_at"])).days}
+            for entry in self._load_index()["backups"]
+        ]
     
     def delete_backup(self, backup_filename: str) -> bool:
         """Deletar um backup específico"""
         try:
             backup_path = self.backup_dir / backup_filename
             
-            if not backup_path.exists():
+            if backup_path.is_dir():
+                shutil.rmtree(backup_path)
+            elif backup_path.exists():
+                backup_path.unlink()
+            else:
                 logger.warning(f"Backup file not found: {backup_filename}")
+
+            removed = self._update_index(lambda index: self._remove_entry(index, backup_filename))
+            if not removed and not backup_path.exists():
                 return False
-            
-            backup_path.unlink()
             logger.info(f"Backup deleted: {backup_filename}")
             return True
             
@@ -292,21 +1383,200 @@ class BackupService:
     
     def _cleanup_old_backups(self):
         """Limpar backups antigos mantendo apenas os mais recentes"""
-        backups = self.list_backups()
+        # O índice já está em ordem de criação (mais recente primeiro)
+        backups = self._load_index()["backups"]
+
+        # Só os backups completos contam para o limite; um incremental é
+        # mantido enquanto o backup completo da sua cadeia existir
+        full_backups = [backup for backup in backups if backup.get("format") != "incremental"]
+        kept = {backup['filename'] for backup in full_backups[:self.max_backups]}
         
-        if len(backups) > self.max_backups:
-            # Ordenar por data de criação (mais recente primeiro)
-            backups.sort(key=lambda x: x['created_at'], reverse=True)
-            
-            # Deletar backups excedentes
-            for backup in backups[self.max_backups:]:
+        # Deletar backups excedentes
+        for backup in backups:
+            if (backup.get("base") or backup['filename']) not in kept:
                 self.delete_backup(backup['filename'])
                 logger.info(f"Cleaned up old backup: {backup['filename']}")
+
+    # Índice de backups
+    #
+    # backup_index.json guarda uma entrada por backup (mais recente primeiro)
+    # e os totais usados em get_backup_statistics, atualizados a cada inclusão
+    # ou remoção. Assim listar e obter estatísticas não percorre o diretório.
+
+    @staticmethod
+    def _empty_index() -> Dict[str, any]:
+        return {"backups": [], "stats": {"total_backups": 0, "total_size": 0, "total_dump_size": 0, "compressed_backups": 0}}
+
+    def _load_index(self) -> Dict[str, any]:
+        """Ler o índice, relendo o arquivo só quando ele mudou (ex.: outro worker)"""
+        index_path = self.backup_dir / BACKUP_INDEX_FILE
+        if not index_path.exists():
+            self._update_index(lambda index: None)
+        mtime = index_path.stat().st_mtime_ns
+        if self._index_cache is None or self._index_cache[0] != mtime:
+            self._index_cache = (mtime, json.loads(index_path.read_text()))
+        return self._index_cache[1]
+
+    def _update_index(self, mutate: Callable[[Dict[str, any]], any]) -> any:
+        """
+        Ler-modificar-gravar o índice sob flock, para que workers diferentes
+        não percam as alterações uns dos outros. Sem índice no disco, ele é
+        reconstruído a partir do diretório (backups anteriores ao índice).
+        """
+        index_path = self.backup_dir / BACKUP_INDEX_FILE
+        with open(self.backup_dir / f"{BACKUP_INDEX_FILE}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            index = json.loads(index_path.read_text()) if index_path.exists() else self._scan_backup_dir()
+            result = mutate(index)
+            tmp_path = index_path.with_name(BACKUP_INDEX_FILE + ".tmp")
+            tmp_path.write_text(json.dumps(index, indent=1))
+            tmp_path.replace(index_path)
+            self._index_cache = (index_path.stat().st_mtime_ns, index)
+        return True if result is None else result
+
+    def _add_to_index(self, backup_info: Dict[str, any]):
+        entry = {key: backup_info.get(key) for key in INDEX_FIELDS}
+
+        def add(index: Dict[str, any]):
+            self._remove_entry(index, entry["filename"])
+            index["backups"].insert(0, entry)
+            index["backups"].sort(key=lambda item: datetime.fromisoformat(item["created_at"]), reverse=True)
+            stats = index["stats"]
+            stats["total_backups"] += 1
+            stats["total_size"] += entry["compressed_size"] or 0
+            stats["total_dump_size"] += entry["size"] or 0
+            stats["compressed_backups"] += 1 if entry["compressed"] else 0
+
+        self._update_index(add)
+
+    @staticmethod
+    def _remove_entry(index: Dict[str, any], filename: str) -> bool:
+        for position, entry in enumerate(index["backups"]):
+            if entry["filename"] == filename:
+                del index["backups"][position]
+                stats = index["stats"]
+                stats["total_backups"] -= 1
+                stats["total_size"] -= entry["compressed_size"] or 0
+                stats["total_dump_size"] -= entry["size"] or 0
+                stats["compressed_backups"] -= 1 if entry["compressed"] else 0
+                return True
+        return False
+
+    def _scan_backup_dir(self) -> Dict[str, any]:
+        """Montar o índice a partir dos arquivos existentes (sem checksum nem contagens)"""
+        index = self._empty_index()
+        # Incrementais só fazem sentido com a cadeia registrada, então não são reindexados
+        backup_files = [*self.backup_dir.glob("*.sql*"), *self.backup_dir.glob(f"*{DIRECTORY_EXTENSION}")]
+        entries = []
+        for backup_file in backup_files:
+            if backup_file.suffix == ".partial":
+                continue
+            is_directory = backup_file.is_dir()
+            if is_directory:
+                size = sum(path.stat().st_size for path in backup_file.iterdir() if path.is_file())
+            else:
+                size = backup_file.stat().st_size
+            compressed = is_directory or backup_file.suffix in (".gz", ".zst")
+            entries.append({
+                "filename": backup_file.name,
+                "path": str(backup_file),
+                "format": "directory" if is_directory else "plain",
+                "compressor": None,
+                "compressed": compressed,
+                "size": None if compressed else size,
+                "compressed_size": size,
+                "duration_seconds": None,
+                "sha256": None,
+                "row_counts": None,
+                "created_at": datetime.utcfromtimestamp(backup_file.stat().st_mtime).isoformat()
+            })
+        for entry in sorted(entries, key=lambda item: item["created_at"]):
+            index["backups"].insert(0, entry)
+            index["stats"]["total_backups"] += 1
+            index["stats"]["total_size"] += entry["compressed_size"]
+            index["stats"]["total_dump_size"] += entry["size"] or 0
+            index["stats"]["compressed_backups"] += 1 if entry["compressed"] else 0
+        if entries:
+            logger.info(f"Backup index rebuilt from {len(entries)} existing backups")
+        return index
+
+    async def _row_counts(self) -> Dict[str, int]:
+        """Contagem de linhas das tabelas principais no momento do backup"""
+        query = " UNION ALL ".join(
+            f"SELECT '{table}' AS table_name, count(*) AS row_count FROM {table}" for table in ROW_COUNT_TABLES
+        )
+        try:
+            async with async_engine.connect() as conn:
+                result = await conn.execute(text(query))
+                return {row.table_name: row.row_count for row in result}
+        except Exception as e:
+            logger.warning(f"Could not count rows for backup index: {e}")
+            return {}
+
+    async def _hash_files(self, paths: List[Path]) -> Dict[str, str]:
+        """SHA-256 de vários arquivos em paralelo (hashlib libera o GIL)"""
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.verify_workers) as executor:
+            digests = await asyncio.gather(*(loop.run_in_executor(executor, _file_sha256, path) for path in paths))
+        return {path.name: digest for path, digest in zip(paths, digests)}
+
+    async def verify_backups(self, filenames: Optional[List[str]] = None) -> List[Dict[str, any]]:
+        """
+        Conferir o SHA-256 dos backups (todos ou os informados) contra o
+        índice, com até `backup_verify_workers` arquivos lidos em paralelo.
+        Em backups em diretório cada arquivo é conferido com o manifest.json.
+        """
+        entries = {entry["filename"]: entry for entry in self._load_index()["backups"]}
+        targets = filenames or list(entries)
+
+        async def verify(filename: str) -> Dict[str, any]:
+            entry = entries.get(filename)
+            result = {"filename": filename, "ok": False, "expected": entry and entry["sha256"], "actual": None, "error": None}
+            backup_path = self.backup_dir / filename
+            if entry is None:
+                result["error"] = "not in backup index"
+            elif not backup_path.exists():
+                result["error"] = "backup file missing"
+            elif entry["sha256"] is None:
+                result["error"] = "no checksum recorded"
+            elif backup_path.is_dir():
+                expected_files = self._read_manifest(backup_path).get("files", {})
+                actual_files = await self._hash_files([backup_path / name for name in expected_files])
+                result["actual"] = _files_digest(actual_files)
+                mismatched = sorted(name for name in expected_files if actual_files.get(name) != expected_files[name])
+                if mismatched:
+                    result["error"] = f"checksum mismatch: {', '.join(mismatched)}"
+            else:
+                result["actual"] = (await self._hash_files([backup_path]))[backup_path.name]
+            if result["error"] is None and result["actual"] != result["expected"]:
+                result["error"] = "checksum mismatch"
+            result["ok"] = result["error"] is None
+            return result
+
+        # Os arquivos de cada backup já são lidos em paralelo; limitar quantos backups ao mesmo tempo
+        semaphore = asyncio.Semaphore(self.verify_workers)
+
+        async def bounded(filename: str) -> Dict[str, any]:
+            async with semaphore:
+                return await verify(filename)
+
+        results = await asyncio.gather(*(bounded(filename) for filename in targets))
+        failed = [result for result in results if not result["ok"]]
+        if failed:
+            logger.error(f"Backup verification failed for {len(failed)} of {len(results)} backups")
+            await self._notify_error(
+                "Backup Verification Failed",
+                f"{len(failed)} of {len(results)} backups failed verification",
+                {"backups": {result["filename"]: result["error"] for result in failed}}
+            )
+        else:
+            logger.info(f"Backup verification passed for {len(results)} backups")
+        return results
     
-    def schedule_automatic_backup(self) -> Dict[str, any]:
+    async def schedule_automatic_backup(self) -> Dict[str, any]:
         """Criar backup automático agendado"""
         try:
-            backup_info = self.create_backup("auto")
+            backup_info = await self.create_backup("auto")
             
             logger.info("Automatic backup completed successfully")
             
@@ -315,16 +1585,78 @@ class BackupService:
             
         except Exception as e:
             logger.error(f"Automatic backup failed: {e}")
-            notification_service.notify_system_error(
+            await self._notify_error(
                 "Automatic Backup Failed",
                 str(e),
                 {"scheduled": True}
             )
             raise
+
+    async def _scheduler(self):
+        """Dormir até o próximo horário da expressão cron e disparar o backup"""
+        last_slot = datetime.utcnow()
+        while True:
+            slot = self.schedule.next_after(max(datetime.utcnow(), last_slot))
+            await asyncio.sleep(max((slot - datetime.utcnow()).total_seconds(), 0))
+            last_slot = slot
+            try:
+                await self._run_scheduled_backup(slot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduled backup {slot.isoformat()} failed: {e}")
+
+    async def _run_scheduled_backup(self, slot: datetime):
+        """
+        Executar o backup do horário `slot` em apenas um worker: quem obtém o
+        advisory lock executa, e o horário concluído fica registrado no
+        diretório de backups para que um worker atrasado não o repita.
+        """
+        slot_key = slot.strftime("%Y%m%dT%H%M")
+        async with self._advisory_lock(SCHEDULED_BACKUP_LOCK_KEY) as acquired:
+            if not acquired:
+                logger.info(f"Scheduled backup {slot_key} is running in another worker")
+                return
+            if self._last_scheduled_slot() >= slot_key:
+                logger.info(f"Scheduled backup {slot_key} already done by another worker")
+                return
+
+            job = self._new_job("scheduled_backup")
+            await self._run_job(job, lambda on_progress: self.schedule_automatic_backup())
+            if job["status"] == BackupJobStatus.COMPLETED:
+                (self.backup_dir / LAST_SCHEDULED_FILE).write_text(slot_key)
+
+    def _last_scheduled_slot(self) -> str:
+        path = self.backup_dir / LAST_SCHEDULED_FILE
+        return path.read_text().strip() if path.exists() else ""
+
+    @asynccontextmanager
+    async def _advisory_lock(self, key: int):
+        """
+        Advisory lock de sessão do PostgreSQL (não bloqueante), mantido numa
+        conexão dedicada durante todo o bloco. Em outros bancos não há
+        disputa entre workers e o lock é sempre concedido.
+        """
+        if async_engine.dialect.name != "postgresql":
+            yield True
+            return
+
+        async with async_engine.connect() as conn:
+            acquired = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})).scalar()
+            # O lock é de sessão: encerrar a transação evita deixar a conexão "idle in transaction"
+            await conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                    await conn.commit()
     
     def get_backup_statistics(self) -> Dict[str, any]:
-        """Obter estatísticas dos backups"""
-        backups = self.list_backups()
+        """Obter estatísticas dos backups (totais mantidos no índice)"""
+        index = self._load_index()
+        backups = index["backups"]
+        stats = index["stats"]
         
         if not backups:
             return {
@@ -335,16 +1667,15 @@ class BackupService:
                 "average_size": 0
             }
         
-        total_size = sum(backup['size'] for backup in backups)
-        
         return {
-            "total_backups": len(backups),
-            "total_size": total_size,
-            "total_size_mb": round(total_size / (1024 * 1024), 2),
+            "total_backups": stats["total_backups"],
+            "total_size": stats["total_size"],
+            "total_size_mb": round(stats["total_size"] / (1024 * 1024), 2),
+            "total_dump_size": stats["total_dump_size"],
             "oldest_backup": backups[-1]['created_at'],
             "newest_backup": backups[0]['created_at'],
-            "average_size": round(total_size / len(backups)),
-            "compressed_backups": len([b for b in backups if b['compressed']])
+            "average_size": round(stats["total_size"] / stats["total_backups"]),
+            "compressed_backups": stats["compressed_backups"]
         }
 
 
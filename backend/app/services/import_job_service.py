@@ -0,0 +1,308 @@
+"""
+Serviço de jobs de importação executados em segundo plano
+"""
+from typing import List, Optional
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from pathlib import Path
+from enum import Enum
+import asyncio
+import logging
+import shutil
+import uuid
+
+from fastapi import UploadFile
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.events import event_bus, SCORES_CHANGED
+from ..models.import_job import ImportJob
+from ..schemas.imports import ImportProgress
+from .audit_service import audit_service
+from .import_service import import_service, ImportFormat, READ_BLOCK_SIZE, MAX_REPORTED_ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (ImportJobStatus.COMPLETED, ImportJobStatus.FAILED, ImportJobStatus.CANCELLED)
+
+
+class ImportJobService:
+    """
+    Fila local (asyncio) de jobs de importação, persistidos na tabela import_jobs.
+
+    O upload é gravado em disco e a requisição retorna imediatamente; os
+    workers processam o arquivo em blocos com sessões próprias, atualizando
+    os contadores do job a cada bloco confirmado.
+
+    Blocos já confirmados não são desfeitos, então um job interrompido não é
+    retomado: ao parar, os jobs em execução do processo são marcados como
+    falhos, e jobs `running` sem progresso há `import_job_stale_after`
+    segundos (processo que caiu) são marcados como falhos na inicialização
+    e periodicamente, para que quem consulta o job receba um status final.
+    """
+
+    def __init__(self):
+        self.upload_dir = Path(settings.import_upload_dir)
+        self.upload_dir.mkdir(exist_ok=True)
+        self.worker_count = settings.import_workers
+        self.stale_after = settings.import_job_stale_after
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._reaper_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Iniciar os workers, reenfileirar jobs pendentes e encerrar os interrompidos"""
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(n), name=f"import-worker-{n}")
+            for n in range(self.worker_count)
+        ]
+
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(ImportJob.id).where(ImportJob.status == ImportJobStatus.PENDING).order_by(ImportJob.id)
+                )
+                pending = result.scalars().all()
+            for job_id in pending:
+                self._queue.put_nowait(job_id)
+            if pending:
+                logger.info(f"Requeued {len(pending)} pending import jobs")
+        except Exception as e:
+            logger.warning(f"Could not requeue pending import jobs: {e}")
+
+        if self.stale_after > 0:
+            self._reaper_task = asyncio.create_task(self._reaper(), name="import-job-reaper")
+
+        logger.info(f"Import job workers started: {self.worker_count}")
+
+    async def stop(self):
+        """Parar os workers (jobs em andamento são marcados como falhos)"""
+        tasks = self._workers + ([self._reaper_task] if self._reaper_task is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._reaper_task = None
+        self._queue = None
+        logger.info("Import job workers stopped")
+
+    async def submit(
+        self,
+        session: AsyncSession,
+        kind: str,
+        upload: UploadFile,
+        file_format: ImportFormat,
+        chunk_size: int,
+        preview_only: bool,
+        admin_id: int
+    ) -> ImportJob:
+        """Gravar o upload em disco, registrar o job e colocá-lo na fila"""
+        file_path = self.upload_dir / f"{uuid.uuid4().hex}.{file_format.value}"
+        with open(file_path, "wb") as f_out:
+            await asyncio.to_thread(shutil.copyfileobj, upload.file, f_out, READ_BLOCK_SIZE)
+
+        job = ImportJob(
+            kind=kind,
+            filename=upload.filename,
+            file_path=str(file_path),
+            file_format=file_format.value,
+            chunk_size=chunk_size,
+            preview_only=preview_only,
+            admin_id=admin_id
+        )
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+
+        if self._queue is None:
+            logger.warning(f"Import workers not running; job {job.id} stays pending until next start")
+        else:
+            self._queue.put_nowait(job.id)
+
+        logger.info(f"Import job {job.id} submitted: {kind} from {upload.filename}")
+        return job
+
+    async def cancel(self, session: AsyncSession, job_id: int) -> Optional[ImportJob]:
+        """
+        Cancelar um job: pendentes são cancelados imediatamente, em execução
+        são marcados e param ao fim do bloco corrente.
+        """
+        now = datetime.utcnow()
+        result = await session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id, ImportJob.status == ImportJobStatus.PENDING)
+            .values(status=ImportJobStatus.CANCELLED, message="Cancelled before start", finished_at=now, updated_at=now)
+        )
+        if result.rowcount == 0:
+            await session.execute(
+                update(ImportJob)
+                .where(ImportJob.id == job_id, ImportJob.status == ImportJobStatus.RUNNING)
+                .values(cancel_requested=True, updated_at=now)
+            )
+        await session.commit()
+
+        job = await session.get(ImportJob, job_id)
+        if job is not None:
+            await session.refresh(job)
+            if job.status == ImportJobStatus.CANCELLED:
+                Path(job.file_path).unlink(missing_ok=True)
+        return job
+
+    async def fail_stale_jobs(self) -> List[int]:
+        """
+        Marcar como falhos os jobs `running` sem progresso há mais de
+        `stale_after` segundos (o processo que os executava parou sem
+        encerrá-los). Retorna os ids dos jobs encerrados.
+        """
+        now = datetime.utcnow()
+        failed = []
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(ImportJob.id, ImportJob.updated_at, ImportJob.processed, ImportJob.file_path).where(
+                    ImportJob.status == ImportJobStatus.RUNNING,
+                    ImportJob.updated_at < now - timedelta(seconds=self.stale_after)
+                )
+            )
+            for job_id, updated_at, processed, file_path in result.all():
+                # Só se não houve progresso desde a leitura (outro worker ainda pode estar nele)
+                marked = await session.execute(
+                    update(ImportJob)
+                    .where(ImportJob.id == job_id, ImportJob.status == ImportJobStatus.RUNNING, ImportJob.updated_at == updated_at)
+                    .values(
+                        status=ImportJobStatus.FAILED, finished_at=now, updated_at=now,
+                        message=f"Interrupted after {processed} rows (worker stopped)"
+                    )
+                )
+                if marked.rowcount:
+                    failed.append(job_id)
+                    Path(file_path).unlink(missing_ok=True)
+            await session.commit()
+
+        if failed:
+            logger.warning(f"Marked {len(failed)} interrupted import jobs as failed: {failed}")
+        return failed
+
+    async def _reaper(self):
+        while True:
+            try:
+                await self.fail_stale_jobs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Could not check for interrupted import jobs: {e}")
+            await asyncio.sleep(self.stale_after)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Import worker {worker_id} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: int):
+        async with AsyncSessionLocal() as job_session, AsyncSessionLocal() as data_session:
+            now = datetime.utcnow()
+            claimed = await job_session.execute(
+                update(ImportJob)
+                .where(ImportJob.id == job_id, ImportJob.status == ImportJobStatus.PENDING)
+                .values(status=ImportJobStatus.RUNNING, started_at=now, updated_at=now)
+            )
+            await job_session.commit()
+            if claimed.rowcount == 0:
+                # Cancelado antes de iniciar ou assumido por outro processo
+                return
+
+            job = await job_session.get(ImportJob, job_id)
+            file_path = Path(job.file_path)
+            logger.info(f"Import job {job_id} started")
+
+            try:
+                with open(file_path, "rb") as f_in:
+                    async def read_block(size: int) -> bytes:
+                        return await asyncio.to_thread(f_in.read, size)
+
+                    progress_stream = import_service.stream_import(
+                        session=data_session, kind=job.kind, read_block=read_block,
+                        fmt=ImportFormat(job.file_format), chunk_size=job.chunk_size,
+                        preview_only=job.preview_only, admin_id=job.admin_id
+                    )
+                    async with aclosing(progress_stream):
+                        async for progress in progress_stream:
+                            self._apply_progress(job, progress)
+                            await job_session.commit()
+                            await job_session.refresh(job, ["cancel_requested"])
+                            if job.cancel_requested and progress.event == "progress":
+                                job.status = ImportJobStatus.CANCELLED
+                                job.message = f"Cancelled after {job.processed} rows"
+                                break
+
+                if job.status == ImportJobStatus.RUNNING:
+                    job.status = ImportJobStatus.COMPLETED
+            except asyncio.CancelledError:
+                # Parada do serviço: blocos já confirmados ficam, o job não é retomado
+                job.status = ImportJobStatus.FAILED
+                job.message = f"Interrupted after {job.processed} rows (shutdown)"
+                raise
+            except Exception as e:
+                logger.error(f"Import job {job_id} failed: {e}")
+                job.status = ImportJobStatus.FAILED
+                job.message = str(e)
+            finally:
+                job.finished_at = datetime.utcnow()
+                job.updated_at = job.finished_at
+                job_session.add(job)
+                await job_session.commit()
+                file_path.unlink(missing_ok=True)
+
+            logger.info(f"Import job {job_id} finished with status {ImportJobStatus(job.status).value}")
+
+            if not job.preview_only and job.success > 0:
+                try:
+                    await audit_service.log_action(
+                        session=data_session, action="IMPORT", table_name=job.kind,
+                        admin_id=job.admin_id,
+                        new_values={"count": job.success, "errors": job.failed, "job_id": job.id}
+                    )
+                except Exception as e:
+                    logger.error(f"Could not audit import job {job_id}: {e}")
+                if job.kind == "scores":
+                    await event_bus.publish(SCORES_CHANGED, {"tournament_ids": None})
+
+    def _apply_progress(self, job: ImportJob, progress: ImportProgress):
+        job.processed = progress.processed
+        job.success = progress.success
+        job.failed = progress.failed
+        job.chunks = progress.chunks
+        job.updated_at = datetime.utcnow()
+        if progress.event == "completed":
+            job.errors = progress.errors
+            job.message = progress.message
+        elif progress.errors and len(job.errors or []) < MAX_REPORTED_ERRORS:
+            # Reatribuir a lista para que o SQLAlchemy detecte a alteração no JSON
+            job.errors = (job.errors or []) + progress.errors[:MAX_REPORTED_ERRORS - len(job.errors or [])]
+
+
+# Instância global do serviço
+import_job_service = ImportJobService()
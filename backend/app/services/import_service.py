@@ -2,21 +2,195 @@
 """
 Serviço para lógica de negócio de importação de dados em lote.
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Type, AsyncIterator, Awaitable, Callable, Deque
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
+from pydantic import BaseModel, ValidationError
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from enum import Enum
+import asyncio
+import codecs
+import csv
+import json
 import logging
+import multiprocessing
 
+from ..core.config import settings
 from ..models.player import Player
 from ..models.score import Score
 from ..models.tournament import Tournament
+from ..schemas.imports import ImportProgress
 from ..schemas.player import PlayerImportItem, PlayerResponse
 from ..schemas.score import ScoreImportItem, ScoreResponse
 
 logger = logging.getLogger(__name__)
 
+READ_BLOCK_SIZE = 64 * 1024
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_ITEM_MODELS: Dict[str, Type[BaseModel]] = {
+    "players": PlayerImportItem,
+    "scores": ScoreImportItem,
+}
+
+ReadBlock = Callable[[int], Awaitable[bytes]]
+ParsedChunk = Tuple[List[Tuple[int, Dict[str, Any]]], List[str]]
+
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+def detect_import_format(filename: Optional[str], content_type: Optional[str]) -> Optional[ImportFormat]:
+    """Detectar o formato do arquivo pela extensão ou pelo content-type"""
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return ImportFormat.CSV
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return ImportFormat.NDJSON
+    return None
+
+
+async def iter_import_records(read_block: ReadBlock, fmt: ImportFormat) -> AsyncIterator[str]:
+    """
+    Ler o arquivo em blocos e produzir um registro lógico por vez.
+
+    Apenas um bloco e o registro corrente ficam em memória. No CSV, campos
+    entre aspas podem conter quebras de linha: o registro só é emitido quando
+    o número de aspas acumulado é par.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    record: Optional[str] = None
+    quotes = 0
+
+    while True:
+        block = await read_block(READ_BLOCK_SIZE)
+        final = not block
+        pending += decoder.decode(block, final=final)
+        lines = pending.split("\n")
+        pending = "" if final else lines.pop()
+
+        for line in lines:
+            line = line.rstrip("\r")
+            if fmt == ImportFormat.CSV:
+                record = line if record is None else f"{record}\n{line}"
+                quotes += line.count('"')
+                if quotes % 2:
+                    continue
+                line, record, quotes = record, None, 0
+            if line.strip():
+                yield line
+
+        if final:
+            break
+
+    if record is not None and record.strip():
+        yield record
+
+
+def parse_csv_header(record: str) -> List[str]:
+    """Extrair os nomes das colunas do cabeçalho CSV"""
+    return [column.strip() for column in next(csv.reader([record]))]
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+def parse_import_chunk(
+    kind: str,
+    fmt: ImportFormat,
+    columns: Optional[List[str]],
+    records: List[str],
+    first_line: int
+) -> ParsedChunk:
+    """
+    Decodificar e validar um bloco de registros brutos.
+
+    Retorna os itens válidos (já normalizados, como dicts) acompanhados do
+    número da linha de origem e as mensagens de erro das linhas rejeitadas.
+    Roda nos processos do pool de importação, por isso recebe e devolve
+    apenas tipos simples, baratos de serializar.
+    """
+    item_model = IMPORT_ITEM_MODELS[kind]
+    items: List[Tuple[int, Dict[str, Any]]] = []
+    errors: List[str] = []
+
+    if fmt == ImportFormat.CSV:
+        rows = (
+            {column: (value.strip() or None) for column, value in zip(columns, row)}
+            for row in csv.reader(records)
+        )
+    else:
+        rows = (_load_json_row(record) for record in records)
+
+    for offset, row in enumerate(rows):
+        line = first_line + offset
+        if isinstance(row, str):
+            errors.append(f"Line {line}: {row}")
+            continue
+        try:
+            items.append((line, item_model.model_validate(row).model_dump()))
+        except ValidationError as e:
+            errors.append(f"Line {line}: Invalid row: {_format_validation_error(e)}")
+
+    return items, errors
+
+
+def _load_json_row(record: str):
+    """Decodificar uma linha NDJSON; retorna a mensagem de erro em caso de falha"""
+    try:
+        row = json.loads(record)
+    except json.JSONDecodeError as e:
+        return f"Invalid JSON: {e.msg}"
+    if not isinstance(row, dict):
+        return "Invalid JSON: expected an object"
+    return row
+
 class ImportService:
 
+    def __init__(self):
+        self.parse_workers = settings.import_parse_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Pool de processos para decodificação/validação (criado sob demanda)"""
+        if self.parse_workers <= 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Import parse pool started with {self.parse_workers} processes")
+        return self._executor
+
+    def shutdown(self):
+        """Encerrar o pool de processos de parsing"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _parse_chunk(
+        self, kind: str, fmt: ImportFormat, columns: Optional[List[str]], records: List[str], first_line: int
+    ) -> "asyncio.Future[ParsedChunk]":
+        """Agendar o parsing de um bloco no pool (ou executá-lo localmente se desabilitado)"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if executor is not None:
+            return loop.run_in_executor(executor, parse_import_chunk, kind, fmt, columns, records, first_line)
+        future = loop.create_future()
+        future.set_result(parse_import_chunk(kind, fmt, columns, records, first_line))
+        return future
+
     async def import_players(
         self, 
         session: AsyncSession, 
@@ -121,6 +295,187 @@ class ImportService:
 
         return {"success": success_count, "errors": errors, "previewed": previewed_scores}
 
+    async def stream_import(
+        self,
+        session: AsyncSession,
+        kind: str,
+        read_block: ReadBlock,
+        fmt: ImportFormat,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        preview_only: bool = False,
+        admin_id: Optional[int] = None
+    ) -> AsyncIterator[ImportProgress]:
+        """
+        Importar um arquivo CSV/NDJSON em blocos de tamanho fixo.
+
+        Cada bloco é validado, gravado e confirmado (commit) isoladamente, de
+        modo que a memória usada não depende do tamanho do arquivo. Um evento
+        de progresso (com os erros do bloco) é produzido a cada bloco e um
+        evento final, com os erros acumulados, ao término.
+        Diferente de `import_players`/`import_scores`, os blocos já gravados
+        não são desfeitos quando outros blocos têm erros.
+
+        A decodificação e a validação dos blocos rodam no pool de processos,
+        em paralelo com a gravação do bloco anterior; apenas as escritas no
+        banco ficam no event loop. O número de blocos em voo é limitado ao
+        tamanho do pool mais o bloco em gravação, o que mantém a memória
+        constante sem deixar processos ociosos durante uma escrita.
+        """
+        processed = success = failed = chunks = 0
+        errors: List[str] = []
+        columns: Optional[List[str]] = None
+        chunk: List[str] = []
+        next_line = 1
+        in_flight: Deque[Tuple["asyncio.Future[ParsedChunk]", int]] = deque()
+        max_in_flight = max(self.parse_workers, 1) + 1
+
+        async def write_next() -> ImportProgress:
+            nonlocal processed, success, failed, chunks
+            future, size = in_flight.popleft()
+            items, chunk_errors = await future
+            item_model = IMPORT_ITEM_MODELS[kind]
+            written, write_errors = await self._write_chunk(
+                session, kind, [(line, item_model.model_construct(**data)) for line, data in items],
+                preview_only, admin_id
+            )
+            chunk_errors.extend(write_errors)
+
+            processed += size
+            success += written
+            failed += len(chunk_errors)
+            chunks += 1
+            errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+            return ImportProgress(
+                event="progress", processed=processed, success=success, failed=failed, chunks=chunks,
+                errors=chunk_errors
+            )
+
+        def submit_chunk():
+            nonlocal chunk, next_line
+            in_flight.append((self._parse_chunk(kind, fmt, columns, chunk, next_line), len(chunk)))
+            next_line += len(chunk)
+            chunk = []
+
+        try:
+            async for record in iter_import_records(read_block, fmt):
+                if fmt == ImportFormat.CSV and columns is None:
+                    columns = parse_csv_header(record)
+                    continue
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    submit_chunk()
+                    if len(in_flight) >= max_in_flight:
+                        yield await write_next()
+
+            if chunk:
+                submit_chunk()
+            while in_flight:
+                yield await write_next()
+        finally:
+            for future, _ in in_flight:
+                future.cancel()
+
+        logger.info(f"Streaming {kind} import finished: {success} imported, {failed} errors in {chunks} chunks")
+
+        verb = "validated" if preview_only else "imported"
+        yield ImportProgress(
+            event="completed", processed=processed, success=success, failed=failed, chunks=chunks,
+            errors=errors, message=f"Import completed: {success} {kind} {verb}, {failed} errors"
+        )
+
+    async def _write_chunk(
+        self,
+        session: AsyncSession,
+        kind: str,
+        items: List[Tuple[int, BaseModel]],
+        preview_only: bool,
+        admin_id: Optional[int]
+    ) -> Tuple[int, List[str]]:
+        """Verificar conflitos do bloco com poucas queries e gravá-lo em uma transação"""
+        if not items:
+            return 0, []
+
+        if kind == "players":
+            records, errors = await self._prepare_players_chunk(session, items)
+        else:
+            records, errors = await self._prepare_scores_chunk(session, items, admin_id)
+
+        if records and not preview_only:
+            try:
+                session.add_all(records)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Import chunk failed: {e}")
+                first, last = items[0][0], items[-1][0]
+                return 0, errors + [f"Lines {first}-{last}: Chunk could not be saved: {str(e)}"]
+
+        return len(records), errors
+
+    async def _prepare_players_chunk(
+        self, session: AsyncSession, items: List[Tuple[int, PlayerImportItem]]
+    ) -> Tuple[List[Player], List[str]]:
+        nicknames = {item.nickname for _, item in items}
+        emails = {item.email for _, item in items if item.email}
+
+        taken_nicknames = set((await session.execute(
+            select(Player.nickname).where(Player.nickname.in_(nicknames))
+        )).scalars())
+        taken_emails = set((await session.execute(
+            select(Player.email).where(Player.email.in_(emails))
+        )).scalars()) if emails else set()
+
+        players, errors = [], []
+        for line, item in items:
+            if item.nickname in taken_nicknames:
+                errors.append(f"Line {line}: Nickname '{item.nickname}' already exists")
+                continue
+            if item.email and item.email in taken_emails:
+                errors.append(f"Line {line}: Email '{item.email}' already exists")
+                continue
+            taken_nicknames.add(item.nickname)
+            if item.email:
+                taken_emails.add(item.email)
+            players.append(Player(**item.model_dump()))
+
+        return players, errors
+
+    async def _prepare_scores_chunk(
+        self, session: AsyncSession, items: List[Tuple[int, ScoreImportItem]], admin_id: Optional[int]
+    ) -> Tuple[List[Score], List[str]]:
+        player_ids = {item.player_id for _, item in items}
+        tournament_ids = {item.tournament_id for _, item in items}
+
+        known_players = set((await session.execute(
+            select(Player.id).where(Player.id.in_(player_ids))
+        )).scalars())
+        known_tournaments = set((await session.execute(
+            select(Tournament.id).where(Tournament.id.in_(tournament_ids))
+        )).scalars())
+        pairs = {(item.player_id, item.tournament_id) for _, item in items}
+        existing_pairs = set((await session.execute(
+            select(Score.player_id, Score.tournament_id).where(
+                tuple_(Score.player_id, Score.tournament_id).in_(pairs)
+            )
+        )).tuples())
+
+        scores, errors = [], []
+        for line, item in items:
+            if item.player_id not in known_players:
+                errors.append(f"Line {line}: Player with ID {item.player_id} not found.")
+                continue
+            if item.tournament_id not in known_tournaments:
+                errors.append(f"Line {line}: Tournament with ID {item.tournament_id} not found.")
+                continue
+            pair = (item.player_id, item.tournament_id)
+            if pair in existing_pairs:
+                errors.append(f"Line {line}: Score already exists for player {item.player_id} in tournament {item.tournament_id}.")
+                continue
+            existing_pairs.add(pair)
+            scores.append(Score(**item.model_dump(), admin_id=admin_id))
+
+        return scores, errors
+
 
 # Instância global do serviço
 import_service = ImportService()
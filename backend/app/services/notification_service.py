@@ -1,21 +1,24 @@
-
 """
 Serviço de notificações para eventos importantes do sistema
 """
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Any
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from enum import Enum
+import asyncio
+import itertools
 import logging
 import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+import threading
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
 from ..models.admin import Admin
-from ..models.player import Player
-from ..models.tournament import Tournament
-from ..models.score import Score
 
 logger = logging.getLogger(__name__)
 
@@ -32,20 +35,159 @@ class NotificationType(str, Enum):
     SYSTEM_ERROR = "system_error"
 
 
+class SMTPConnectionPool:
+    """
+    Conexões SMTP reaproveitadas entre envios, uma por thread de um executor
+    próprio. O smtplib é síncrono, então todo o diálogo com o servidor
+    (conexão, STARTTLS, login e envio) acontece nessas threads, fora do event
+    loop. Antes de reusar uma conexão um NOOP confirma que ela continua viva.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = "",
+        password: str = "",
+        starttls: bool = True,
+        timeout: float = 10.0,
+        size: int = 2
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connections_opened = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self._local = threading.local()
+        self._connections: List[smtplib.SMTP] = []
+        self._lock = threading.Lock()
+
+    async def send(self, from_email: str, recipients: List[str], message: str) -> Dict[str, Any]:
+        """Enviar uma mensagem; retorna os destinatários recusados (como `sendmail`)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._send, from_email, recipients, message)
+
+    def close(self):
+        """Esperar os envios em andamento e encerrar todas as conexões"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for server in connections:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def _send(self, from_email: str, recipients: List[str], message: str) -> Dict[str, Any]:
+        server = self._connection()
+        try:
+            return server.sendmail(from_email, recipients, message)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self._discard(server)
+            raise
+
+    def _connection(self) -> smtplib.SMTP:
+        server = getattr(self._local, "server", None)
+        if server is not None:
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(server)
+
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+
+        self._local.server = server
+        with self._lock:
+            self._connections.append(server)
+            self.connections_opened += 1
+        return server
+
+    def _discard(self, server: smtplib.SMTP):
+        self._local.server = None
+        with self._lock:
+            if server in self._connections:
+                self._connections.remove(server)
+        server.close()
+
+
 class NotificationService:
-    """Serviço para envio de notificações"""
-    
+    """
+    Serviço para envio de notificações
+
+    Os emails não são enviados na requisição: com o worker em execução
+    (`start`), cada notificação com `send_email=True` entra numa fila e o
+    worker resolve os destinatários, agrupa-os em mensagens de até
+    `notification_batch_size` destinatários (em cópia oculta) e as envia
+    pelo `SMTPConnectionPool`, com novas tentativas e backoff exponencial
+    para falhas temporárias.
+
+    As notificações recentes ficam num buffer circular (`deque` com
+    `maxlen`) com IDs crescentes que nunca se repetem. Em vez de cada
+    notificação guardar quem a leu, cada admin tem um cursor com o último ID
+    lido: tudo acima dele é não lido. Como os IDs crescem com a posição no
+    buffer, consultas "desde o ID X" e a contagem de não lidas percorrem só as
+    k notificações mais novas que X, a partir do fim.
+    """
+
     def __init__(self):
-        self.email_enabled = False  # Configurar se email está habilitado
-        self.smtp_host = "localhost"
-        self.smtp_port = 587
-        self.smtp_user = ""
-        self.smtp_password = ""
-        self.from_email = "noreply@ranking.com"
-        
-        self._recent_notifications = []
+        self.email_enabled = settings.smtp_enabled
+        self.smtp_host = settings.smtp_host
+        self.smtp_port = settings.smtp_port
+        self.smtp_user = settings.smtp_user
+        self.smtp_password = settings.smtp_password
+        self.smtp_starttls = settings.smtp_starttls
+        self.smtp_timeout = settings.smtp_timeout
+        self.smtp_pool_size = settings.smtp_pool_size
+        self.from_email = settings.smtp_from
+
+        self.queue_size = settings.notification_queue_size
+        self.batch_size = settings.notification_batch_size
+        self.max_retries = settings.notification_max_retries
+        self.retry_backoff = settings.notification_retry_backoff
+
         self._max_recent = 100
-    
+        self._recent_notifications: deque = deque(maxlen=self._max_recent)
+        self._notification_ids = itertools.count(1)
+        self._read_cursors: Dict[int, int] = {}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._pool: Optional[SMTPConnectionPool] = None
+
+    async def start(self):
+        """Iniciar o worker de envio de emails (só com email habilitado)"""
+        if not self.email_enabled or self._worker_task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_task = asyncio.create_task(self._worker(self._queue), name="notification-worker")
+        logger.info("Notification email worker started")
+
+    async def stop(self):
+        """Parar o worker enviando o que ainda está na fila e fechar as conexões SMTP"""
+        if self._worker_task is not None:
+            queue, self._queue = self._queue, None
+            await queue.put(None)
+            await self._worker_task
+            self._worker_task = None
+            logger.info("Notification email worker stopped")
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.close)
+
     async def send_notification(
         self,
         session: AsyncSession,
@@ -57,70 +199,154 @@ class NotificationService:
         send_email: bool = False
     ):
         notification = {
-            'id': len(self._recent_notifications) + 1,
+            'id': next(self._notification_ids),
             'type': notification_type,
             'title': title,
             'message': message,
             'data': data or {},
             'timestamp': datetime.utcnow().isoformat(),
-            'admin_ids': admin_ids,
-            'read_by': []
+            'admin_ids': admin_ids
         }
-        
+
+        # Com maxlen, a notificação mais antiga sai sozinha (O(1))
         self._recent_notifications.append(notification)
-        if len(self._recent_notifications) > self._max_recent:
-            self._recent_notifications = self._recent_notifications[-self._max_recent:]
-        
+
         logger.info(f"Notification sent: {notification_type} - {title}")
-        
+
         if send_email and self.email_enabled:
-            await self._send_email_notification(session, notification, admin_ids)
-        
+            await self._send_email_notification(notification, admin_ids)
+
         return notification
-    
-    async def _send_email_notification(self, session: AsyncSession, notification: Dict, admin_ids: Optional[List[int]]):
-        if not self.email_enabled:
+
+    def get_notifications(
+        self,
+        admin_id: int,
+        since_id: Optional[int] = None,
+        unread_only: bool = False,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Notificações visíveis para o admin, mais recentes primeiro, com ID acima de `since_id`"""
+        if unread_only:
+            since_id = max(since_id or 0, self._read_cursors.get(admin_id, 0))
+        notifications = []
+        for notification in self._iter_since(since_id or 0):
+            if self._visible_to(notification, admin_id):
+                notifications.append({**notification, 'read': notification['id'] <= self._read_cursors.get(admin_id, 0)})
+                if len(notifications) >= limit:
+                    break
+        return notifications
+
+    def get_unread_count(self, admin_id: int) -> int:
+        """Quantidade de notificações não lidas pelo admin (percorre só as não lidas)"""
+        cursor = self._read_cursors.get(admin_id, 0)
+        return sum(1 for notification in self._iter_since(cursor) if self._visible_to(notification, admin_id))
+
+    def mark_as_read(self, admin_id: int, notification_id: Optional[int] = None) -> int:
+        """
+        Marcar como lidas as notificações do admin até `notification_id`
+        (padrão: a mais recente). O cursor só avança; retorna o novo cursor.
+        """
+        if notification_id is None:
+            notification_id = self._recent_notifications[-1]['id'] if self._recent_notifications else 0
+        cursor = max(self._read_cursors.get(admin_id, 0), notification_id)
+        self._read_cursors[admin_id] = cursor
+        return cursor
+
+    def _iter_since(self, since_id: int) -> Iterator[Dict[str, Any]]:
+        """Notificações com ID maior que `since_id`, da mais nova para a mais antiga"""
+        for notification in reversed(self._recent_notifications):
+            if notification['id'] <= since_id:
+                return
+            yield notification
+
+    @staticmethod
+    def _visible_to(notification: Dict[str, Any], admin_id: int) -> bool:
+        return not notification['admin_ids'] or admin_id in notification['admin_ids']
+
+    async def _send_email_notification(self, notification: Dict, admin_ids: Optional[List[int]]):
+        """Enfileirar o email da notificação (ou enviar direto se o worker não estiver rodando)"""
+        item = {'subject': notification['title'], 'body': notification['message'], 'admin_ids': admin_ids}
+        if self._queue is None:
+            await self._deliver(item)
             return
-        
         try:
-            query = select(Admin).where(Admin.is_active == True)
-            if admin_ids:
-                query = query.where(Admin.id.in_(admin_ids))
-            
-            result = await session.exec(query)
-            admins = result.all()
-            
-            for admin in admins:
-                if admin.email:
-                    self._send_email(
-                        to_email=admin.email,
-                        subject=notification['title'],
-                        body=notification['message']
-                    )
-        except Exception as e:
-            logger.error(f"Error sending email notifications: {e}")
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.error(f"Notification queue full, email dropped: {notification['title']}")
 
-    def _send_email(self, to_email: str, subject: str, body: str):
-        """(Sync) Enviar email individual"""
+    async def _worker(self, queue: asyncio.Queue):
+        """Enviar os emails da fila até receber o sinal de parada, e então o que restou"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            await self._deliver(item)
+
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                await self._deliver(item)
+
+    async def _deliver(self, item: Dict[str, Any]):
         try:
-            msg = MimeMultipart()
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            msg.attach(MimeText(body, 'plain'))
-            
-            # Esta parte é bloqueante e deve ser executada em um thread pool em produção
-            # ou substituída por uma biblioteca de envio de email assíncrona.
-            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_user, self.smtp_password)
-            text = msg.as_string()
-            server.sendmail(self.from_email, to_email, text)
-            server.quit()
-            
-            logger.info(f"Email sent to {to_email}")
+            recipients = await self._recipient_emails(item['admin_ids'])
+            for start in range(0, len(recipients), self.batch_size):
+                await self._send_batch(item['subject'], item['body'], recipients[start:start + self.batch_size])
         except Exception as e:
-            logger.error(f"Error sending email to {to_email}: {e}")
+            logger.error(f"Error sending email notifications: {e}")
+
+    async def _recipient_emails(self, admin_ids: Optional[List[int]]) -> List[str]:
+        """Emails dos admins ativos (ou só dos informados), com sessão própria"""
+        query = select(Admin.email).where(Admin.is_active == True, Admin.email.is_not(None))
+        if admin_ids:
+            query = query.where(Admin.id.in_(admin_ids))
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query)
+            return [email for email in result.scalars().all() if email]
+
+    async def _send_batch(self, subject: str, body: str, recipients: List[str]):
+        """Enviar uma mensagem a um lote de destinatários, repetindo falhas temporárias"""
+        message = self._build_message(subject, body)
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                refused = await self._get_pool().send(self.from_email, recipients, message)
+                if refused:
+                    logger.warning(f"Email recipients refused: {', '.join(refused)}")
+                logger.info(f"Email sent to {len(recipients) - len(refused)} recipients: {subject}")
+                return
+            except smtplib.SMTPRecipientsRefused as e:
+                logger.error(f"All email recipients refused: {', '.join(e.recipients)}")
+                return
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500:
+                    logger.error(f"Email rejected by server ({e.smtp_code}): {subject}")
+                    return
+                error = e
+            except (smtplib.SMTPException, OSError) as e:
+                error = e
+
+            logger.warning(f"Email send failed (attempt {attempt}/{self.max_retries}): {error}")
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+        logger.error(f"Email to {len(recipients)} recipients lost after {self.max_retries} attempts: {subject}")
+
+    def _build_message(self, subject: str, body: str) -> str:
+        # Os destinatários vão só no envelope (cópia oculta), não no cabeçalho
+        msg = MIMEMultipart()
+        msg['From'] = self.from_email
+        msg['To'] = self.from_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+        return msg.as_string()
+
+    def _get_pool(self) -> SMTPConnectionPool:
+        if self._pool is None:
+            self._pool = SMTPConnectionPool(
+                self.smtp_host, self.smtp_port, self.smtp_user, self.smtp_password,
+                self.smtp_starttls, self.smtp_timeout, self.smtp_pool_size
+            )
+        return self._pool
 
 # Instância global do serviço
 notification_service = NotificationService()
@@ -0,0 +1,316 @@
+"""
+Motor vetorizado (NumPy) para recálculos completos dos rankings
+"""
+from typing import Dict, NamedTuple, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from datetime import datetime
+import asyncio
+import io
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from ..core.config import settings
+from ..models.ranking_snapshot import RankingSnapshot
+from ..models.tournament_position import TournamentPosition
+from .ranking_history_service import lock_ranking_writes, ranking_history_service
+
+logger = logging.getLogger(__name__)
+
+# Cada score de jogador ativo com a ordem do seu torneio (sort_criteria)
+SCORES_QUERY = """
+    SELECT
+        CAST(s.id AS INTEGER) AS score_id, CAST(s.player_id AS INTEGER) AS player_id,
+        CAST(s.tournament_id AS INTEGER) AS tournament_id, CAST(s.points AS DOUBLE PRECISION) AS points,
+        COALESCE(t.sort_criteria = 'points_desc', false) AS descending
+    FROM scores s
+    JOIN players p ON p.id = s.player_id AND p.is_active = true
+    JOIN tournaments t ON t.id = s.tournament_id
+"""
+
+# COPY binário do PostgreSQL: cabeçalho fixo, tuplas com contagem de campos
+# e (tamanho, valor) por campo em big-endian, e -1 no fim
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + b"\x00\x00\x00\x00" + b"\x00\x00\x00\x00"
+PGCOPY_TRAILER = b"\xff\xff"
+PG_EPOCH = datetime(2000, 1, 1)
+
+if NUMPY_AVAILABLE:
+    # Todos os campos têm tamanho fixo e nenhum é nulo: cada tupla é um registro do dtype
+    SCORES_COPY_DTYPE = np.dtype([
+        ("fields", ">i2"),
+        ("score_id_size", ">i4"), ("score_id", ">i4"),
+        ("player_id_size", ">i4"), ("player_id", ">i4"),
+        ("tournament_id_size", ">i4"), ("tournament_id", ">i4"),
+        ("points_size", ">i4"), ("points", ">f8"),
+        ("descending_size", ">i4"), ("descending", "u1"),
+    ])
+    POSITIONS_COPY_DTYPE = np.dtype([
+        ("fields", ">i2"),
+        ("tournament_id_size", ">i4"), ("tournament_id", ">i4"),
+        ("player_id_size", ">i4"), ("player_id", ">i4"),
+        ("score_id_size", ">i4"), ("score_id", ">i4"),
+        ("position_size", ">i4"), ("position", ">i4"),
+        ("points_size", ">i4"), ("points", ">f8"),
+        ("computed_at_size", ">i4"), ("computed_at", ">i8"),
+    ])
+
+POSITION_COLUMNS = ["tournament_id", "player_id", "score_id", "position", "points", "computed_at"]
+
+
+class ScoreArrays(NamedTuple):
+    """Scores em vetores contíguos, um elemento por score"""
+    score_ids: "np.ndarray"
+    player_ids: "np.ndarray"
+    tournament_ids: "np.ndarray"
+    points: "np.ndarray"
+    descending: "np.ndarray"
+
+
+def competition_ranks(sorted_keys: "np.ndarray", group_starts: Optional["np.ndarray"] = None) -> "np.ndarray":
+    """
+    Posições com a semântica do RANK() para chaves já ordenadas: empates
+    dividem a posição e a seguinte pula. Com `group_starts` (True no primeiro
+    elemento de cada partição) a contagem recomeça em cada partição.
+    """
+    size = len(sorted_keys)
+    index = np.arange(size)
+    new_rank = np.empty(size, dtype=bool)
+    new_rank[:1] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=new_rank[1:])
+    if group_starts is None:
+        return np.maximum.accumulate(np.where(new_rank, index, 0)) + 1
+    new_rank |= group_starts
+    rank_index = np.maximum.accumulate(np.where(new_rank, index, 0))
+    start_index = np.maximum.accumulate(np.where(group_starts, index, 0))
+    return rank_index - start_index + 1
+
+
+def general_ranking(player_ids: "np.ndarray", points: "np.ndarray") -> Dict[str, "np.ndarray"]:
+    """
+    Ranking geral (total, média, melhor/pior score e RANK() pelo total), na
+    ordem do ranking: total decrescente, empates por player_id.
+    """
+    counts = np.bincount(player_ids)
+    totals = np.bincount(player_ids, weights=points)
+    best = np.full(len(counts), -np.inf)
+    worst = np.full(len(counts), np.inf)
+    np.maximum.at(best, player_ids, points)
+    np.minimum.at(worst, player_ids, points)
+
+    ranked = np.flatnonzero(counts)
+    ranked = ranked[np.lexsort((ranked, -totals[ranked]))]
+    ranked_totals = totals[ranked]
+    return {
+        "player_id": ranked,
+        "total_points": ranked_totals,
+        "score_count": counts[ranked],
+        "average_points": ranked_totals / counts[ranked],
+        "best_score": best[ranked],
+        "worst_score": worst[ranked],
+        "position": competition_ranks(ranked_totals),
+    }
+
+
+def best_scores(
+    tournament_ids: "np.ndarray", player_ids: "np.ndarray", score_ids: "np.ndarray",
+    points: "np.ndarray", descending: "np.ndarray"
+) -> "np.ndarray":
+    """
+    Índices de um score por (torneio, jogador): o melhor pelo sort_criteria,
+    o de menor id nos empates (a mesma regra do INSERT_SQL de
+    `tournament_position_service` para scores duplicados).
+    """
+    keys = np.where(descending, -points, points)
+    order = np.lexsort((score_ids, keys, player_ids, tournament_ids))
+    first = np.empty(len(order), dtype=bool)
+    first[:1] = True
+    np.not_equal(tournament_ids[order][1:], tournament_ids[order][:-1], out=first[1:])
+    first[1:] |= player_ids[order][1:] != player_ids[order][:-1]
+    return order[first]
+
+
+def tournament_positions(
+    tournament_ids: "np.ndarray", player_ids: "np.ndarray", points: "np.ndarray", descending: "np.ndarray"
+) -> Dict[str, "np.ndarray"]:
+    """
+    Posição de cada score no seu torneio (RANK() por torneio, na ordem do
+    sort_criteria). Retorna `order`, os índices dos scores ordenados por
+    torneio e posição, e `position`, alinhado com `order`.
+    """
+    keys = np.where(descending, -points, points)
+    order = np.lexsort((player_ids, keys, tournament_ids))
+    sorted_tournaments = tournament_ids[order]
+    group_starts = np.empty(len(order), dtype=bool)
+    group_starts[:1] = True
+    np.not_equal(sorted_tournaments[1:], sorted_tournaments[:-1], out=group_starts[1:])
+    return {"order": order, "position": competition_ranks(keys[order], group_starts)}
+
+
+def decode_scores_copy(data: bytes) -> ScoreArrays:
+    """Vetores a partir da saída de COPY ... TO STDOUT (FORMAT binary) de SCORES_QUERY"""
+    if not data.startswith(PGCOPY_HEADER) or not data.endswith(PGCOPY_TRAILER):
+        raise ValueError("Unexpected COPY binary framing")
+    body = memoryview(data)[len(PGCOPY_HEADER):len(data) - len(PGCOPY_TRAILER)]
+    if len(body) % SCORES_COPY_DTYPE.itemsize:
+        raise ValueError("COPY binary rows do not match the expected layout")
+    rows = np.frombuffer(body, dtype=SCORES_COPY_DTYPE)
+    if len(rows) and ((rows["fields"] != 5).any() or (rows["points_size"] != 8).any() or (rows["descending_size"] != 1).any()):
+        raise ValueError("COPY binary rows do not match the expected layout")
+    return ScoreArrays(
+        score_ids=rows["score_id"].astype(np.int64),
+        player_ids=rows["player_id"].astype(np.int64),
+        tournament_ids=rows["tournament_id"].astype(np.int64),
+        points=rows["points"].astype(np.float64),
+        descending=rows["descending"].astype(bool),
+    )
+
+
+def encode_positions_copy(
+    tournament_ids: "np.ndarray", player_ids: "np.ndarray", score_ids: "np.ndarray",
+    positions: "np.ndarray", points: "np.ndarray", computed_at: datetime
+) -> bytes:
+    """Linhas de tournament_rankings no formato de COPY ... FROM STDIN (FORMAT binary)"""
+    rows = np.empty(len(positions), dtype=POSITIONS_COPY_DTYPE)
+    rows["fields"] = len(POSITION_COLUMNS)
+    for column, values in (
+        ("tournament_id", tournament_ids), ("player_id", player_ids), ("score_id", score_ids), ("position", positions),
+    ):
+        rows[f"{column}_size"] = 4
+        rows[column] = values
+    rows["points_size"] = 8
+    rows["points"] = points
+    rows["computed_at_size"] = 8
+    elapsed = computed_at - PG_EPOCH
+    rows["computed_at"] = (elapsed.days * 86400 + elapsed.seconds) * 1_000_000 + elapsed.microseconds
+    return PGCOPY_HEADER + rows.tobytes() + PGCOPY_TRAILER
+
+
+class RankingEngine:
+    """
+    Recálculo completo dos rankings em memória, para quando tudo pode ter
+    mudado (importação em massa, restauração de backup): em vez de um RANK()
+    por torneio no banco, os scores de jogadores ativos são lidos uma vez para
+    vetores contíguos e totais, médias, extremos e posições saem de
+    `bincount`/`lexsort` em poucas passadas.
+
+    No PostgreSQL a leitura e a escrita usam COPY binário: os bytes recebidos
+    viram vetores com `np.frombuffer` (todas as colunas têm tamanho fixo) e as
+    posições voltam para `tournament_rankings` montadas no mesmo formato. O
+    ranking geral calculado no caminho é gravado como snapshot (ver
+    `ranking_history_service`) quando o último já tem mais de um intervalo:
+    só então as escritas em scores/players esperam até o fim da transação,
+    para o snapshot bater com os deltas. Os cálculos rodam em uma thread
+    para não travar o event loop.
+
+    Usado por `TournamentPositionService.recompute` quando todos os torneios
+    são recalculados no PostgreSQL e o NumPy está instalado
+    (`ranking_numpy_engine`). Em outros bancos a escrita é um executemany,
+    mais lento que o INSERT ... SELECT do caminho SQL.
+    """
+
+    def __init__(self):
+        self.enabled = NUMPY_AVAILABLE and settings.ranking_numpy_engine
+
+    async def load_scores(self, conn: AsyncConnection) -> ScoreArrays:
+        if conn.dialect.name == "postgresql":
+            raw = await conn.get_raw_connection()
+            buffer = io.BytesIO()
+            await raw.driver_connection.copy_from_query(SCORES_QUERY, output=buffer, format="binary")
+            return await asyncio.to_thread(decode_scores_copy, buffer.getvalue())
+
+        rows = (await conn.execute(text(SCORES_QUERY))).all()
+        columns = list(zip(*rows)) if rows else [()] * len(ScoreArrays._fields)
+        return ScoreArrays(
+            score_ids=np.array(columns[0], dtype=np.int64),
+            player_ids=np.array(columns[1], dtype=np.int64),
+            tournament_ids=np.array(columns[2], dtype=np.int64),
+            points=np.array(columns[3], dtype=np.float64),
+            descending=np.array(columns[4], dtype=bool),
+        )
+
+    @staticmethod
+    def compute(scores: ScoreArrays, tournament_ids: Sequence[int]) -> Dict[str, Dict[str, "np.ndarray"]]:
+        """Ranking geral e posições dos scores dos torneios indicados"""
+        selected = np.flatnonzero(np.isin(scores.tournament_ids, np.asarray(tournament_ids, dtype=np.int64)))
+        selected = selected[best_scores(
+            scores.tournament_ids[selected], scores.player_ids[selected], scores.score_ids[selected],
+            scores.points[selected], scores.descending[selected],
+        )]
+        positions = tournament_positions(
+            scores.tournament_ids[selected], scores.player_ids[selected],
+            scores.points[selected], scores.descending[selected],
+        )
+        rows = selected[positions["order"]]
+        return {
+            "general": general_ranking(scores.player_ids, scores.points),
+            "positions": {
+                "tournament_id": scores.tournament_ids[rows],
+                "player_id": scores.player_ids[rows],
+                "score_id": scores.score_ids[rows],
+                "position": positions["position"],
+                "points": scores.points[rows],
+            },
+        }
+
+    async def recompute(self, conn: AsyncConnection, tournament_ids: Sequence[int], computed_at: datetime) -> int:
+        """
+        Gravar as posições dos torneios indicados (as linhas anteriores já
+        devem ter sido apagadas) e um snapshot do ranking geral, na transação
+        de `conn`, se já for hora de um. Retorna o número de posições gravadas.
+        """
+        history = ranking_history_service
+        taken_at = None
+        if history.snapshot_interval > 0 and await history.snapshot_due(conn, datetime.utcnow()):
+            # Antes da leitura: os scores lidos são exatamente os deltas até
+            # taken_at. Com a trava, confirmar que outro worker não gravou antes
+            taken_at = await lock_ranking_writes(conn)
+            if not await history.snapshot_due(conn, taken_at):
+                taken_at = None
+        scores = await self.load_scores(conn)
+        result = await asyncio.to_thread(self.compute, scores, tournament_ids)
+        positions, general = result["positions"], result["general"]
+
+        if conn.dialect.name == "postgresql":
+            payload = await asyncio.to_thread(
+                encode_positions_copy,
+                positions["tournament_id"], positions["player_id"], positions["score_id"],
+                positions["position"], positions["points"], computed_at,
+            )
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_to_table(
+                TournamentPosition.__tablename__, source=io.BytesIO(payload), columns=POSITION_COLUMNS, format="binary"
+            )
+        else:
+            if len(positions["position"]):
+                await conn.execute(TournamentPosition.__table__.insert(), [
+                    {**dict(zip(positions, row)), "computed_at": computed_at}
+                    for row in zip(*(values.tolist() for values in positions.values()))
+                ])
+
+        if taken_at is not None:
+            # Snapshots guardam os vetores em ordem de id do jogador
+            by_player = np.argsort(general["player_id"], kind="stable")
+            await conn.execute(RankingSnapshot.__table__.insert().values(
+                taken_at=taken_at,
+                player_count=len(by_player),
+                player_ids=general["player_id"][by_player].astype("<i4").tobytes(),
+                positions=general["position"][by_player].astype("<i4").tobytes(),
+                total_points=general["total_points"][by_player].astype("<f8").tobytes(),
+                score_counts=general["score_count"][by_player].astype("<i4").tobytes(),
+            ))
+
+        logger.info(
+            f"Rankings recomputed in memory: {len(scores.points)} scores, "
+            f"{len(positions['position'])} tournament positions, {len(general['player_id'])} players"
+        )
+        return len(positions["position"])
+
+
+# Instância global do motor
+ranking_engine = RankingEngine()
@@ -0,0 +1,352 @@
+"""
+Serviço de histórico do ranking geral: snapshots compactos + replay de deltas
+"""
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import struct
+import sys
+
+from ..core.config import settings
+from ..core.database import async_engine
+from ..core.http_cache import ranking_versions
+from ..models.player import Player
+from ..models.ranking_delta import RankingDelta
+from ..models.ranking_snapshot import RankingSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Também pego (compartilhado) pelos triggers de ranking_deltas: ver migração d4a7c3e9f2b5
+RANKING_SNAPSHOT_LOCK_KEY = 0x68_69_73_74  # "hist"
+
+# Rankings reconstruídos mantidos por worker (um por snapshot e intervalo de replay)
+STANDINGS_CACHE_SIZE = 8
+STANDINGS_CACHE_MIN_AGE = 60  # segundos
+
+# Históricos de jogadores mantidos por worker, válidos enquanto a versão do ranking geral não muda
+HISTORY_CACHE_SIZE = 1024
+
+# O mesmo ranking do endpoint geral: jogadores ativos, RANK() pelo total.
+# Gravado em ordem de id, para achar um jogador por busca binária
+SNAPSHOT_SQL = text("""
+    SELECT p.id AS player_id, SUM(s.points) AS total_points, COUNT(s.id) AS score_count,
+           RANK() OVER (ORDER BY SUM(s.points) DESC) AS position
+    FROM players p JOIN scores s ON p.id = s.player_id
+    WHERE p.is_active = true
+    GROUP BY p.id
+    ORDER BY p.id
+""")
+
+# (player_id, total_points, score_count, position), na ordem do ranking
+Standings = List[Tuple[int, float, int, int]]
+
+
+def _pack(typecode: str, values) -> bytes:
+    vector = array(typecode, values)
+    if sys.byteorder == "big":
+        vector.byteswap()
+    return vector.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    vector = array(typecode)
+    vector.frombytes(data)
+    if sys.byteorder == "big":
+        vector.byteswap()
+    return vector
+
+
+def _find_player(player_ids: bytes, player_id: int) -> Optional[int]:
+    """Índice de `player_id` no vetor de ids (ordenado) de um snapshot, sem desempacotá-lo"""
+    ids = memoryview(player_ids).cast("i") if sys.byteorder == "little" else _unpack("i", player_ids)
+    index = bisect_left(ids, player_id)
+    return index if index < len(ids) and ids[index] == player_id else None
+
+
+async def lock_ranking_writes(conn: AsyncConnection) -> datetime:
+    """
+    Instante de um snapshot gravado na transação de `conn`. No PostgreSQL,
+    espera as escritas em scores/players em andamento e segura as próximas
+    até o fim da transação; o instante vem do relógio depois disso, então os
+    deltas já gravados ficam antes dele e os próximos depois.
+    """
+    if conn.dialect.name != "postgresql":
+        return datetime.utcnow()
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": RANKING_SNAPSHOT_LOCK_KEY})
+    return (await conn.execute(text("SELECT clock_timestamp() AT TIME ZONE 'UTC'"))).scalar()
+
+
+def rank_standings(totals: Dict[int, Tuple[float, int]]) -> Standings:
+    """Ordenar {player_id: (total, scores)} como o ranking geral, com empates do RANK()"""
+    ordered = sorted(
+        ((player_id, total, count) for player_id, (total, count) in totals.items() if count > 0),
+        key=lambda entry: (-entry[1], entry[0]),
+    )
+    standings: Standings = []
+    position = 0
+    for index, (player_id, total, count) in enumerate(ordered, start=1):
+        if index == 1 or total != standings[-1][1]:
+            position = index
+        standings.append((player_id, total, count, position))
+    return standings
+
+
+class RankingHistoryService:
+    """
+    Ranking geral em datas passadas.
+
+    A cada `ranking_snapshot_interval` segundos (um dia por padrão) o ranking
+    geral é gravado em `ranking_snapshots` como vetores binários ordenados
+    pelo id do jogador (ids, posições, totais e número de scores), cerca de
+    20 bytes por jogador. Entre snapshots, triggers gravam em `ranking_deltas` a variação
+    do total de cada jogador a cada escrita (ver migrações b3e8d1f6a7c2 e
+    d4a7c3e9f2b5).
+
+    O ranking em `as_of` parte do snapshot mais próximo e aplica os deltas do
+    intervalo até `as_of`: somando para frente a partir de um snapshot
+    anterior ou subtraindo para trás a partir de um posterior, no máximo meio
+    intervalo de deltas. Datas anteriores ao primeiro snapshot não têm
+    histórico.
+
+    Snapshots com mais de `ranking_history_retention_days` são apagados a
+    cada novo snapshot, junto com os deltas anteriores ao mais antigo que
+    restou (nenhum replay chega a eles).
+    """
+
+    def __init__(self):
+        self.snapshot_interval = settings.ranking_snapshot_interval
+        self.retention_days = settings.ranking_history_retention_days
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._standings_cache: "OrderedDict[Tuple[int, datetime, datetime], Standings]" = OrderedDict()
+        self._history_cache: "OrderedDict[Tuple[int, Tuple[int, ...], int], List[Dict]]" = OrderedDict()
+        self._current: Tuple[int, Dict[int, Tuple[int, float]]] = (0, {})
+
+    async def start(self):
+        """Iniciar os snapshots periódicos (só no PostgreSQL, onde há os triggers de deltas)"""
+        if self.snapshot_interval <= 0 or async_engine.dialect.name != "postgresql" or self._snapshot_task is not None:
+            return
+        self._snapshot_task = asyncio.create_task(self._snapshotter(), name="ranking-snapshotter")
+
+    async def stop(self):
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            self._snapshot_task = None
+
+    async def take_snapshot(self, force: bool = False) -> Optional[datetime]:
+        """
+        Gravar o ranking geral atual. Sem `force`, só grava se o último
+        snapshot tiver mais de um intervalo; retorna o instante gravado ou
+        None se nada foi feito (ex.: outro worker acabou de gravar).
+        """
+        async with async_engine.begin() as conn:
+            # Workers concorrentes gravam um de cada vez; o segundo vê o snapshot do primeiro
+            taken_at = await lock_ranking_writes(conn)
+
+            if not force and not await self.snapshot_due(conn, taken_at):
+                return None
+
+            rows = (await conn.execute(SNAPSHOT_SQL)).all()
+            await conn.execute(RankingSnapshot.__table__.insert().values(
+                taken_at=taken_at,
+                player_count=len(rows),
+                player_ids=_pack("i", (row.player_id for row in rows)),
+                positions=_pack("i", (row.position for row in rows)),
+                total_points=_pack("d", (float(row.total_points) for row in rows)),
+                score_counts=_pack("i", (row.score_count for row in rows)),
+            ))
+            if self.retention_days > 0:
+                await self._prune(conn, taken_at - timedelta(days=self.retention_days))
+
+        logger.info(f"Ranking snapshot taken at {taken_at} with {len(rows)} players")
+        return taken_at
+
+    async def snapshot_due(self, conn: AsyncConnection, now: datetime) -> bool:
+        """Se o último snapshot tem mais de um intervalo em `now` (ou não há nenhum)"""
+        latest = (await conn.execute(select(func.max(RankingSnapshot.taken_at)))).scalar()
+        return latest is None or now - latest >= timedelta(seconds=self.snapshot_interval)
+
+    @staticmethod
+    async def _prune(conn: AsyncConnection, cutoff: datetime):
+        await conn.execute(delete(RankingSnapshot).where(RankingSnapshot.taken_at < cutoff))
+        # O replay só lê deltas depois do snapshot mais antigo
+        oldest = select(func.min(RankingSnapshot.taken_at)).scalar_subquery()
+        await conn.execute(delete(RankingDelta).where(RankingDelta.changed_at <= oldest))
+
+    async def standings_at(self, session: AsyncSession, as_of: datetime) -> Optional[Standings]:
+        """Ranking geral completo em `as_of`, ou None antes do primeiro snapshot"""
+        before = (await session.execute(
+            select(RankingSnapshot.id, RankingSnapshot.taken_at)
+            .where(RankingSnapshot.taken_at <= as_of)
+            .order_by(RankingSnapshot.taken_at.desc()).limit(1)
+        )).first()
+        if before is None:
+            return None
+        after = (await session.execute(
+            select(RankingSnapshot.id, RankingSnapshot.taken_at)
+            .where(RankingSnapshot.taken_at > as_of)
+            .order_by(RankingSnapshot.taken_at).limit(1)
+        )).first()
+
+        if after is not None and after.taken_at - as_of < as_of - before.taken_at:
+            snapshot_id, start, end, sign = after.id, as_of, after.taken_at, -1
+        else:
+            snapshot_id, start, end, sign = before.id, before.taken_at, as_of, 1
+
+        key = (snapshot_id, start, end)
+        standings = self._standings_cache.get(key)
+        if standings is not None:
+            self._standings_cache.move_to_end(key)
+            return standings
+
+        snapshot = await session.get(RankingSnapshot, snapshot_id)
+        deltas = (await session.execute(
+            select(
+                RankingDelta.player_id,
+                func.sum(RankingDelta.points_delta).label("points_delta"),
+                func.sum(RankingDelta.count_delta).label("count_delta"),
+            )
+            .where(RankingDelta.changed_at > start, RankingDelta.changed_at <= end)
+            .group_by(RankingDelta.player_id)
+        )).all()
+
+        player_ids = _unpack("i", snapshot.player_ids)
+        total_points = _unpack("d", snapshot.total_points)
+        score_counts = _unpack("i", snapshot.score_counts)
+        if not deltas:
+            # Sem replay: as posições gravadas valem como estão, na ordem do ranking
+            standings = sorted(
+                zip(player_ids, total_points, score_counts, _unpack("i", snapshot.positions)),
+                key=lambda entry: (entry[3], entry[0]),
+            )
+        else:
+            totals = {player_id: [total, count] for player_id, total, count in zip(player_ids, total_points, score_counts)}
+            for delta in deltas:
+                entry = totals.setdefault(delta.player_id, [0.0, 0])
+                entry[0] += sign * delta.points_delta
+                entry[1] += sign * delta.count_delta
+            standings = rank_standings(totals)
+
+        # Perto de agora ainda podem chegar deltas; só o passado fica em cache
+        if as_of < datetime.utcnow() - timedelta(seconds=STANDINGS_CACHE_MIN_AGE):
+            self._standings_cache[key] = standings
+            if len(self._standings_cache) > STANDINGS_CACHE_SIZE:
+                self._standings_cache.popitem(last=False)
+        return standings
+
+    async def get_general_ranking_as_of(
+        self, session: AsyncSession, as_of: datetime, page: int, size: int
+    ) -> Optional[Dict]:
+        """Página do ranking geral em `as_of`, no formato de RankingResponse"""
+        standings = await self.standings_at(session, as_of)
+        if standings is None:
+            return None
+
+        offset = (page - 1) * size
+        page_standings = standings[offset:offset + size]
+        players = {
+            row.id: row for row in (await session.execute(
+                select(Player.id, Player.name, Player.nickname, Player.avatar_url)
+                .where(Player.id.in_([entry[0] for entry in page_standings]))
+            )).all()
+        } if page_standings else {}
+
+        # Mínimo e máximo não sobrevivem ao replay de deltas: ficam de fora
+        entries = [
+            {
+                "position": position, "player_id": player_id,
+                "player_name": players[player_id].name, "player_nickname": players[player_id].nickname,
+                "avatar_url": players[player_id].avatar_url,
+                "total_points": total, "total_tournaments": count, "average_points": total / count,
+                "best_score": None, "worst_score": None, "score_date": None, "notes": None,
+            }
+            for player_id, total, count, position in page_standings
+            if player_id in players
+        ]
+        total = len(standings)
+        return {
+            "entries": entries,
+            "total": total,
+            "page": page,
+            "size": size,
+            "pages": (total + size - 1) // size if total > 0 else 1,
+            "ranking_type": "general",
+            "as_of": as_of,
+        }
+
+    async def get_player_history(
+        self, session: AsyncSession, player_id: int, since: datetime
+    ) -> List[Dict]:
+        """
+        Posição do jogador em cada snapshot desde `since` e, por último, a
+        atual (último snapshot + deltas). Snapshots em que o jogador não
+        estava no ranking ficam de fora. Em cache até a versão do ranking
+        geral (ou o conjunto de snapshots do período) mudar.
+        """
+        version = ranking_versions.general()
+        snapshot_ids = tuple((await session.execute(
+            select(RankingSnapshot.id).where(RankingSnapshot.taken_at >= since).order_by(RankingSnapshot.taken_at)
+        )).scalars())
+        key = (player_id, snapshot_ids, version)
+        history = self._history_cache.get(key)
+        if history is not None:
+            self._history_cache.move_to_end(key)
+            return history
+
+        history = []
+        if snapshot_ids:
+            snapshots = (await session.execute(
+                select(RankingSnapshot.taken_at, RankingSnapshot.player_ids, RankingSnapshot.positions, RankingSnapshot.total_points)
+                .where(RankingSnapshot.id.in_(snapshot_ids))
+                .order_by(RankingSnapshot.taken_at)
+            )).all()
+            for snapshot in snapshots:
+                index = _find_player(snapshot.player_ids, player_id)
+                if index is None:
+                    continue
+                history.append({
+                    "taken_at": snapshot.taken_at,
+                    "position": struct.unpack_from("<i", snapshot.positions, 4 * index)[0],
+                    "total_points": struct.unpack_from("<d", snapshot.total_points, 8 * index)[0],
+                })
+
+        current = await self._current_positions(session, version)
+        if player_id in current:
+            position, total = current[player_id]
+            history.append({"taken_at": datetime.utcnow(), "position": position, "total_points": total})
+
+        self._history_cache[key] = history
+        if len(self._history_cache) > HISTORY_CACHE_SIZE:
+            self._history_cache.popitem(last=False)
+        return history
+
+    async def _current_positions(self, session: AsyncSession, version: int) -> Dict[int, Tuple[int, float]]:
+        """{player_id: (posição, total)} do ranking atual, um replay por versão do ranking geral"""
+        current_version, positions = self._current
+        if current_version != version:
+            standings = await self.standings_at(session, datetime.utcnow()) or ()
+            positions = {player_id: (position, total) for player_id, total, _, position in standings}
+            self._current = (version, positions)
+        return positions
+
+    async def _snapshotter(self):
+        # Conferir com frequência bem menor que o intervalo; só um worker grava
+        check_interval = min(self.snapshot_interval, 300)
+        while True:
+            try:
+                await self.take_snapshot()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ranking snapshot failed: {e}")
+            await asyncio.sleep(check_interval)
+
+
+# Instância global do serviço
+ranking_history_service = RankingHistoryService()
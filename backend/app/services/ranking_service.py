@@ -4,16 +4,65 @@ Serviço para cálculo e cache de rankings
 """
 from typing import List, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import JSON
 from sqlmodel import text
 import logging
 
 from ..core.cache import RankingCache
-from ..models.player import Player
+from ..core.database import rows_as_dicts
+from ..core.http_cache import ranking_versions
 from ..models.tournament import Tournament
-from ..schemas.ranking import RankingEntry, PlayerStats, GeneralStats
+from ..schemas.ranking import PlayerStats, GeneralStats
+from .tournament_position_service import tournament_position_service
 
 logger = logging.getLogger(__name__)
 
+# Estatísticas de um jogador em uma única ida ao banco. As posições por
+# torneio vêm de tournament_rankings (busca pelo índice de player_id, sem
+# RANK() sobre os torneios do jogador). A posição geral é 1 + jogadores
+# ativos com total maior (o mesmo que o RANK() do ranking geral), 0 sem scores.
+PLAYER_STATS_QUERY = text("""
+    WITH totals AS (
+        SELECT s.player_id, SUM(s.points) AS total_points
+        FROM scores s JOIN players p ON p.id = s.player_id AND p.is_active = true
+        GROUP BY s.player_id
+    )
+    SELECT
+        p.id AS player_id, p.name AS player_name, p.nickname AS player_nickname, p.avatar_url,
+        agg.total_tournaments, agg.total_points, agg.average_points, agg.best_score, agg.worst_score,
+        agg.positive_scores, agg.negative_scores,
+        CASE WHEN agg.total_tournaments = 0 THEN 0
+             ELSE 1 + (SELECT COUNT(*) FROM totals WHERE totals.total_points > agg.total_points)
+        END AS general_position,
+        COALESCE(results.tournaments, '[]'::json) AS tournaments
+    FROM players p
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(*) AS total_tournaments,
+            COALESCE(SUM(points), 0) AS total_points,
+            COALESCE(AVG(points), 0) AS average_points,
+            COALESCE(MAX(points), 0) AS best_score,
+            COALESCE(MIN(points), 0) AS worst_score,
+            COUNT(*) FILTER (WHERE points > 0) AS positive_scores,
+            COUNT(*) FILTER (WHERE points < 0) AS negative_scores
+        FROM scores WHERE player_id = p.id
+    ) agg
+    CROSS JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+            'tournament_id', tr.tournament_id,
+            'tournament_name', t.name,
+            'points', tr.points,
+            'position', tr.position,
+            'score_date', s.created_at
+        ) ORDER BY s.created_at DESC) AS tournaments
+        FROM tournament_rankings tr
+        JOIN tournaments t ON t.id = tr.tournament_id
+        JOIN scores s ON s.id = tr.score_id
+        WHERE tr.player_id = p.id
+    ) results
+    WHERE p.id = :player_id AND p.is_active = true
+""").columns(tournaments=JSON)
+
 
 class RankingService:
     """Serviço para cálculo e cache de rankings"""
@@ -22,7 +71,8 @@ class RankingService:
         self, session: AsyncSession, page: int, size: int
     ) -> Dict:
         """Obter ranking geral, utilizando cache."""
-        cached_ranking = RankingCache.get_general_ranking(page, size)
+        version = ranking_versions.general()
+        cached_ranking = await RankingCache.get_general_ranking(page, size, version=version)
         if cached_ranking:
             logger.info(f"General ranking cache hit for page {page}, size {size}")
             return cached_ranking
@@ -34,6 +84,7 @@ class RankingService:
                 p.id as player_id, p.name as player_name, p.nickname as player_nickname, p.avatar_url,
                 COUNT(s.id) as total_tournaments, SUM(s.points) as total_points, AVG(s.points) as average_points,
                 MAX(s.points) as best_score, MIN(s.points) as worst_score,
+                NULL::timestamp as score_date, NULL::text as notes,
                 RANK() OVER (ORDER BY SUM(s.points) DESC) as position
             FROM players p JOIN scores s ON p.id = s.player_id
             WHERE p.is_active = true
@@ -44,14 +95,15 @@ class RankingService:
         
         offset = (page - 1) * size
         result = await session.execute(query, {"size": size, "offset": offset})
-        entries = [RankingEntry.model_validate(row, from_attributes=True) for row in result.mappings()]
+        # As colunas já têm o formato de RankingEntry: dicts direto das linhas, sem validar
+        entries = rows_as_dicts(result)
 
         count_query = text("SELECT COUNT(DISTINCT p.id) FROM players p JOIN scores s ON p.id = s.player_id WHERE p.is_active = true")
         total = (await session.execute(count_query)).scalar_one_or_none() or 0
         pages = (total + size - 1) // size if total > 0 else 1
 
         response = {
-            "entries": [e.model_dump() for e in entries],
+            "entries": entries,
             "total": total,
             "page": page,
             "size": size,
@@ -59,14 +111,15 @@ class RankingService:
             "ranking_type": "general"
         }
 
-        RankingCache.set_general_ranking(response, page, size)
+        await RankingCache.set_general_ranking(response, page, size, version=version)
         return response
 
     async def get_tournament_ranking(
         self, session: AsyncSession, tournament_id: int, page: int, size: int
     ) -> Optional[Dict]:
         """Obter ranking de um torneio específico, utilizando cache."""
-        cached_ranking = RankingCache.get_tournament_ranking(tournament_id, page, size)
+        version = ranking_versions.tournament(tournament_id)
+        cached_ranking = await RankingCache.get_tournament_ranking(tournament_id, page, size, version=version)
         if cached_ranking:
             logger.info(f"Tournament {tournament_id} ranking cache hit for page {page}")
             return cached_ranking
@@ -77,58 +130,56 @@ class RankingService:
         if not tournament:
             return None
 
-        order_clause = "s.points DESC" if tournament.sort_criteria == "points_desc" else "s.points ASC"
-        query = text(f"""
+        # Posições já calculadas em tournament_rankings: a página é uma faixa do
+        # índice (tournament_id, position)
+        await tournament_position_service.flush()
+        query = text("""
             SELECT 
                 p.id as player_id, p.name as player_name, p.nickname as player_nickname, p.avatar_url,
-                s.points, s.notes, s.created_at as score_date,
-                RANK() OVER (ORDER BY {order_clause}) as position
-            FROM players p JOIN scores s ON p.id = s.player_id
-            WHERE s.tournament_id = :tournament_id AND p.is_active = true
-            ORDER BY {order_clause} LIMIT :size OFFSET :offset
+                tr.points as total_points, 1 as total_tournaments, tr.points as average_points,
+                tr.points as best_score, tr.points as worst_score,
+                s.notes, s.created_at as score_date, tr.position
+            FROM tournament_rankings tr
+            JOIN players p ON p.id = tr.player_id
+            JOIN scores s ON s.id = tr.score_id
+            WHERE tr.tournament_id = :tournament_id AND p.is_active = true
+            ORDER BY tr.position, tr.player_id LIMIT :size OFFSET :offset
         """)
         
         offset = (page - 1) * size
         result = await session.execute(query, {"tournament_id": tournament_id, "size": size, "offset": offset})
-        entries = [RankingEntry.model_validate(row, from_attributes=True) for row in result.mappings()]
+        entries = rows_as_dicts(result)
 
-        count_query = text("SELECT COUNT(*) FROM scores s JOIN players p ON s.player_id = p.id WHERE s.tournament_id = :t_id AND p.is_active = true")
+        count_query = text("SELECT COUNT(*) FROM tournament_rankings tr JOIN players p ON tr.player_id = p.id WHERE tr.tournament_id = :t_id AND p.is_active = true")
         total = (await session.execute(count_query, {"t_id": tournament_id})).scalar_one_or_none() or 0
         pages = (total + size - 1) // size if total > 0 else 1
 
         response = {
             "tournament_id": tournament.id, "tournament_name": tournament.name, "tournament_description": tournament.description,
             "start_date": tournament.start_date, "end_date": tournament.end_date, "sort_criteria": tournament.sort_criteria,
-            "entries": [e.model_dump() for e in entries], "total": total, "page": page, "size": size, "pages": pages
+            "entries": entries, "total": total, "page": page, "size": size, "pages": pages
         }
 
-        RankingCache.set_tournament_ranking(tournament_id, response, page, size)
+        await RankingCache.set_tournament_ranking(tournament_id, response, page, size, version=version)
         return response
 
     async def get_player_stats(self, session: AsyncSession, player_id: int) -> Optional[PlayerStats]:
         """Obter estatísticas de um jogador, utilizando cache."""
-        cached_stats = RankingCache.get_player_stats(player_id)
+        version = ranking_versions.general()
+        cached_stats = await RankingCache.get_player_stats(player_id, version=version)
         if cached_stats:
             logger.info(f"Player {player_id} stats cache hit")
             return PlayerStats.model_validate(cached_stats)
 
         logger.info(f"Player {player_id} stats cache miss")
 
-        player = await session.get(Player, player_id)
-        if not player or not player.is_active:
+        await tournament_position_service.flush()
+        row = (await session.execute(PLAYER_STATS_QUERY, {"player_id": player_id})).mappings().first()
+        if row is None:
             return None
 
-        # ... (O restante da lógica de cálculo de estatísticas permanece a mesma)
-        stats_query = text("SELECT COUNT(id) as total_tournaments, SUM(points) as total_points, AVG(points) as average_points, MAX(points) as best_score, MIN(points) as worst_score FROM scores WHERE player_id = :p_id")
-        stats_result = (await session.execute(stats_query, {"p_id": player_id})).first()
-
-        # ... (outras queries)
-
-        stats_data = PlayerStats(
-            player_id=player.id, player_name=player.name, player_nickname=player.nickname, # ... etc
-        )
-
-        await RankingCache.set_player_stats(player_id, stats_data.model_dump())
+        stats_data = PlayerStats.model_validate(dict(row))
+        await RankingCache.set_player_stats(player_id, stats_data.model_dump(), version=version)
         return stats_data
 
 # Instância global do serviço
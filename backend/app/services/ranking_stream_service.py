@@ -0,0 +1,365 @@
+"""
+Serviço de ranking ao vivo: envia as mudanças de posição aos clientes conectados
+"""
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from sqlmodel import text
+import asyncio
+import json
+import logging
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.events import event_bus, SCORES_CHANGED
+from .tournament_position_service import tournament_position_service
+
+logger = logging.getLogger(__name__)
+
+GENERAL_CHANNEL = "general"
+KEEPALIVE = b": keepalive\n\n"
+
+# Posições de um ranking: player_id -> entrada, na ordem do ranking
+Standings = Dict[int, Dict]
+
+
+def tournament_channel(tournament_id: int) -> str:
+    return f"tournament:{tournament_id}"
+
+
+def sse_event(event: str, data: Dict, event_id: Optional[int] = None) -> bytes:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class _Subscriber:
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class LeaderboardView:
+    """Página (torneio, page, size) calculada uma vez e compartilhada pelos sockets inscritos nela"""
+
+    def __init__(self, channel: str, tournament_id: int, page: int, size: int):
+        self.channel = channel
+        self.tournament_id = tournament_id
+        self.page = page
+        self.size = size
+        self.entries: List[Dict] = []
+        self.total = 0
+        self.version = 0
+        self.last_sent = 0.0
+        self.sinks: Set[_Subscriber] = set()
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def slice(self, ordered: List[Dict]) -> List[Dict]:
+        start = (self.page - 1) * self.size
+        return ordered[start:start + self.size]
+
+
+class RankingStreamService:
+    """
+    Fan-out de mudanças de ranking para conexões SSE, um por worker.
+
+    Os canais são o ranking geral e o de cada torneio. Quando o `event_bus`
+    avisa que pontuações mudaram, os canais afetados que têm alguém
+    conectado são marcados e, após `ranking_stream_coalesce` segundos
+    (agrupando rajadas de alterações), cada um é recalculado uma única vez e
+    comparado com as posições anteriores. O evento com as diferenças é
+    serializado uma vez e colocado na fila de cada conexão do canal.
+
+    Um espectador parado custa só a sua fila: não há consulta ao banco nem
+    task por conexão, e o keepalive é um único timer para todas. Uma conexão
+    que não consome a fila é encerrada (o EventSource reconecta sozinho).
+
+    Os WebSockets do placar se inscrevem em páginas (torneio, page, size).
+    Cada combinação distinta tem um único `LeaderboardView`, recortado das
+    posições do canal do torneio; após um recálculo, a view compara a página
+    nova com a última enviada e manda o mesmo frame de diferenças a todos os
+    seus sockets, no máximo `ranking_ws_max_fps` frames por segundo
+    (mudanças nesse intervalo saem juntas no frame seguinte).
+    """
+
+    def __init__(self):
+        self.coalesce_interval = settings.ranking_stream_coalesce
+        self.heartbeat_interval = settings.ranking_stream_heartbeat
+        self.queue_size = settings.ranking_stream_queue_size
+        self.frame_interval = 1 / settings.ranking_ws_max_fps
+
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._views: Dict[str, Dict[Tuple[int, int], LeaderboardView]] = {}
+        self._standings: Dict[str, Standings] = {}
+        self._ordered: Dict[str, List[Dict]] = {}
+        self._dirty: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._version = 0
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        event_bus.subscribe(SCORES_CHANGED, self._on_scores_changed)
+        self._tasks = [
+            asyncio.create_task(self._refresher(), name="ranking-stream-refresher"),
+            asyncio.create_task(self._heartbeat(), name="ranking-stream-heartbeat"),
+        ]
+        logger.info("Ranking stream started")
+
+    async def stop(self):
+        event_bus.unsubscribe(SCORES_CHANGED, self._on_scores_changed)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Ranking stream stopped")
+
+    async def stream(self, channel: str) -> AsyncIterator[bytes]:
+        """Eventos SSE de um canal, até o cliente desconectar"""
+        subscriber = await self._subscribe(channel)
+        try:
+            yield b"retry: 3000\n\n" + sse_event("ready", {"channel": channel}, self._version)
+            while True:
+                yield await subscriber.queue.get()
+                if subscriber.overflowed and subscriber.queue.empty():
+                    # Cliente lento: encerrar para que reconecte e recarregue o ranking
+                    yield sse_event("resync", {"channel": channel})
+                    return
+        finally:
+            self._unsubscribe(channel, subscriber)
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        if channel is not None:
+            return len(self._subscribers.get(channel, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def view_count(self) -> int:
+        return sum(len(views) for views in self._views.values())
+
+    async def subscribe_view(self, tournament_id: int, page: int, size: int) -> Tuple[LeaderboardView, _Subscriber]:
+        """
+        Inscrever um socket na página; o primeiro frame da fila é o snapshot
+        da view, e os seguintes são diferenças em relação a ele.
+        """
+        channel = tournament_channel(tournament_id)
+        await self._ensure_standings(channel)
+        views = self._views.setdefault(channel, {})
+        view = views.get((page, size))
+        if view is None:
+            view = views[(page, size)] = LeaderboardView(channel, tournament_id, page, size)
+            view.entries = view.slice(self._ordered[channel])
+            view.total = len(self._ordered[channel])
+
+        sink = _Subscriber(self.queue_size)
+        sink.queue.put_nowait(self._view_frame(view, "snapshot", {"entries": view.entries}))
+        view.sinks.add(sink)
+        return view, sink
+
+    def unsubscribe_view(self, view: LeaderboardView, sink: _Subscriber):
+        view.sinks.discard(sink)
+        if view.sinks:
+            return
+        if view.flush_handle is not None:
+            view.flush_handle.cancel()
+        views = self._views.get(view.channel, {})
+        if views.get((view.page, view.size)) is view:
+            del views[(view.page, view.size)]
+        if not views:
+            self._views.pop(view.channel, None)
+        self._release(view.channel)
+
+    async def _ensure_standings(self, channel: str):
+        # As posições atuais são a base da primeira comparação do canal
+        if channel not in self._standings:
+            self._set_standings(channel, await self._load_standings(channel))
+
+    def _set_standings(self, channel: str, standings: Standings):
+        self._standings[channel] = standings
+        self._ordered[channel] = list(standings.values())
+
+    def _release(self, channel: str):
+        """Esquecer as posições de um canal sem nenhum SSE nem view"""
+        if channel not in self._subscribers and channel not in self._views:
+            self._standings.pop(channel, None)
+            self._ordered.pop(channel, None)
+
+    async def _subscribe(self, channel: str) -> _Subscriber:
+        await self._ensure_standings(channel)
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def _unsubscribe(self, channel: str, subscriber: _Subscriber):
+        subscribers = self._subscribers.get(channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[channel]
+            self._release(channel)
+
+    def _active_channels(self) -> Set[str]:
+        return set(self._subscribers) | set(self._views)
+
+    def _on_scores_changed(self, payload: Dict):
+        tournament_ids = payload.get("tournament_ids")
+        for channel in self._active_channels():
+            if (
+                channel == GENERAL_CHANNEL
+                or tournament_ids is None
+                or int(channel.split(":", 1)[1]) in tournament_ids
+            ):
+                self._dirty.add(channel)
+        if self._dirty and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _refresher(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.coalesce_interval)
+            self._wakeup.clear()
+            channels, self._dirty = self._dirty, set()
+            for channel in channels:
+                if channel not in self._active_channels():
+                    continue
+                try:
+                    await self._refresh(channel)
+                except Exception as e:
+                    logger.error(f"Could not refresh ranking stream {channel}: {e}")
+
+    async def _refresh(self, channel: str):
+        previous = self._standings.get(channel, {})
+        current = await self._load_standings(channel)
+        if channel not in self._active_channels():
+            return
+        self._set_standings(channel, current)
+
+        changes = self.diff_standings(previous, current)
+        if not changes["changed"] and not changes["removed"]:
+            return
+        if channel in self._subscribers:
+            self._version += 1
+            self._broadcast(channel, sse_event("ranking", {"channel": channel, "version": self._version, **changes}, self._version))
+        for view in list(self._views.get(channel, {}).values()):
+            self._schedule_view(view)
+
+    def _schedule_view(self, view: LeaderboardView):
+        """Enviar o frame da view agora ou, se o último saiu há pouco, no fim do intervalo"""
+        if view.flush_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        wait = view.last_sent + self.frame_interval - loop.time()
+        if wait <= 0:
+            self._flush_view(view)
+        else:
+            view.flush_handle = loop.call_later(wait, self._flush_view, view)
+
+    def _flush_view(self, view: LeaderboardView):
+        view.flush_handle = None
+        ordered = self._ordered.get(view.channel)
+        if ordered is None or not view.sinks:
+            return
+        entries = view.slice(ordered)
+        changes = self.diff_page(view.entries, entries)
+        total_changed = len(ordered) != view.total
+        if not changes["entries"] and not changes["removed"] and not total_changed:
+            return
+
+        view.entries = entries
+        view.total = len(ordered)
+        view.version += 1
+        view.last_sent = asyncio.get_running_loop().time()
+        frame = self._view_frame(view, "diff", changes)
+        for sink in view.sinks:
+            try:
+                sink.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                sink.overflowed = True
+
+    @staticmethod
+    def diff_page(previous: List[Dict], current: List[Dict]) -> Dict[str, List]:
+        """
+        Diferença compacta entre duas versões de uma página: entradas novas
+        completas, e das que continuam só `player_id` e os campos alterados
+        (posição, pontos...).
+        """
+        before_by_id = {entry["player_id"]: entry for entry in previous}
+        entries = []
+        for entry in current:
+            before = before_by_id.pop(entry["player_id"], None)
+            if before is None:
+                entries.append(entry)
+                continue
+            changed = {field: value for field, value in entry.items() if before.get(field) != value}
+            if changed:
+                entries.append({"player_id": entry["player_id"], **changed})
+        return {"entries": entries, "removed": list(before_by_id)}
+
+    @staticmethod
+    def _view_frame(view: LeaderboardView, frame_type: str, body: Dict) -> str:
+        return json.dumps({
+            "type": frame_type, "tournament_id": view.tournament_id, "page": view.page, "size": view.size,
+            "total": view.total, "version": view.version, **body
+        }, separators=(",", ":"))
+
+    @staticmethod
+    def diff_standings(previous: Standings, current: Standings) -> Dict[str, List]:
+        """Entradas novas ou alteradas (com a posição anterior) e jogadores que saíram do ranking"""
+        changed = []
+        for player_id, entry in current.items():
+            before = previous.get(player_id)
+            if before != entry:
+                changed.append({**entry, "previous_position": before["position"] if before else None})
+        removed = [player_id for player_id in previous if player_id not in current]
+        return {"changed": changed, "removed": removed}
+
+    def _broadcast(self, channel: str, chunk: bytes):
+        for subscriber in self._subscribers.get(channel, ()):
+            try:
+                subscriber.queue.put_nowait(chunk)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for subscribers in self._subscribers.values():
+                for subscriber in subscribers:
+                    if subscriber.queue.empty():
+                        subscriber.queue.put_nowait(KEEPALIVE)
+
+    async def _load_standings(self, channel: str) -> Standings:
+        """Posições completas de um canal (as mesmas dos endpoints de ranking)"""
+        async with AsyncSessionLocal() as session:
+            if channel == GENERAL_CHANNEL:
+                query = text("""
+                    SELECT p.id AS player_id, p.nickname AS player_nickname, SUM(s.points) AS points,
+                           RANK() OVER (ORDER BY SUM(s.points) DESC) AS position
+                    FROM players p JOIN scores s ON p.id = s.player_id
+                    WHERE p.is_active = true
+                    GROUP BY p.id, p.nickname
+                    ORDER BY position, p.id
+                """)
+                params = {}
+            else:
+                await tournament_position_service.flush()
+                query = text("""
+                    SELECT p.id AS player_id, p.nickname AS player_nickname, tr.points AS points, tr.position
+                    FROM tournament_rankings tr JOIN players p ON p.id = tr.player_id
+                    WHERE tr.tournament_id = :tournament_id AND p.is_active = true
+                    ORDER BY tr.position, p.id
+                """)
+                params = {"tournament_id": int(channel.split(":", 1)[1])}
+            result = await session.execute(query, params)
+            return {
+                row["player_id"]: {**row, "points": float(row["points"])}
+                for row in result.mappings()
+            }
+
+
+# Instância global do serviço
+ranking_stream_service = RankingStreamService()
@@ -0,0 +1,164 @@
+"""
+Serviço de estatísticas gerais servidas a partir de contadores
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+import asyncio
+import logging
+import math
+
+from ..core.config import settings
+from ..core.database import async_engine
+from ..schemas.ranking import GeneralStats
+
+logger = logging.getLogger(__name__)
+
+STATS_RECONCILE_LOCK_KEY = 0x73_74_61_74  # "stat"
+
+COUNTER_FIELDS = (
+    "total_players", "total_tournaments", "total_scores", "positive_scores",
+    "negative_scores", "points_sum", "highest_score", "lowest_score",
+)
+
+ACTIVE_TOURNAMENTS_SQL = "SELECT COUNT(*) FROM tournaments WHERE end_date >= :now"
+
+# Leitura O(1): a linha de contadores por chave primária; torneios ativos
+# dependem do relógio e são contados pelo índice de end_date
+COUNTERS_SQL = f"""
+    SELECT c.*, ({ACTIVE_TOURNAMENTS_SQL}) AS active_tournaments
+    FROM stats_counters c WHERE c.id = 1
+"""
+
+# Os mesmos valores calculados das tabelas (reconciliação e bancos sem os triggers)
+RECOMPUTE_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM players WHERE is_active = true) AS total_players,
+        (SELECT COUNT(*) FROM tournaments) AS total_tournaments,
+        COUNT(s.id) AS total_scores,
+        COALESCE(SUM(CASE WHEN s.points > 0 THEN 1 ELSE 0 END), 0) AS positive_scores,
+        COALESCE(SUM(CASE WHEN s.points < 0 THEN 1 ELSE 0 END), 0) AS negative_scores,
+        COALESCE(SUM(s.points), 0) AS points_sum,
+        MAX(s.points) AS highest_score,
+        MIN(s.points) AS lowest_score
+    FROM scores s JOIN players p ON p.id = s.player_id
+    WHERE p.is_active = true
+"""
+
+UPSERT_SQL = f"""
+    INSERT INTO stats_counters (id, {", ".join(COUNTER_FIELDS)}, updated_at)
+    VALUES (1, {", ".join(":" + field for field in COUNTER_FIELDS)}, :updated_at)
+    ON CONFLICT (id) DO UPDATE SET
+        {", ".join(f"{field} = EXCLUDED.{field}" for field in COUNTER_FIELDS)}, updated_at = EXCLUDED.updated_at
+"""
+
+
+def _same(stored: Any, actual: Any) -> bool:
+    if stored is None or actual is None:
+        return stored is actual
+    # points_sum acumula erro de ponto flutuante a cada delta
+    return math.isclose(stored, actual, rel_tol=1e-9, abs_tol=1e-6)
+
+
+class StatsService:
+    """
+    Estatísticas gerais do sistema.
+
+    No PostgreSQL os números vêm da linha `stats_counters`, mantida na mesma
+    transação de cada escrita em scores, players e tournaments por triggers
+    (ver migração 7e3b9d2c5a61); ler as estatísticas custa uma busca por
+    chave primária. Corridas entre transações concorrentes (ex.: score
+    inserido enquanto o jogador é desativado) podem deixar deriva, corrigida
+    por `reconcile`, executado periodicamente em um único worker.
+    """
+
+    def __init__(self):
+        self.reconcile_interval = settings.stats_reconcile_interval
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Iniciar a reconciliação periódica dos contadores"""
+        if self.reconcile_interval <= 0 or async_engine.dialect.name != "postgresql" or self._reconcile_task is not None:
+            return
+        self._reconcile_task = asyncio.create_task(self._reconciler(), name="stats-reconciler")
+
+    async def stop(self):
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            await asyncio.gather(self._reconcile_task, return_exceptions=True)
+            self._reconcile_task = None
+
+    async def get_general_stats(self, session: AsyncSession) -> GeneralStats:
+        params = {"now": datetime.utcnow()}
+        if session.bind is not None and session.bind.dialect.name == "postgresql":
+            row = (await session.execute(text(COUNTERS_SQL), params)).mappings().first()
+            if row is not None:
+                return self._to_general_stats(row)
+            logger.warning("stats_counters row missing, computing general stats from the tables")
+
+        row = (await session.execute(
+            text(f"SELECT r.*, ({ACTIVE_TOURNAMENTS_SQL}) AS active_tournaments FROM ({RECOMPUTE_SQL}) r"), params
+        )).mappings().first()
+        return self._to_general_stats(row)
+
+    @staticmethod
+    def _to_general_stats(row) -> GeneralStats:
+        total_scores = row["total_scores"] or 0
+        return GeneralStats(
+            total_players=row["total_players"] or 0,
+            total_tournaments=row["total_tournaments"] or 0,
+            active_tournaments=row["active_tournaments"] or 0,
+            total_scores=total_scores,
+            average_score=float(row["points_sum"] or 0) / total_scores if total_scores else 0.0,
+            highest_score=float(row["highest_score"] or 0),
+            lowest_score=float(row["lowest_score"] or 0),
+            positive_scores=row["positive_scores"] or 0,
+            negative_scores=row["negative_scores"] or 0,
+        )
+
+    async def reconcile(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Recalcular os contadores a partir das tabelas e corrigir a deriva.
+
+        Retorna os campos corrigidos (`{campo: {"stored": ..., "actual": ...}}`),
+        ou None se outro worker já estiver reconciliando.
+        """
+        if async_engine.dialect.name != "postgresql":
+            return {}
+
+        async with async_engine.begin() as conn:
+            acquired = (await conn.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": STATS_RECONCILE_LOCK_KEY}
+            )).scalar()
+            if not acquired:
+                return None
+            # Travar a linha antes de agregar: escritas concorrentes esperam e
+            # aplicam seus deltas sobre os valores já corrigidos
+            stored = (await conn.execute(text("SELECT * FROM stats_counters WHERE id = 1 FOR UPDATE"))).mappings().first()
+            actual = (await conn.execute(text(RECOMPUTE_SQL))).mappings().one()
+            drift = {
+                field: {"stored": stored[field] if stored else None, "actual": actual[field]}
+                for field in COUNTER_FIELDS
+                if stored is None or not _same(stored[field], actual[field])
+            }
+            if drift:
+                await conn.execute(text(UPSERT_SQL), {**actual, "updated_at": datetime.utcnow()})
+
+        if drift:
+            logger.warning(f"Stats counters drift corrected: {drift}")
+        return drift
+
+    async def _reconciler(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stats reconciliation failed: {e}")
+
+
+# Instância global do serviço
+stats_service = StatsService()
@@ -0,0 +1,209 @@
+"""
+Serviço das posições por torneio (tabela tournament_rankings)
+"""
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import bindparam, text
+from datetime import datetime
+import asyncio
+import logging
+
+from ..core.config import settings
+from ..core.database import async_engine
+from ..core.events import event_bus, SCORES_CHANGED
+from .ranking_engine import ranking_engine
+
+logger = logging.getLogger(__name__)
+
+TOURNAMENT_POSITIONS_LOCK_KEY = 0x74_72_6E_6B  # "trnk"
+
+# Torneio congelado: encerrado e com posições calculadas depois do fim
+FROZEN_SQL = """
+    t.end_date < :now AND EXISTS (
+        SELECT 1 FROM tournament_rankings tr
+        WHERE tr.tournament_id = t.id AND tr.computed_at >= t.end_date
+    )
+"""
+
+# `{scope}` é a consulta dos torneios a recalcular. O DELETE a avalia antes
+# de apagar e o INSERT depois: os congelados mantêm suas linhas e continuam
+# congelados, então as duas veem os mesmos torneios.
+DELETE_SQL = "DELETE FROM tournament_rankings WHERE tournament_id IN ({scope})"
+
+# As mesmas regras do ranking do torneio: só jogadores ativos, ordem pelo
+# sort_criteria, empates com RANK(). `scores` não tem unicidade por
+# (jogador, torneio) — a rota e a importação só checam antes de inserir —,
+# então um eventual duplicado não pode violar a chave da tabela: conta o
+# melhor score do jogador no torneio (o de menor id, se empatados).
+INSERT_SQL = """
+    INSERT INTO tournament_rankings (tournament_id, player_id, score_id, position, points, computed_at)
+    SELECT
+        tournament_id, player_id, score_id,
+        RANK() OVER (PARTITION BY tournament_id ORDER BY sort_key),
+        points,
+        :now
+    FROM (
+        SELECT
+            s.tournament_id, s.player_id, s.id AS score_id, s.points,
+            CASE WHEN t.sort_criteria = 'points_desc' THEN -s.points ELSE s.points END AS sort_key,
+            ROW_NUMBER() OVER (
+                PARTITION BY s.tournament_id, s.player_id
+                ORDER BY CASE WHEN t.sort_criteria = 'points_desc' THEN -s.points ELSE s.points END, s.id
+            ) AS player_score
+        FROM scores s
+        JOIN players p ON p.id = s.player_id AND p.is_active = true
+        JOIN tournaments t ON t.id = s.tournament_id
+        WHERE s.tournament_id IN ({scope})
+    ) best
+    WHERE player_score = 1
+"""
+
+
+class TournamentPositionService:
+    """
+    Mantém `tournament_rankings`: a posição de cada jogador em cada torneio,
+    para que perfis, busca e páginas de torneio leiam posições com uma busca
+    por índice em vez de um RANK() sobre o torneio inteiro.
+
+    Cada SCORES_CHANGED marca os torneios afetados (todos, quando o payload
+    não diz quais); após `tournament_positions_coalesce` segundos eles são
+    recalculados juntos, um DELETE + INSERT ... SELECT RANK() por lote; no
+    PostgreSQL o recálculo de todos os torneios vai para o `ranking_engine`
+    (NumPy) quando disponível.
+    Leitores chamam `flush` antes de ler a tabela, recalculando na hora o que
+    ainda estiver pendente, então nunca leem posições anteriores a um evento
+    já recebido. Torneios encerrados cujas posições foram calculadas depois
+    do `end_date` ficam congelados: eventos em lote ou de segundo plano não
+    os recalculam. Escritas do admin (score criado, corrigido ou removido,
+    jogador desativado) publicam os torneios em `force_ids`, que são
+    recalculados mesmo congelados, assim como `recompute(..., force=True)`.
+    """
+
+    def __init__(self):
+        self.coalesce_interval = settings.tournament_positions_coalesce
+        self._dirty: Set[int] = set()
+        self._all_dirty = False
+        self._forced: Set[int] = set()
+        self._flushing: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._refresher_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._refresher_task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        if self._pending():
+            self._wakeup.set()
+        self._refresher_task = asyncio.create_task(self._refresher(), name="tournament-positions-refresher")
+
+    async def stop(self):
+        if self._refresher_task is not None:
+            self._refresher_task.cancel()
+            await asyncio.gather(self._refresher_task, return_exceptions=True)
+            self._refresher_task = None
+            self._wakeup = None
+
+    def on_scores_changed(self, payload: Dict):
+        tournament_ids = payload.get("tournament_ids")
+        if tournament_ids is None:
+            self._all_dirty = True
+        else:
+            self._dirty.update(tournament_ids)
+        force_ids = payload.get("force_ids") or []
+        self._forced.update(force_ids)
+        self._dirty.update(force_ids)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _pending(self) -> bool:
+        return self._all_dirty or bool(self._dirty)
+
+    async def flush(self):
+        """Recalcular agora os torneios pendentes (ou esperar o recálculo em andamento)"""
+        while self._pending() or self._flushing is not None:
+            flushing = self._flushing
+            if flushing is None:
+                flushing = self._flushing = asyncio.create_task(self._flush_pending())
+            # shield: um leitor cancelado não interrompe o recálculo dos demais
+            await asyncio.shield(flushing)
+
+    async def _flush_pending(self):
+        tournament_ids = None if self._all_dirty else sorted(self._dirty)
+        force_ids = sorted(self._forced)
+        self._all_dirty, self._dirty, self._forced = False, set(), set()
+        try:
+            await self.recompute(tournament_ids, force_ids=force_ids)
+        except BaseException:
+            # Devolver as pendências para a próxima tentativa
+            if tournament_ids is None:
+                self._all_dirty = True
+            else:
+                self._dirty.update(tournament_ids)
+            self._forced.update(force_ids)
+            raise
+        finally:
+            self._flushing = None
+
+    async def recompute(
+        self, tournament_ids: Optional[Iterable[int]] = None, force: bool = False, force_ids: Iterable[int] = ()
+    ) -> List[int]:
+        """
+        Recalcular as posições dos torneios indicados (None: todos), pulando
+        os congelados se não for `force` — exceto os de `force_ids`.
+        Retorna os torneios recalculados.
+        """
+        now = datetime.utcnow()
+        filters = []
+        params: Dict = {"now": now}
+        expanding = []
+        if tournament_ids is not None:
+            params["ids"] = list(tournament_ids)
+            if not params["ids"]:
+                return []
+            filters.append("t.id IN :ids")
+            expanding.append(bindparam("ids", expanding=True))
+        if not force:
+            force_ids = list(force_ids)
+            if force_ids:
+                params["force_ids"] = force_ids
+                filters.append(f"(NOT ({FROZEN_SQL}) OR t.id IN :force_ids)")
+                expanding.append(bindparam("force_ids", expanding=True))
+            else:
+                filters.append(f"NOT ({FROZEN_SQL})")
+        scope = f"SELECT t.id FROM tournaments t {'WHERE ' + ' AND '.join(filters) if filters else ''}"
+
+        def statement(sql: str):
+            return text(sql.format(scope=scope)).bindparams(*expanding)
+
+        async with async_engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Um recálculo por vez entre os workers; o segundo relê o estado já gravado
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": TOURNAMENT_POSITIONS_LOCK_KEY})
+            ids = list((await conn.execute(statement("{scope}"), params)).scalars())
+            if ids:
+                await conn.execute(statement(DELETE_SQL), params)
+                if tournament_ids is None and ranking_engine.enabled and conn.dialect.name == "postgresql":
+                    # Recálculo completo: em memória, com leitura e escrita por COPY binário
+                    await ranking_engine.recompute(conn, ids, now)
+                else:
+                    await conn.execute(statement(INSERT_SQL), params)
+
+        if ids:
+            logger.info(f"Tournament positions recomputed for {len(ids)} tournament(s)")
+        return ids
+
+    async def _refresher(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.coalesce_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Could not recompute tournament positions: {e}")
+
+
+# Instância global do serviço
+tournament_position_service = TournamentPositionService()
+event_bus.subscribe(SCORES_CHANGED, tournament_position_service.on_scores_changed)
@@ -394,4 +394,59 @@ class TestErrorHandling:
                              json=tournament_data,
                              headers=auth_headers)
         
-        assert response.status_code == status.HTTP_400_BAD_REQUEST
\ No newline at end of file
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+class TestImportEndpoints:
+    """Testes para os endpoints de jobs de importação"""
+
+    @pytest.fixture
+    def admin_client(self, client, test_admin):
+        from app.main import app
+        from app.core.dependencies import get_current_active_admin
+        from app.models import Admin
+
+        # Admin desanexado: o token não é o que está em teste aqui
+        admin = Admin(id=test_admin.id, name=test_admin.name, email=test_admin.email, password_hash="x", is_active=True)
+        app.dependency_overrides[get_current_active_admin] = lambda: admin
+        yield client
+        app.dependency_overrides.pop(get_current_active_admin, None)
+
+    def test_submit_poll_and_cancel_import(self, admin_client, tmp_path, monkeypatch):
+        """Testar envio, consulta e cancelamento de um job"""
+        from app.services.import_job_service import import_job_service
+
+        monkeypatch.setattr(import_job_service, "upload_dir", tmp_path)
+        # Sem workers: o job fica pendente até ser cancelado
+        monkeypatch.setattr(import_job_service, "_queue", None)
+
+        response = admin_client.post(
+            "/api/v1/admin/imports/players?chunk_size=10",
+            files={"file": ("players.csv", b"name,nickname\nAna,ana\n", "text/csv")}
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job = response.json()
+        assert (job["kind"], job["status"]) == ("players", "pending")
+        assert len(list(tmp_path.iterdir())) == 1
+
+        response = admin_client.get(f"/api/v1/admin/imports/{job['id']}")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["filename"] == "players.csv"
+
+        response = admin_client.post(f"/api/v1/admin/imports/{job['id']}/cancel")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "cancelled"
+        assert list(tmp_path.iterdir()) == []
+
+        response = admin_client.post(f"/api/v1/admin/imports/{job['id']}/cancel")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_import_errors(self, admin_client):
+        """Testar formato não suportado e job inexistente"""
+        response = admin_client.post(
+            "/api/v1/admin/imports/scores",
+            files={"file": ("scores.xlsx", b"...", "application/vnd.ms-excel")}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        assert admin_client.get("/api/v1/admin/imports/99999").status_code == status.HTTP_404_NOT_FOUND
+        assert admin_client.post("/api/v1/admin/imports/99999/cancel").status_code == status.HTTP_404_NOT_FOUND
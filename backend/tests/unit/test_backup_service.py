@@ -0,0 +1,259 @@
+"""
+Testes unitários para o serviço de backup
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+import app.services.backup_service as backup_module
+from app.services.backup_service import BackupService, _files_digest
+
+DUMP_SQL = "CREATE TABLE players (id integer);\nINSERT INTO players VALUES (1);\n"
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    service = BackupService()
+    service.backup_dir = tmp_path
+    service.compressor = "gzip"
+    service.compress_backups = True
+    service.compression_level = None
+    service.progress_interval = 60
+    service._notify_error = AsyncMock()
+    monkeypatch.setattr(service, "_row_counts", AsyncMock(return_value={"players": 1}))
+    monkeypatch.setattr(backup_module.shutil, "which", lambda name: None)
+    monkeypatch.setattr(backup_module.event_bus, "publish", AsyncMock())
+    return service
+
+
+def fake_commands(monkeypatch, scripts):
+    """
+    Trocar cada programa (pg_dump, gzip, psql...) por um script de shell; os
+    pipes entre os processos continuam reais. Retorna os comandos chamados.
+    """
+    real_exec = asyncio.create_subprocess_exec
+    calls = []
+
+    async def fake_exec(program, *args, **kwargs):
+        calls.append([program, *args])
+        return await real_exec("sh", "-c", scripts[program], program, *args, **kwargs)
+
+    monkeypatch.setattr(backup_module.asyncio, "create_subprocess_exec", fake_exec)
+    return calls
+
+
+@pytest.mark.asyncio
+class TestBackupPipeline:
+    """Testes para o pipeline pg_dump | compressor | arquivo"""
+
+    async def test_backup_index_and_checksum_round_trip(self, service, monkeypatch, tmp_path):
+        restored = tmp_path / "restored.sql"
+        fake_commands(monkeypatch, {
+            "pg_dump": f"printf '{DUMP_SQL}'; echo 'pg_dump: dumping contents of table \"public.players\"' >&2",
+            "gzip": "exec gzip \"$@\"",
+            "psql": f"cat > {restored}",
+        })
+
+        info = await service.create_backup("nightly")
+
+        backup_path = tmp_path / info["filename"]
+        assert info["filename"].startswith("nightly_") and info["filename"].endswith(".sql.gz")
+        assert gzip.decompress(backup_path.read_bytes()).decode() == DUMP_SQL
+        assert info["sha256"] == hashlib.sha256(backup_path.read_bytes()).hexdigest()
+        assert info["size"] == len(DUMP_SQL) and info["compressed_size"] == backup_path.stat().st_size
+        assert not list(tmp_path.glob("*.partial"))
+
+        # Outra instância (outro worker) lê o mesmo índice do disco
+        other = BackupService()
+        other.backup_dir = tmp_path
+        [entry] = other.list_backups()
+        assert entry["sha256"] == info["sha256"] and entry["row_counts"] == {"players": 1}
+        assert entry["watermark"] == info["watermark"]
+        stats = other.get_backup_statistics()
+        assert (stats["total_backups"], stats["total_size"], stats["total_dump_size"]) == (1, info["compressed_size"], len(DUMP_SQL))
+
+        [check] = await service.verify_backups()
+        assert check["ok"] and check["actual"] == info["sha256"]
+
+        # O restore descomprime em streaming até o psql
+        result = await service.restore_backup(info["filename"], confirm=True)
+        assert restored.read_text() == DUMP_SQL and result["size"] == len(DUMP_SQL)
+
+        backup_path.write_bytes(gzip.compress(b"DROP TABLE players;"))
+        [check] = await service.verify_backups()
+        assert not check["ok"] and check["error"] == "checksum mismatch"
+
+        assert service.delete_backup(info["filename"])
+        assert service.list_backups() == []
+        assert service.get_backup_statistics()["total_backups"] == 0
+
+    async def test_pg_dump_failure(self, service, monkeypatch, tmp_path):
+        fake_commands(monkeypatch, {
+            "pg_dump": "printf 'CREATE'; echo 'connection refused' >&2; exit 1",
+            "gzip": "exec gzip \"$@\"",
+        })
+
+        with pytest.raises(Exception, match="pg_dump failed: connection refused"):
+            await service.create_backup()
+
+        assert not list(tmp_path.glob("*.sql*"))
+        assert service.list_backups() == []
+
+    async def test_compressor_failure(self, service, monkeypatch, tmp_path):
+        fake_commands(monkeypatch, {
+            "pg_dump": f"printf '{DUMP_SQL}'",
+            "gzip": "cat > /dev/null; echo 'No space left on device' >&2; exit 1",
+        })
+
+        with pytest.raises(Exception, match="gzip failed: No space left on device"):
+            await service.create_backup()
+
+        assert not list(tmp_path.glob("*.sql*"))
+        assert service.list_backups() == []
+
+    async def test_compressor_exiting_early(self, service, monkeypatch, tmp_path):
+        # O compressor morre antes de ler tudo: o pipe quebra no meio do dump
+        fake_commands(monkeypatch, {
+            "pg_dump": "head -c 4000000 /dev/zero",
+            "gzip": "echo 'killed' >&2; exit 0",
+        })
+
+        with pytest.raises(Exception, match="gzip failed: killed"):
+            await asyncio.wait_for(service.create_backup(), timeout=10)
+
+        assert not list(tmp_path.glob("*.sql*"))
+
+    async def test_restore_failure(self, service, monkeypatch, tmp_path):
+        (tmp_path / "old.sql.gz").write_bytes(gzip.compress(DUMP_SQL.encode()))
+        fake_commands(monkeypatch, {
+            "gzip": "exec gzip \"$@\"",
+            "psql": "cat > /dev/null; echo 'relation \"players\" already exists' >&2; exit 3",
+        })
+
+        with pytest.raises(Exception, match="psql restore failed: relation"):
+            await service.restore_backup("old.sql.gz", confirm=True)
+        backup_module.event_bus.publish.assert_not_awaited()
+
+    async def test_copy_failure_stops_compressed_output(self, service, monkeypatch, tmp_path):
+        fake_commands(monkeypatch, {"gzip": "exec gzip \"$@\""})
+
+        class FailingDriver:
+            async def copy_from_query(self, query, *args, output, **kwargs):
+                await output(b"id\n" + b"1\n" * 100000)
+                raise ConnectionResetError("connection lost")
+
+        with pytest.raises(ConnectionResetError):
+            await service._copy_query_to_file(FailingDriver(), "SELECT 1", [], tmp_path / "scores.csv.gz", None)
+
+        # Nenhuma gravação da saída do compressor sobra pendente
+        pending = [
+            task for task in asyncio.all_tasks()
+            if not task.done() and task.get_coro().__qualname__.endswith("_store_stream")
+        ]
+        assert pending == []
+
+
+@pytest.mark.asyncio
+class TestDirectoryCompression:
+    """Testes para o compressor do formato directory conforme a versão do pg_dump"""
+
+    @pytest.mark.parametrize("probe_error, option", [
+        # pg_dump 15: --compress só aceita um nível
+        ('invalid value "zstd" for option -Z/--compress', "--compress=9"),
+        # pg_dump 16 compilado sem zstd
+        ("invalid compression specification: this build does not support compression with ZSTD", "--compress=9"),
+        # Opção aceita: o erro é só a conexão com o socket inexistente
+        ('connection to server on socket "/tmp/x/.s.PGSQL.5432" failed', "--compress=zstd:19"),
+    ])
+    async def test_zstd_falls_back_to_gzip(self, service, monkeypatch, probe_error, option):
+        calls = fake_commands(monkeypatch, {"pg_dump": f"echo 'pg_dump: error: {probe_error}' >&2; exit 1"})
+        service.compressor = "zstd"
+        service.compression_level = 19
+
+        await service.start()
+        await service._check_directory_compressor()
+
+        assert service._directory_compress_option() == option
+        assert len(calls) == 1 and "--compress=zstd" in calls[0]
+
+    async def test_gzip_does_not_check_version(self, service, monkeypatch):
+        calls = fake_commands(monkeypatch, {})
+
+        assert await service._check_directory_compressor() == "gzip"
+        assert service._directory_compress_option() == "--compress=6"
+        assert calls == []
+
+
+@pytest.mark.asyncio
+class TestIncrementalChain:
+    """Testes para a restauração de cadeias de backups incrementais"""
+
+    def _add_increment(self, service, name, parent, base, created_at):
+        path = service.backup_dir / name
+        path.mkdir()
+        files = {}
+        for table in ("players", "scores"):
+            data = gzip.compress(f"id\n{name}\n".encode())
+            (path / f"{table}.csv.gz").write_bytes(data)
+            files[f"{table}.csv.gz"] = hashlib.sha256(data).hexdigest()
+        (path / "manifest.json").write_text(json.dumps({"files": files}))
+        service._add_to_index({
+            "filename": name, "format": "incremental", "compressed": True, "size": 1, "compressed_size": 1,
+            "sha256": _files_digest(files), "parent": parent, "base": base,
+            "watermark": created_at.isoformat(), "created_at": created_at.isoformat(),
+        })
+        return path
+
+    async def test_restore_applies_chain_in_order(self, service, monkeypatch):
+        monkeypatch.setattr(backup_module, "async_engine", SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+        start = datetime(2026, 1, 1)
+        base = service.backup_dir / "full.sql.gz"
+        base.write_bytes(gzip.compress(DUMP_SQL.encode()))
+        service._add_to_index({
+            "filename": base.name, "format": "plain", "compressed": True, "size": 1, "compressed_size": 1,
+            "sha256": hashlib.sha256(base.read_bytes()).hexdigest(),
+            "watermark": start.isoformat(), "created_at": start.isoformat(),
+        })
+        names = [f"incr_{n}.incr" for n in range(3)]
+        for n, name in enumerate(names):
+            parent = names[n - 1] if n else base.name
+            self._add_increment(service, name, parent, base.name, start + timedelta(hours=n + 1))
+        # Um incremental de outra cadeia, mais recente, não entra
+        self._add_increment(service, "other.incr", base.name, base.name, start + timedelta(hours=9))
+
+        applied = []
+
+        async def restore_plain(path, on_progress):
+            applied.append(path.name)
+            return {"backup_file": path.name}
+
+        async def apply_increment(path, on_progress):
+            applied.append(path.name)
+            return {"backup_file": path.name}
+
+        monkeypatch.setattr(service, "_restore_plain_backup", restore_plain)
+        monkeypatch.setattr(service, "_apply_increment", apply_increment)
+
+        result = await service.restore_backup(names[1], confirm=True)
+        assert applied == ["full.sql.gz", "incr_0.incr", "incr_1.incr"]
+        assert result["restored_to"] == (start + timedelta(hours=2)).isoformat()
+        assert service.find_restore_point(start + timedelta(hours=3, minutes=30)) == names[2]
+
+        # Um arquivo alterado no meio da cadeia aborta antes de tocar no banco
+        applied.clear()
+        (service.backup_dir / names[0] / "scores.csv.gz").write_bytes(b"corrupted")
+        with pytest.raises(ValueError, match="incr_0.incr"):
+            await service.restore_backup(names[2], confirm=True)
+        assert applied == []
+
+        # Sem um elo da cadeia não há restauração
+        service.delete_backup(names[0])
+        with pytest.raises(FileNotFoundError, match="incr_0.incr"):
+            await service.restore_backup(names[2], confirm=True)
+        assert applied == []
@@ -0,0 +1,34 @@
+"""
+Testes unitários para o agendamento cron
+"""
+import pytest
+from datetime import datetime
+
+from app.core.cron import CronSchedule
+
+
+class TestCronSchedule:
+    """Testes para CronSchedule.next_after"""
+
+    def test_daily(self):
+        schedule = CronSchedule("0 3 * * *")
+        assert schedule.next_after(datetime(2026, 10, 18, 23, 37)) == datetime(2026, 10, 19, 3, 0)
+        assert schedule.next_after(datetime(2026, 10, 19, 3, 0)) == datetime(2026, 10, 20, 3, 0)
+
+    def test_steps_and_lists(self):
+        assert CronSchedule("*/15 * * * *").next_after(datetime(2026, 1, 1, 10, 31)) == datetime(2026, 1, 1, 10, 45)
+        assert CronSchedule("0 6,18 * * *").next_after(datetime(2026, 1, 1, 7, 0)) == datetime(2026, 1, 1, 18, 0)
+
+    def test_weekday_and_day_of_month(self):
+        # Domingo = 0; 18/10/2026 é domingo
+        assert CronSchedule("0 0 * * 1").next_after(datetime(2026, 10, 18, 12, 0)) == datetime(2026, 10, 19, 0, 0)
+        # Com dia e dia da semana restritos, vale o primeiro que coincidir
+        assert CronSchedule("0 0 13 * 5").next_after(datetime(2026, 10, 18, 12, 0)) == datetime(2026, 10, 23, 0, 0)
+
+    def test_leap_day(self):
+        assert CronSchedule("0 0 29 2 *").next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29)
+
+    @pytest.mark.parametrize("expression", ["* * *", "61 * * * *", "*/0 * * * *", "a * * * *"])
+    def test_invalid_expressions(self, expression):
+        with pytest.raises(ValueError):
+            CronSchedule(expression)
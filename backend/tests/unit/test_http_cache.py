@@ -0,0 +1,50 @@
+"""
+Testes unitários para as versões dos rankings e os validadores HTTP
+"""
+from starlette.requests import Request
+
+from app.core.http_cache import CacheValidators, RankingVersions
+
+
+class TestRankingVersions:
+    """Testes para RankingVersions e CacheValidators"""
+
+    def test_versions_and_conditional_validators(self):
+        versions = RankingVersions()
+        before_general, before_other = versions.general(), versions.tournament(2)
+        versions.on_scores_changed({"tournament_ids": [1], "published_at": before_general})
+        assert versions.tournament(1) > before_general
+        assert versions.general() == versions.tournament(1)
+        assert versions.tournament(2) == before_other
+
+        validators = CacheValidators.for_version("general", versions.general())
+
+        def request(**headers):
+            raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+            return Request({"type": "http", "headers": raw})
+
+        assert validators.is_not_modified(request(if_none_match=f'W/{validators.etag}, "x"'))
+        assert not validators.is_not_modified(request(if_none_match='"general-1"'))
+        # `*` só vale para recursos que sabidamente existem
+        assert validators.is_not_modified(request(if_none_match="*"))
+        assert not validators.is_not_modified(request(if_none_match="*"), exists=False)
+        assert validators.is_not_modified(request(if_none_match=validators.etag), exists=False)
+        # Versões diferentes no mesmo segundo: sem Last-Modified, If-Modified-Since não dá 304
+        assert "Last-Modified" not in validators.headers()
+        assert not validators.is_not_modified(request(if_modified_since="Sun, 01 Jan 2090 00:00:00 GMT"))
+        assert validators.not_modified().status_code == 304
+
+    def test_versions_advance_every_interval_without_events(self, monkeypatch):
+        import app.core.http_cache as http_cache
+
+        now = [1_000_000_123]
+        monkeypatch.setattr(http_cache, "_now_ms", lambda: now[0])
+        # Workers iniciados em momentos diferentes concordam na versão
+        first = RankingVersions()
+        now[0] += 1000
+        second = RankingVersions()
+        assert first.general() == second.general() == first.tournament(1) == 999_900_000
+
+        # Sem nenhum evento (ex.: escrita em outro processo), o intervalo seguinte muda a versão
+        now[0] = 1_000_300_001
+        assert first.general() == second.tournament(1) == 1_000_200_000
@@ -0,0 +1,129 @@
+"""
+Testes unitários para a importação em streaming
+"""
+import io
+import pytest
+
+from app.services.import_service import (
+    ImportFormat, ImportService, detect_import_format, iter_import_records,
+    parse_csv_header, parse_import_chunk
+)
+
+
+def _reader(data: bytes, block_size: int = 7):
+    """Simular a leitura em blocos pequenos de um UploadFile"""
+    buffer = io.BytesIO(data)
+
+    async def read(size: int) -> bytes:
+        return buffer.read(min(size, block_size))
+
+    return read
+
+
+async def _collect(data: bytes, fmt: ImportFormat) -> list:
+    return [record async for record in iter_import_records(_reader(data), fmt)]
+
+
+class TestImportFormat:
+    """Testes para detecção de formato"""
+
+    def test_detect_by_extension(self):
+        assert detect_import_format("players.csv", None) == ImportFormat.CSV
+        assert detect_import_format("scores.ndjson", None) == ImportFormat.NDJSON
+        assert detect_import_format("scores.jsonl", None) == ImportFormat.NDJSON
+
+    def test_detect_by_content_type(self):
+        assert detect_import_format(None, "application/x-ndjson") == ImportFormat.NDJSON
+        assert detect_import_format("upload", "text/plain") is None
+
+
+@pytest.mark.asyncio
+class TestImportRecords:
+    """Testes para leitura incremental de registros"""
+
+    async def test_csv_records_with_quoted_newline(self):
+        data = '\ufeffname,nickname\r\n"Ana\nMaria",ana\r\nBia,bia\r\n\r\n'.encode()
+        records = await _collect(data, ImportFormat.CSV)
+
+        assert records == ["name,nickname", '"Ana\nMaria",ana', "Bia,bia"]
+
+    async def test_ndjson_records_without_trailing_newline(self):
+        data = '{"name": "João"}\n{"name": "Zé"}'.encode()
+        records = await _collect(data, ImportFormat.NDJSON)
+
+        assert records == ['{"name": "João"}', '{"name": "Zé"}']
+
+
+class TestParseImportChunk:
+    """Testes para validação de blocos"""
+
+    def test_parse_csv_chunk(self):
+        columns = parse_csv_header("name, nickname ,email")
+        items, errors = parse_import_chunk(
+            "players", ImportFormat.CSV, columns, ["Ana,ana,", "Bia,,bia@test.com"], first_line=10
+        )
+
+        assert [(line, item["nickname"]) for line, item in items] == [(10, "ana")]
+        assert items[0][1]["email"] is None
+        assert len(errors) == 1 and errors[0].startswith("Line 11:")
+
+    def test_parse_ndjson_chunk(self):
+        records = [
+            '{"player_id": 1, "tournament_id": 2, "points": 10.5}',
+            "not json",
+            '{"player_id": 1, "tournament_id": 2, "points": "x"}',
+        ]
+        items, errors = parse_import_chunk("scores", ImportFormat.NDJSON, None, records, first_line=1)
+
+        assert len(items) == 1 and items[0][1]["points"] == 10.5
+        assert errors[0].startswith("Line 2: Invalid JSON")
+        assert errors[1].startswith("Line 3: Invalid row")
+
+
+@pytest.mark.asyncio
+class TestParsePool:
+    """Testes para o parsing no pool de processos (contexto spawn)"""
+
+    async def test_pool_parses_like_inline_and_bounds_in_flight(self):
+        # Os processos filhos (spawn) só importam app.services.import_service;
+        # o __main__ do pytest é protegido, então nada aqui roda de novo neles
+        service = ImportService()
+        service.parse_workers = 2
+        submitted = written = 0
+        outstanding = []
+        rows = []
+        parse_chunk = service._parse_chunk
+
+        def counting_parse_chunk(*args):
+            nonlocal submitted
+            submitted += 1
+            return parse_chunk(*args)
+
+        async def fake_write_chunk(session, kind, items, preview_only, admin_id):
+            nonlocal written
+            outstanding.append(submitted - written)
+            written += 1
+            rows.extend((line, item.nickname) for line, item in items)
+            return len(items), []
+
+        service._parse_chunk = counting_parse_chunk
+        service._write_chunk = fake_write_chunk
+        lines = ["name,nickname"] + [f"Player {i},p{i}" for i in range(10)] + ["Sem apelido,"]
+        data = ("\n".join(lines) + "\n").encode()
+        try:
+            events = [
+                event async for event in service.stream_import(
+                    None, "players", _reader(data, block_size=64), ImportFormat.CSV, chunk_size=2
+                )
+            ]
+            assert service._executor is not None
+        finally:
+            service.shutdown()
+
+        progress, completed = events[:-1], events[-1]
+        assert len(progress) == 6 and completed.chunks == 6
+        assert completed.processed == 11 and completed.success == 10 and completed.failed == 1
+        assert completed.errors[0].startswith("Line 11:")
+        assert rows == [(i + 1, f"p{i}") for i in range(10)]
+        # Durante cada escrita, um bloco por processo do pool ainda em voo
+        assert max(outstanding) == service.parse_workers + 1
@@ -0,0 +1,79 @@
+"""
+Testes unitários para os middlewares HTTP
+"""
+import gzip
+
+import pytest
+from starlette.middleware import Middleware
+from starlette.responses import Response
+
+from app.core.compression import CompressionMiddleware, _encoded_response, negotiate_encoding
+from app.core.http_cache import CacheValidators
+from app.core.middleware import RouteGroup, RouteGroupMiddleware
+
+
+class TestCompressionMiddleware:
+    """Testes para a negociação e a compressão das respostas"""
+
+    @pytest.mark.asyncio
+    async def test_compression_negotiation_and_middleware(self):
+        assert negotiate_encoding("gzip;q=0.5, identity") == "gzip"
+        assert negotiate_encoding("gzip;q=0, deflate") is None
+
+        async def run(response, accept_encoding="gzip"):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            app = CompressionMiddleware(response, minimum_size=100)
+            await app({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}, None, send)
+            return messages[0]["headers"], messages[1]["body"]
+
+        body = b'{"entries": "' + b"x" * 500 + b'"}'
+        headers, compressed = await run(Response(body, media_type="application/json", headers={"ETag": '"v1"'}))
+        assert (b"content-encoding", b"gzip") in headers and (b"etag", b'"v1-gzip"') in headers
+        assert gzip.decompress(compressed) == body
+        assert (b"vary", b"Accept-Encoding") in headers
+
+        # Sem compressão (corpo pequeno ou cliente sem Accept-Encoding), mas variando com ela
+        headers, small = await run(Response(b"{}", media_type="application/json"))
+        assert small == b"{}" and all(name != b"content-encoding" for name, _ in headers)
+        assert (b"vary", b"Accept-Encoding") in headers
+        headers, identity = await run(Response(body, media_type="application/json"), accept_encoding="")
+        assert identity == body and (b"vary", b"Accept-Encoding") in headers
+
+        # Corpo pré-comprimido passa intacto
+        headers, passthrough = await run(Response(b"br-bytes", headers={"Content-Encoding": "br"}))
+        assert passthrough == b"br-bytes"
+
+        # Corpos do cache pré-comprimido variam com Accept-Encoding, comprimidos ou não
+        validators = CacheValidators.for_version("general", 1)
+        assert _encoded_response(b"{}", None, validators).headers["vary"] == "Accept-Encoding"
+        assert _encoded_response(b"gz", "gzip", validators).headers["vary"] == "Accept-Encoding"
+
+
+class TestRouteGroupMiddleware:
+    """Testes para os middlewares aplicados só a grupos de rotas"""
+
+    @pytest.mark.asyncio
+    async def test_route_group_middleware_scoping(self):
+        seen = []
+
+        class Tag:
+            def __init__(self, app, name):
+                self.app, self.name = app, name
+
+            async def __call__(self, scope, receive, send):
+                seen.append(self.name)
+                await self.app(scope, receive, send)
+
+        async def endpoint(scope, receive, send):
+            seen.append("app")
+
+        app = RouteGroupMiddleware(endpoint, groups=[
+            RouteGroup(prefixes=("/api/v1/admin",), middleware=[Middleware(Tag, name="outer"), Middleware(Tag, name="inner")]),
+        ])
+        for path in ("/api/v1/admin/players", "/api/v1/administrators", "/health"):
+            await app({"type": "http", "path": path}, None, None)
+        assert seen == ["outer", "inner", "app", "app", "app"]
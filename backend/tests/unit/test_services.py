@@ -2,13 +2,14 @@
 """
 Testes unitários para serviços
 """
+import asyncio
 import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime
 
 from app.services.ranking_service import RankingService
 from app.services.notification_service import NotificationService, NotificationType
-from app.services.audit_service import AuditService
+from app.services.audit_service import AuditService, audit_service
 from app.models.audit_log import AuditLog
 
 
@@ -22,6 +23,81 @@ class TestRankingService:
         assert service._cache_timestamp is None
         assert service._cache_ttl == 300
 
+    @pytest.mark.asyncio
+    @pytest.mark.postgres
+    async def test_player_stats_query(self, pg_session):
+        from datetime import timedelta
+        from app.models.admin import Admin
+        from app.models.player import Player
+        from app.models.score import Score
+        from app.models.tournament import Tournament
+        from app.schemas.ranking import PlayerStats
+        from app.services.ranking_service import PLAYER_STATS_QUERY
+        from app.services.tournament_position_service import TournamentPositionService
+        from sqlalchemy import text
+
+        session = pg_session
+        now = datetime.utcnow()
+        tournaments = [
+            Tournament(name=f"T{n}", start_date=now - timedelta(days=1), end_date=now + timedelta(days=1))
+            for n in range(2)
+        ]
+        # ana, bia, caio, davi (inativo), edu (sem scores)
+        players = [
+            Player(name=name, nickname=name.lower(), is_active=name != "Davi")
+            for name in ("Ana", "Bia", "Caio", "Davi", "Edu")
+        ]
+        admin = Admin(name="Admin", email="admin@test.com", password_hash="x")
+        session.add_all(tournaments + players + [admin])
+        await session.commit()
+        for instance in tournaments + players + [admin]:
+            await session.refresh(instance)
+        admin_id = admin.id
+        t1, t2 = [tournament.id for tournament in tournaments]
+        ana, bia, caio, davi, edu = [player.id for player in players]
+
+        scores = [
+            (ana, t1, 100, 1), (bia, t1, 150, 1), (caio, t1, 120, 1),
+            (ana, t2, 50, 2), (caio, t2, 50, 2), (davi, t2, 500, 2), (bia, t2, -5, 2),
+        ]
+        session.add_all([
+            Score(
+                player_id=player_id, tournament_id=tournament_id, points=points, admin_id=admin_id,
+                created_at=now + timedelta(hours=hours)
+            )
+            for player_id, tournament_id, points, hours in scores
+        ])
+        await session.commit()
+        with patch("app.services.tournament_position_service.async_engine", session.bind):
+            await TournamentPositionService().recompute()
+
+        async def stats(player_id):
+            row = (await session.execute(PLAYER_STATS_QUERY, {"player_id": player_id})).mappings().first()
+            return PlayerStats.model_validate(dict(row)) if row is not None else None
+
+        # Totais: caio 170, ana 150, bia 145; o inativo (500) não conta
+        ana_stats = await stats(ana)
+        assert (ana_stats.total_tournaments, ana_stats.total_points, ana_stats.general_position) == (2, 150, 2)
+        assert (ana_stats.best_score, ana_stats.worst_score, ana_stats.average_points) == (100, 50, 75)
+        # Do score mais recente ao mais antigo; empate em T2 divide a 1ª posição
+        assert [(r.tournament_id, r.position, r.points) for r in ana_stats.tournaments] == [(t2, 1, 50), (t1, 3, 100)]
+        assert (await stats(caio)).general_position == 1
+
+        bia_stats = await stats(bia)
+        assert (bia_stats.positive_scores, bia_stats.negative_scores, bia_stats.general_position) == (1, 1, 3)
+        assert [(r.tournament_id, r.position) for r in bia_stats.tournaments] == [(t2, 3), (t1, 1)]
+
+        # Empate no total geral: mesma posição
+        await session.execute(text("UPDATE scores SET points = 70 WHERE player_id = :id AND points = 50"), {"id": ana})
+        await session.commit()
+        assert (await stats(ana)).general_position == 1
+        assert (await stats(caio)).general_position == 1
+        assert (await stats(bia)).general_position == 3
+
+        edu_stats = await stats(edu)
+        assert (edu_stats.total_tournaments, edu_stats.general_position, edu_stats.tournaments) == (0, 0, [])
+        assert await stats(davi) is None
+
 
 class TestNotificationService:
     """Testes para o serviço de notificações"""
@@ -29,9 +105,525 @@ class TestNotificationService:
     def test_notification_service_initialization(self):
         service = NotificationService()
         assert service.email_enabled is False
-        assert service._recent_notifications == []
+        assert len(service._recent_notifications) == 0
         assert service._max_recent == 100
 
+    @pytest.mark.asyncio
+    async def test_ring_buffer_ids_and_read_cursors(self):
+        """Testar IDs crescentes após o descarte e cursores de leitura por admin"""
+        service = NotificationService()
+        for n in range(150):
+            await service.send_notification(None, NotificationType.SCORE_ADDED, f"Score {n}", "", admin_ids=[1] if n % 2 else None)
+
+        assert len(service._recent_notifications) == 100
+        assert [n['id'] for n in service._recent_notifications][:2] == [51, 52]
+        assert service.get_unread_count(1) == 100
+        assert service.get_unread_count(2) == 50
+
+        service.mark_as_read(1, 140)
+        assert service.get_unread_count(1) == 10
+        assert [n['id'] for n in service.get_notifications(2, since_id=140)] == [149, 147, 145, 143, 141]
+        assert [n['id'] for n in service.get_notifications(1, unread_only=True, limit=3)] == [150, 149, 148]
+
+        service.mark_as_read(1)
+        assert service.get_unread_count(1) == 0
+
+    @pytest.mark.asyncio
+    async def test_email_worker_reuses_smtp_connection(self, session, test_admin, monkeypatch):
+        """Testar envio em lotes pelo worker com uma única conexão SMTP"""
+        import asyncio
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        import app.services.notification_service as notification_module
+        from app.models.admin import Admin
+
+        connections, messages = [], []
+
+        async def smtp_stand_in(reader, writer):
+            # Servidor SMTP mínimo: aceita tudo e registra os envelopes recebidos
+            connections.append(writer)
+            recipients = []
+            writer.write(b"220 localhost ready\r\n")
+            while line := await reader.readline():
+                command = line.decode().strip().upper()
+                if command.startswith("RCPT"):
+                    recipients.append(line.decode().split(":", 1)[1].strip(" <>\r\n"))
+                if command == "DATA":
+                    writer.write(b"354 go ahead\r\n")
+                    await reader.readuntil(b"\r\n.\r\n")
+                    messages.append(recipients)
+                    recipients = []
+                    writer.write(b"250 queued\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 bye\r\n")
+                    break
+                else:
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(smtp_stand_in, "127.0.0.1", 0)
+        admin_email = test_admin.email
+        for n in range(4):
+            session.add(Admin(name=f"Admin {n}", email=f"admin{n}@ranking.com", password_hash="x"))
+        await session.commit()
+        monkeypatch.setattr(notification_module, "AsyncSessionLocal", async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False))
+
+        service = NotificationService()
+        service.email_enabled = True
+        service.smtp_host, service.smtp_port = "127.0.0.1", server.sockets[0].getsockname()[1]
+        service.smtp_starttls = False
+        service.smtp_pool_size = 1
+        service.batch_size = 2
+        await service.start()
+
+        for _ in range(3):
+            await service.send_notification(None, NotificationType.SYSTEM_ERROR, "Falha", "Detalhes", send_email=True)
+        await service.stop()
+        server.close()
+
+        assert len(messages) == 9
+        assert all(len(recipients) <= 2 for recipients in messages)
+        assert sorted(sum(messages[:3], [])) == sorted([admin_email] + [f"admin{n}@ranking.com" for n in range(4)])
+        assert len(connections) == 1
+
+
+class TestRankingStreamService:
+    """Testes para o fan-out do ranking ao vivo"""
+
+    @pytest.mark.asyncio
+    async def test_stream_pushes_position_deltas(self, session, test_admin, monkeypatch):
+        """Testar envio apenas das posições alteradas após um evento de pontuação"""
+        import json
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        import app.services.ranking_stream_service as stream_module
+        from app.core.events import event_bus, SCORES_CHANGED
+        from app.models import Player, Tournament, Score
+
+        import app.services.tournament_position_service as positions_module
+        monkeypatch.setattr(stream_module, "AsyncSessionLocal", async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False))
+        monkeypatch.setattr(positions_module, "async_engine", session.bind)
+        admin_id = test_admin.id
+        tournament = Tournament(name="Copa", start_date=datetime(2026, 1, 1), end_date=datetime(2026, 12, 31))
+        players = [Player(name=f"Jogador {n}", nickname=f"p{n}") for n in range(3)]
+        session.add_all([tournament, *players])
+        await session.commit()
+        for instance in [tournament, *players]:
+            await session.refresh(instance)
+        tournament_id, player_ids = tournament.id, [player.id for player in players]
+        scores = [
+            Score(player_id=player_id, tournament_id=tournament_id, points=points, admin_id=admin_id)
+            for player_id, points in zip(player_ids, [30, 20, 10])
+        ]
+        session.add_all(scores)
+        await session.commit()
+        await event_bus.publish(SCORES_CHANGED, {"tournament_ids": [tournament_id]})
+
+        service = stream_module.RankingStreamService()
+        service.coalesce_interval = 0
+        await service.start()
+        stream = service.stream(stream_module.tournament_channel(tournament_id))
+        try:
+            assert b"event: ready" in await stream.__anext__()
+            assert service.subscriber_count() == 1
+
+            await session.refresh(scores[2])
+            scores[2].points = 40
+            await session.commit()
+            await event_bus.publish(SCORES_CHANGED, {"tournament_ids": [tournament_id]})
+            event = await asyncio.wait_for(stream.__anext__(), 1)
+        finally:
+            await stream.aclose()
+            await service.stop()
+
+        data = json.loads(event.decode().split("data: ", 1)[1])
+        positions = {entry["player_id"]: (entry["previous_position"], entry["position"]) for entry in data["changed"]}
+        assert positions == {player_ids[0]: (1, 2), player_ids[1]: (2, 3), player_ids[2]: (3, 1)}
+        assert service.subscriber_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_leaderboard_views_shared_per_page(self, monkeypatch):
+        """Testar uma view por página inscrita e frames de diferença compactos"""
+        import json
+        import app.services.ranking_stream_service as stream_module
+
+        standings = {
+            player_id: {"player_id": player_id, "points": points, "position": position}
+            for position, (player_id, points) in enumerate([(1, 30.0), (2, 20.0), (3, 10.0)], start=1)
+        }
+
+        async def load_standings(channel):
+            return dict(standings)
+
+        service = stream_module.RankingStreamService()
+        service.frame_interval = 0
+        monkeypatch.setattr(service, "_load_standings", load_standings)
+
+        first_view, first_sink = await service.subscribe_view(1, page=1, size=2)
+        second_view, second_sink = await service.subscribe_view(1, page=1, size=2)
+        assert first_view is second_view
+        assert service.view_count() == 1
+        snapshot = json.loads(first_sink.queue.get_nowait())
+        assert [entry["player_id"] for entry in snapshot["entries"]] == [1, 2]
+
+        standings = {3: {"player_id": 3, "points": 40.0, "position": 1}, 1: {**standings[1], "position": 2}, 2: {**standings[2], "position": 3}}
+        await service._refresh(stream_module.tournament_channel(1))
+        second_sink.queue.get_nowait()
+        diff = json.loads(second_sink.queue.get_nowait())
+        assert diff["entries"] == [{"player_id": 3, "points": 40.0, "position": 1}, {"player_id": 1, "position": 2}]
+        assert diff["removed"] == [2]
+
+        service.unsubscribe_view(first_view, first_sink)
+        service.unsubscribe_view(second_view, second_sink)
+        assert service.view_count() == 0
+
+
+class TestStatsService:
+    """Testes para o serviço de estatísticas gerais"""
+
+    @pytest.mark.asyncio
+    async def test_general_stats_from_tables(self, session, test_admin):
+        """Sem os contadores do PostgreSQL, as estatísticas vêm das tabelas"""
+        from datetime import timedelta
+        from app.models.player import Player
+        from app.models.score import Score
+        from app.models.tournament import Tournament
+        from app.services.stats_service import stats_service
+
+        admin_id = test_admin.id
+        now = datetime.utcnow()
+        tournaments = [
+            Tournament(name="Aberto", start_date=now - timedelta(days=1), end_date=now + timedelta(days=1)),
+            Tournament(name="Encerrado", start_date=now - timedelta(days=9), end_date=now - timedelta(days=2)),
+        ]
+        players = [Player(name=f"P{n}", nickname=f"p{n}", is_active=n < 2) for n in range(3)]
+        session.add_all(tournaments + players)
+        await session.commit()
+        for instance in tournaments + players:
+            await session.refresh(instance)
+        for player, points in [(players[0], 10), (players[0], -4), (players[1], 0), (players[2], 50)]:
+            session.add(Score(player_id=player.id, tournament_id=tournaments[0].id, points=points, admin_id=admin_id))
+        await session.commit()
+
+        stats = await stats_service.get_general_stats(session)
+        assert (stats.total_players, stats.total_tournaments, stats.active_tournaments) == (2, 2, 1)
+        # Scores do jogador inativo não contam
+        assert (stats.total_scores, stats.positive_scores, stats.negative_scores) == (3, 1, 1)
+        assert (stats.highest_score, stats.lowest_score, stats.average_score) == (10, -4, 2)
+
+
+class TestTournamentPositionService:
+    """Testes para as posições por torneio"""
+
+    @pytest.mark.asyncio
+    async def test_recompute_ranks_and_freezes_ended_tournaments(self, session, test_admin):
+        from datetime import timedelta
+        from sqlmodel import select
+        from app.models.player import Player
+        from app.models.score import Score
+        from app.models.tournament import Tournament
+        from app.models.tournament_position import TournamentPosition
+        from app.services.tournament_position_service import TournamentPositionService
+
+        admin_id = test_admin.id
+        now = datetime.utcnow()
+        tournament = Tournament(name="Copa", start_date=now - timedelta(days=1), end_date=now + timedelta(days=1))
+        players = [Player(name=f"P{n}", nickname=f"p{n}", is_active=n < 3) for n in range(4)]
+        session.add_all([tournament] + players)
+        await session.commit()
+        for instance in [tournament] + players:
+            await session.refresh(instance)
+        tournament_id, player_ids = tournament.id, [player.id for player in players]
+        scores = [
+            Score(player_id=player_id, tournament_id=tournament_id, points=points, admin_id=admin_id)
+            for player_id, points in zip(player_ids, [5, 9, 5, 20])
+        ]
+        # Score duplicado (corrida na checagem da rota): vale o melhor do jogador
+        scores.append(Score(player_id=player_ids[1], tournament_id=tournament_id, points=1, admin_id=admin_id))
+        session.add_all(scores)
+        await session.commit()
+
+        async def positions():
+            rows = (await session.execute(select(TournamentPosition))).scalars().all()
+            return {row.player_id: row.position for row in rows}
+
+        service = TournamentPositionService()
+        with patch("app.services.tournament_position_service.async_engine", session.bind):
+            service.on_scores_changed({"tournament_ids": [tournament_id]})
+            await service.flush()
+            # Empate divide a posição; o jogador inativo fica de fora
+            assert await positions() == {player_ids[1]: 1, player_ids[0]: 2, player_ids[2]: 2}
+
+            # Encerrado depois do último cálculo: ainda recalcula uma vez
+            await session.refresh(tournament)
+            tournament.end_date = datetime.utcnow()
+            await session.commit()
+            assert await service.recompute([tournament_id]) == [tournament_id]
+
+            # Encerrado e calculado depois do fim: congelado, só `force` recalcula
+            await session.refresh(scores[0])
+            scores[0].points = 30
+            await session.commit()
+            assert await service.recompute([tournament_id]) == []
+            assert (await positions())[player_ids[0]] == 2
+            assert await service.recompute([tournament_id], force=True) == [tournament_id]
+            session.expire_all()
+            assert (await positions())[player_ids[0]] == 1
+
+            # Eventos em lote não descongelam; a correção do admin (force_ids) sim
+            await session.refresh(scores[1])
+            scores[1].points = 40
+            await session.commit()
+            service.on_scores_changed({"tournament_ids": None})
+            await service.flush()
+            session.expire_all()
+            assert (await positions())[player_ids[1]] == 2
+            service.on_scores_changed({"tournament_ids": [tournament_id], "force_ids": [tournament_id]})
+            await service.flush()
+            session.expire_all()
+            assert (await positions())[player_ids[1]] == 1
+
+            # Jogador desativado depois do fim: as posições fecham o buraco
+            await session.refresh(players[1])
+            players[1].is_active = False
+            await session.commit()
+            service.on_scores_changed({"tournament_ids": None, "force_ids": [tournament_id]})
+            await service.flush()
+            session.expire_all()
+            assert await positions() == {player_ids[0]: 1, player_ids[2]: 2}
+
+
+class TestRankingEngine:
+    """Testes para o recálculo vetorizado dos rankings"""
+
+    def test_ranks_match_sql_rank_semantics(self):
+        np = pytest.importorskip("numpy")
+        from app.services.ranking_engine import (
+            general_ranking, tournament_positions, decode_scores_copy, SCORES_COPY_DTYPE, PGCOPY_HEADER, PGCOPY_TRAILER
+        )
+
+        player_ids = np.array([1, 2, 3, 1, 2, 4])
+        tournament_ids = np.array([10, 10, 10, 20, 20, 20])
+        points = np.array([5.0, 9.0, 5.0, 1.0, 3.0, 3.0])
+        general = general_ranking(player_ids, points)
+        assert general["player_id"].tolist() == [2, 1, 3, 4]
+        assert general["position"].tolist() == [1, 2, 3, 4]
+        assert (general["best_score"].tolist(), general["worst_score"].tolist()) == ([9, 5, 5, 3], [3, 1, 5, 3])
+
+        # Torneio 20 ordenado por menos pontos; empates dividem a posição e a seguinte pula
+        positions = tournament_positions(tournament_ids, player_ids, points, np.array([True] * 3 + [False] * 3))
+        ranked = [(int(tournament_ids[i]), int(player_ids[i]), int(p)) for i, p in zip(positions["order"], positions["position"])]
+        assert ranked == [(10, 2, 1), (10, 1, 2), (10, 3, 2), (20, 1, 1), (20, 2, 2), (20, 4, 2)]
+
+        rows = np.zeros(2, dtype=SCORES_COPY_DTYPE)
+        rows["fields"], rows["points_size"], rows["descending_size"] = 5, 8, 1
+        rows["score_id"], rows["player_id"], rows["points"], rows["descending"] = [7, 8], [1, 2], [2.5, -1.0], [1, 0]
+        scores = decode_scores_copy(PGCOPY_HEADER + rows.tobytes() + PGCOPY_TRAILER)
+        assert scores.score_ids.tolist() == [7, 8] and scores.points.tolist() == [2.5, -1.0]
+        assert scores.descending.tolist() == [True, False]
+
+    @pytest.mark.asyncio
+    async def test_full_recompute_matches_sql_path(self, session, test_admin):
+        pytest.importorskip("numpy")
+        from datetime import timedelta
+        from sqlmodel import select
+        from app.models.player import Player
+        from app.models.ranking_snapshot import RankingSnapshot
+        from app.models.score import Score
+        from app.models.tournament import Tournament
+        from app.models.tournament_position import TournamentPosition
+        from app.services.ranking_engine import ranking_engine
+        from app.services.ranking_history_service import _unpack
+        from app.services.tournament_position_service import TournamentPositionService
+
+        now = datetime.utcnow()
+        tournaments = [
+            Tournament(name=f"T{n}", start_date=now - timedelta(days=1), end_date=now + timedelta(days=1), sort_criteria=criteria)
+            for n, criteria in enumerate(["points_desc", "points_asc"])
+        ]
+        admin_id = test_admin.id
+        players = [Player(name=f"P{n}", nickname=f"p{n}", is_active=n < 4) for n in range(5)]
+        session.add_all(tournaments + players)
+        await session.commit()
+        for instance in tournaments + players:
+            await session.refresh(instance)
+        session.add_all([
+            Score(player_id=players[n].id, tournament_id=tournament.id, points=(n * 7 + t * 3) % 5, admin_id=admin_id)
+            for t, tournament in enumerate(tournaments) for n in range(5)
+        ])
+        # Duplicados no torneio: os dois caminhos ficam com o melhor score do jogador
+        session.add_all([
+            Score(player_id=players[0].id, tournament_id=tournaments[0].id, points=4, admin_id=admin_id),
+            Score(player_id=players[1].id, tournament_id=tournaments[1].id, points=-1, admin_id=admin_id),
+        ])
+        await session.commit()
+
+        async def positions():
+            rows = (await session.execute(select(TournamentPosition))).scalars().all()
+            return sorted((row.tournament_id, row.player_id, row.position, row.points) for row in rows)
+
+        with patch("app.services.tournament_position_service.async_engine", session.bind):
+            recomputed = await TournamentPositionService().recompute(force=True)
+        expected = await positions()
+        async with session.bind.begin() as conn:
+            await conn.execute(TournamentPosition.__table__.delete())
+            await ranking_engine.recompute(conn, recomputed, now)
+        session.expire_all()
+        assert len(expected) == 8 and await positions() == expected
+        snapshot = (await session.execute(select(RankingSnapshot))).scalars().one()
+        assert snapshot.player_count == 4
+        # Vetores em ordem de id, para a busca binária do histórico
+        snapshot_ids = _unpack("i", snapshot.player_ids).tolist()
+        assert snapshot_ids == sorted(snapshot_ids)
+
+        # Dentro do intervalo não há outro snapshot
+        async with session.bind.begin() as conn:
+            await conn.execute(TournamentPosition.__table__.delete())
+            await ranking_engine.recompute(conn, recomputed, now)
+        assert len((await session.execute(select(RankingSnapshot))).scalars().all()) == 1
+
+
+class TestRankingHistoryService:
+    """Testes para o ranking geral em datas passadas"""
+
+    @pytest.mark.asyncio
+    async def test_as_of_replays_deltas_from_nearest_snapshot(self, session, test_admin):
+        from datetime import timedelta
+        from app.models.player import Player
+        from sqlmodel import select
+        from app.models.ranking_delta import RankingDelta
+        from app.models.ranking_snapshot import RankingSnapshot
+        from app.models.score import Score
+        from app.models.tournament import Tournament
+        from app.core.http_cache import ranking_versions
+        from app.services.ranking_history_service import RankingHistoryService
+
+        admin_id = test_admin.id
+        now = datetime.utcnow()
+        tournament = Tournament(name="Copa", start_date=now - timedelta(days=9), end_date=now + timedelta(days=1))
+        players = [Player(name=f"P{n}", nickname=f"p{n}") for n in range(3)]
+        session.add_all([tournament] + players)
+        await session.commit()
+        for instance in [tournament] + players:
+            await session.refresh(instance)
+        ids = [player.id for player in players]
+        session.add_all([
+            Score(player_id=player_id, tournament_id=tournament.id, points=points, admin_id=admin_id)
+            for player_id, points in zip(ids, [30, 20, 20])
+        ])
+        await session.commit()
+
+        service = RankingHistoryService()
+        with patch("app.services.ranking_history_service.async_engine", session.bind):
+            await service.take_snapshot(force=True)
+        # Recuar o snapshot um dia, para os deltas abaixo ficarem no passado
+        snapshot = (await session.execute(select(RankingSnapshot))).scalars().one()
+        snapshot.taken_at = taken_at = snapshot.taken_at - timedelta(days=1)
+        await session.commit()
+        # Deltas gravados pelos triggers depois do snapshot
+        session.add_all([
+            RankingDelta(player_id=ids[2], points_delta=15, count_delta=1, changed_at=taken_at + timedelta(hours=1)),
+            RankingDelta(player_id=ids[0], points_delta=-30, count_delta=-1, changed_at=taken_at + timedelta(hours=3)),
+        ])
+        await session.commit()
+
+        async def positions(as_of):
+            ranking = await service.get_general_ranking_as_of(session, as_of, 1, 10)
+            return ranking and [(entry["player_id"], entry["position"]) for entry in ranking["entries"]]
+
+        assert await positions(taken_at - timedelta(minutes=1)) is None
+        assert await positions(taken_at) == [(ids[0], 1), (ids[1], 2), (ids[2], 2)]
+        assert await positions(taken_at + timedelta(hours=2)) == [(ids[2], 1), (ids[0], 2), (ids[1], 3)]
+        assert await positions(taken_at + timedelta(hours=4)) == [(ids[2], 1), (ids[1], 2)]
+
+        history = await service.get_player_history(session, ids[2], taken_at - timedelta(days=1))
+        # O último ponto é o ranking atual
+        assert [(point["position"], point["total_points"]) for point in history] == [(2, 20), (1, 35)]
+        assert await service.get_player_history(session, ids[0], taken_at - timedelta(days=1)) == [
+            {"taken_at": taken_at, "position": 1, "total_points": 30}
+        ]
+        # Em cache até a versão do ranking geral mudar
+        assert await service.get_player_history(session, ids[2], taken_at - timedelta(days=1)) is history
+        ranking_versions.on_scores_changed({"tournament_ids": None})
+        refreshed = await service.get_player_history(session, ids[2], taken_at - timedelta(days=1))
+        assert refreshed is not history and refreshed[:1] == history[:1]
+
+        # Retenção: o snapshot antigo sai, e com ele os deltas anteriores ao novo
+        service.retention_days = 1
+        with patch("app.services.ranking_history_service.async_engine", session.bind):
+            latest = await service.take_snapshot(force=True)
+        session.expire_all()
+        assert (await session.execute(select(RankingSnapshot.taken_at))).scalars().all() == [latest]
+        assert (await session.execute(select(RankingDelta))).scalars().all() == []
+
+
+class TestImportJobService:
+    """Testes para o ciclo de vida dos jobs de importação"""
+
+    @pytest.mark.asyncio
+    async def test_job_lifecycle_and_restart(self, session, test_admin, monkeypatch, tmp_path):
+        """Testar fila, progresso, cancelamento e jobs interrompidos ao reiniciar"""
+        import io
+        from datetime import timedelta
+        from fastapi import UploadFile
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from sqlmodel import select
+        import app.services.import_job_service as jobs_module
+        from app.models.import_job import ImportJob
+        from app.models.player import Player
+        from app.services.import_service import ImportFormat, import_service
+
+        admin_id = test_admin.id
+        sessions = async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(jobs_module, "AsyncSessionLocal", sessions)
+        monkeypatch.setattr(import_service, "parse_workers", 0)
+        service = jobs_module.ImportJobService()
+        service.upload_dir = tmp_path
+
+        async def submit(data: bytes):
+            upload = UploadFile(file=io.BytesIO(data), filename="players.csv")
+            job = await service.submit(session, "players", upload, ImportFormat.CSV, 1, False, admin_id)
+            return job.id
+
+        async def job(job_id: int) -> ImportJob:
+            async with sessions() as job_session:
+                return await job_session.get(ImportJob, job_id)
+
+        # Com o serviço parado os jobs ficam pendentes
+        queued = await submit(b"name,nickname\nAna,ana\nBia,bia\n")
+        cancelled = await submit(b"name,nickname\nCris,cris\n")
+        assert (await job(queued)).status == "pending"
+        cancelled_job = await service.cancel(session, cancelled)
+        assert cancelled_job.status == "cancelled"
+
+        # Job "running" de um processo que caiu: sem progresso há mais que stale_after
+        stale_file = tmp_path / "stale.csv"
+        stale_file.write_bytes(b"name,nickname\n")
+        stale = ImportJob(
+            kind="players", status="running", file_path=str(stale_file), file_format="csv", chunk_size=1,
+            admin_id=admin_id, processed=7, updated_at=datetime.utcnow() - timedelta(seconds=service.stale_after + 1)
+        )
+        session.add(stale)
+        await session.commit()
+        await session.refresh(stale)
+        stale_id = stale.id
+
+        await service.start()
+        try:
+            for _ in range(100):
+                if (await job(queued)).status == "completed" and (await job(stale_id)).status == "failed":
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await service.stop()
+
+        completed = await job(queued)
+        assert (completed.status, completed.processed, completed.success, completed.chunks) == ("completed", 2, 2, 2)
+        interrupted = await job(stale_id)
+        assert interrupted.status == "failed" and interrupted.message.startswith("Interrupted after 7 rows")
+        assert list(tmp_path.iterdir()) == []
+        nicknames = (await session.execute(select(Player.nickname))).scalars().all()
+        assert sorted(nicknames) == ["ana", "bia"]
+
 
 @pytest.mark.asyncio
 class TestAuditService:
@@ -68,3 +660,126 @@ class TestAuditService:
         
         resource_logs = await audit_service.get_audit_logs(session, record_id=1)
         assert len(resource_logs) == 2
+
+    async def test_batched_audit_writer(self, session, test_admin, monkeypatch):
+        """Testar gravação em lote e drenagem da fila no shutdown"""
+        import app.services.audit_service as audit_module
+        monkeypatch.setattr(audit_module, "async_engine", session.bind)
+
+        service = AuditService()
+        await service.start()
+
+        queued = await service.log_action(session, "UPDATE", "player", 1, test_admin.id)
+        synced = await service.log_action(session, "DELETE", "player", 1, test_admin.id)
+        assert queued.id is None
+        assert synced.id is not None
+
+        await service.stop()
+
+        all_logs = await service.get_audit_logs(session)
+        assert {log.action for log in all_logs} == {"UPDATE", "DELETE"}
+
+    async def test_get_audit_logs_cursor_pagination(self, session, test_admin):
+        """Testar paginação por cursor (timestamp, id)"""
+        admin_id = test_admin.id
+        for record_id in range(5):
+            await audit_service.log_action(session, "UPDATE", "player", record_id, admin_id)
+
+        first_page = await audit_service.get_audit_logs(session, limit=3)
+        cursor = AuditService.encode_cursor(first_page[-1])
+        second_page = await audit_service.get_audit_logs(session, limit=3, cursor=cursor)
+
+        assert len(first_page) == 3
+        assert len(second_page) == 2
+        assert {log.id for log in first_page}.isdisjoint(log.id for log in second_page)
+
+    async def test_partition_cache_filled_only_after_commit(self, monkeypatch):
+        """Testar que a partição de uma transação desfeita não fica no cache"""
+        from contextlib import asynccontextmanager
+        from types import SimpleNamespace
+        import app.services.audit_service as audit_module
+
+        statements, failing = [], [True]
+
+        class Connection:
+            dialect = SimpleNamespace(name="postgresql")
+
+            async def execute(self, statement, params=None):
+                statements.append(str(statement))
+                if failing[0] and str(statement).startswith("INSERT"):
+                    raise RuntimeError("insert failed")
+
+        @asynccontextmanager
+        async def begin():
+            yield Connection()
+
+        monkeypatch.setattr(audit_module, "async_engine", SimpleNamespace(begin=begin))
+        service = AuditService()
+        service.max_retries = 1
+        record = {
+            "action": "UPDATE", "table_name": "player", "record_id": 1, "admin_id": 1,
+            "old_values": None, "new_values": None, "timestamp": datetime(2026, 5, 3),
+        }
+
+        await service._flush([record])
+        assert service._partition_months == set()
+        # O lote e a nova tentativa linha a linha garantem a partição de novo
+        assert sum("audit_logs_ensure_partition" in statement for statement in statements) == 2
+
+        failing[0] = False
+        await service._flush([record])
+        assert service._partition_months == {"2026-05"}
+
+    async def test_archived_logs_read_transparently(self, session, test_admin, monkeypatch, tmp_path):
+        """Testar arquivamento de meses antigos e leitura transparente do arquivo"""
+        from datetime import timedelta
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        import app.services.audit_archive_service as archive_module
+
+        archive = archive_module.audit_archive_service
+        monkeypatch.setattr(archive_module, "AsyncSessionLocal", async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False))
+        monkeypatch.setattr(archive, "archive_dir", tmp_path)
+        monkeypatch.setattr(archive, "retention_days", 30)
+
+        now = datetime.utcnow()
+        for record_id in range(10):
+            session.add(AuditLog(
+                action="UPDATE", table_name="player", record_id=record_id,
+                admin_id=test_admin.id, timestamp=now - timedelta(days=20 * record_id)
+            ))
+        await session.commit()
+
+        result = await archive.archive_old_logs()
+        assert result["archived_rows"] > 0
+        assert archive.get_watermark() is not None
+
+        logs, cursor = [], None
+        while page := await audit_service.get_audit_logs(session, limit=3, cursor=cursor):
+            logs += page
+            cursor = AuditService.encode_cursor(page[-1])
+        assert [log.record_id for log in logs] == list(range(10))
+
+    async def test_update_stores_diff_and_reconstructs(self, session, test_admin):
+        """Testar gravação só dos campos alterados e reconstrução no tempo"""
+        admin_id = test_admin.id
+        created = await audit_service.log_action(
+            session, "CREATE", "player", 1, admin_id,
+            new_values={"name": "Ana", "nickname": "ana", "is_active": True}
+        )
+        created_at = created.timestamp
+        updated = await audit_service.log_action(
+            session, "UPDATE", "player", 1, admin_id,
+            old_values={"name": "Ana", "nickname": "ana"},
+            new_values={"name": "Ana", "nickname": "ana_99"}
+        )
+        assert updated.old_values == {"nickname": "ana"}
+        assert updated.new_values == {"nickname": "ana_99"}
+        updated_at = updated.timestamp
+
+        await audit_service.log_action(session, "DELETE", "player", 1, admin_id, old_values={"nickname": "ana_99"})
+
+        at_creation = await audit_service.reconstruct_record(session, "player", 1, created_at)
+        at_update = await audit_service.reconstruct_record(session, "player", 1, updated_at)
+        assert at_creation["nickname"] == "ana"
+        assert at_update == {"name": "Ana", "nickname": "ana_99", "is_active": True}
+        assert await audit_service.reconstruct_record(session, "player", 1, datetime.utcnow()) is None